@@ -0,0 +1,56 @@
+# benchmarks/bench_headless.py
+"""Find the highest sample rate the headless logger sustains.
+
+Runs src/headless.py against the simulated DAQ970A at increasing rates
+and reports the achieved rate, late ticks and dropped samples for each.
+A rate counts as sustained when at least 95% of the requested samples
+arrived and nothing was dropped:
+
+    python benchmarks/bench_headless.py --channels 7 --seconds 2 --format binary
+    python benchmarks/bench_headless.py --stream      # hardware-timed scans
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.config_manager import ConfigManager
+from src.headless import run
+
+
+def make_config(channels, latency):
+    config = ConfigManager()
+    config.channels = {str(301 + i): {'name': f'Channel_{i}', 'unit': 'V', 'coefficient': '2', 'offset': '3'}
+                       for i in range(channels)}
+    config.daq = {'backend': 'sim', 'simulator': {'latency': {'default': latency}}}
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--channels', type=int, default=7)
+    parser.add_argument('--seconds', type=float, default=2.0, help="duration of each rate step")
+    parser.add_argument('--format', dest='log_format', default='csv')
+    parser.add_argument('--latency', type=float, default=0.0005, help="simulated seconds per USB transaction")
+    parser.add_argument('--stream', action='store_true')
+    parser.add_argument('--rates', default="10,50,100,200,500,1000,2000,5000")
+    args = parser.parse_args()
+
+    config = make_config(args.channels, args.latency)
+    sustained = None
+    print(f"{'requested/s':>12} {'achieved/s':>11} {'late':>6} {'dropped':>8}")
+    with tempfile.TemporaryDirectory() as log_dir:
+        for rate in (float(r) for r in args.rates.split(',')):
+            summary = run(config, args.seconds, rate, args.log_format, log_dir, stream=args.stream,
+                          status_interval=0, out=io.StringIO())
+            print(f"{rate:12.0f} {summary['rate']:11.1f} {summary['late']:6d} {summary['dropped']:8d}")
+            if summary['rate'] >= 0.95 * rate and not summary['dropped'] and not summary['log_dropped']:
+                sustained = rate
+    print(f"highest sustained rate: {sustained if sustained else 'none'}"
+          f" ({args.channels} channels, {args.log_format}, {'stream' if args.stream else 'READ?'})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# benchmarks/bench_log_formats.py
+"""Compare the CSV and binary DataLogger backends.
+
+Logs the same synthetic run with both backends and reports write
+throughput, file size and the time to load every value back as a NumPy
+array:
+
+    python benchmarks/bench_log_formats.py --rows 200000 --channels 7
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.data_logger import DataLogger, BinaryLog
+from src.pipeline import SampleBlock
+
+
+def make_blocks(rows, channels, block_size):
+    channel_ids = [str(301 + i) for i in range(channels)]
+    rng = np.random.default_rng(0)
+    start_ns = time.perf_counter_ns()
+    blocks = []
+    for start in range(0, rows, block_size):
+        n = min(block_size, rows - start)
+        times = (start + np.arange(n)) * 1e-3
+        raw = rng.normal(size=(channels, n))
+        blocks.append(SampleBlock(channel_ids, start_ns + (times * 1e9).astype(np.int64), times, raw, raw * 2 + 3))
+    return channel_ids, blocks
+
+
+def write(log_format, log_dir, channel_ids, blocks):
+    logger = DataLogger(log_dir=log_dir, filename_prefix=log_format, log_format=log_format,
+                        threaded=False)
+    logger.start_logging(channel_ids, include_raw=True)
+    start = time.perf_counter()
+    for block in blocks:
+        logger.log_block(block)
+    logger.stop_logging()
+    return logger.filename, time.perf_counter() - start
+
+
+def reload_csv(path):
+    start = time.perf_counter()
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        next(reader)
+        data = np.array([[float(v) for v in row[1:]] for row in reader])
+    return data, time.perf_counter() - start
+
+
+def reload_binary(path):
+    start = time.perf_counter()
+    log = BinaryLog(path)
+    data = log.data
+    data.sum()  # Touch every page so the comparison includes the actual read
+    return data, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--channels', type=int, default=7)
+    parser.add_argument('--block-size', type=int, default=10, help="samples per logged block")
+    args = parser.parse_args()
+
+    channel_ids, blocks = make_blocks(args.rows, args.channels, args.block_size)
+    with tempfile.TemporaryDirectory() as log_dir:
+        results = {}
+        for log_format, reload in (('csv', reload_csv), ('binary', reload_binary)):
+            path, write_time = write(log_format, log_dir, channel_ids, blocks)
+            data, reload_time = reload(path)
+            assert data.shape[0] == args.rows
+            results[log_format] = (write_time, os.path.getsize(path), reload_time)
+            del data
+
+    print(f"rows: {args.rows}, channels: {args.channels} (+raw), block size: {args.block_size}")
+    print(f"{'format':8} {'write rows/s':>14} {'size MB':>9} {'reload s':>9}")
+    for log_format, (write_time, size, reload_time) in results.items():
+        print(f"{log_format:8} {args.rows / write_time:14.0f} {size / 1e6:9.2f} {reload_time:9.3f}")
+    csv_result, bin_result = results['csv'], results['binary']
+    print(f"binary vs csv: {csv_result[0] / bin_result[0]:.1f}x write, "
+          f"{csv_result[1] / bin_result[1]:.1f}x smaller, {csv_result[2] / bin_result[2]:.1f}x reload")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_scan.py
+"""Compare per-channel MEAS? reads, a scan-list READ? and hardware-timed streaming.
+
+Runs against the in-process simulated DAQ970A (src/simulator.py),
+configured with a fixed latency per USB transaction plus an integration
+time per reading, so no hardware is needed. The per-channel case takes
+one MEAS? per channel, as reads did before the scan list; a single
+grouped MEAS? is shown too, which is what reads outside the scan list
+cost now. The streaming case arms a
+timer-triggered scan and drains reading memory with DATA:REM? every
+--poll seconds for the same number of sweeps:
+
+    python benchmarks/bench_scan.py --channels 7 --ticks 50
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.daq_interface import DAQInterface
+
+
+def run(channel_ids, ticks, mode, latency, reading_time):
+    """Seconds per tick; mode is 'channel' (a MEAS? each), 'meas' (one MEAS?) or 'scan' (READ?)."""
+    daq = DAQInterface(backend='sim', simulator={'latency': {'default': latency},
+                                                  'reading_time': reading_time})
+    if mode == 'scan':
+        daq.configure_scan(channel_ids)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        if mode == 'channel':
+            for ch in channel_ids:
+                daq.read_channels([ch])
+        else:
+            daq.read_channels(channel_ids)
+    return (time.perf_counter() - start) / ticks
+
+
+def run_stream(channel_ids, ticks, interval, poll, latency):
+    daq = DAQInterface(backend='sim', simulator={'latency': {'default': latency}})
+    daq.start_stream(channel_ids, interval)
+    start = time.perf_counter()
+    sweeps = polls = 0
+    while sweeps < ticks:
+        time.sleep(poll)
+        sweeps += len(daq.read_stream().timestamps_ns)
+        polls += 1
+    elapsed = time.perf_counter() - start
+    daq.stop_stream()
+    return elapsed / sweeps, polls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--channels', type=int, default=7)
+    parser.add_argument('--ticks', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.001, help="seconds per USB transaction")
+    parser.add_argument('--reading-time', type=float, default=0.0002, help="seconds per reading")
+    parser.add_argument('--interval', type=float, default=0.001, help="stream sweep interval (s)")
+    parser.add_argument('--poll', type=float, default=0.05, help="stream drain interval (s)")
+    args = parser.parse_args()
+
+    channel_ids = [str(301 + i) for i in range(args.channels)]
+    per_channel = run(channel_ids, args.ticks, 'channel', args.latency, args.reading_time)
+    grouped = run(channel_ids, args.ticks, 'meas', args.latency, args.reading_time)
+    scan = run(channel_ids, args.ticks, 'scan', args.latency, args.reading_time)
+
+    print(f"channels: {args.channels}, ticks: {args.ticks}")
+    print(f"per-channel MEAS?:     {per_channel * 1e3:8.2f} ms/tick ({1 / per_channel:7.1f} Hz max)")
+    print(f"grouped MEAS?:         {grouped * 1e3:8.2f} ms/tick ({1 / grouped:7.1f} Hz max)")
+    print(f"scan list READ?:       {scan * 1e3:8.2f} ms/tick ({1 / scan:7.1f} Hz max)")
+    print(f"speedup:               {per_channel / scan:8.2f}x")
+    # The instrument, not the host, paces the stream, so sweeps are only
+    # limited by the timer and the transfer per poll
+    stream, polls = run_stream(channel_ids, max(args.ticks, 500), args.interval, args.poll, args.latency)
+    print(f"hardware-timed stream: {stream * 1e3:8.2f} ms/sweep ({1 / stream:7.1f} Hz, {polls} polls)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+# benchmarks/bench_suite.py
+"""End-to-end acquisition benchmarks against the simulated DAQ970A.
+
+Times the hot path one stage at a time (DAQInterface.read_channels,
+DataLogger.log_data / log_block, PlotWidget.update_plot) and then the
+whole DAQReaderApp.update_plots loop, headless, over a grid of channel
+counts, history lengths and sample rates. For each case it reports
+throughput, p50/p99 tick latency and memory growth over the run.
+
+    python benchmarks/bench_suite.py                   # run and compare with the baseline
+    python benchmarks/bench_suite.py --save-baseline   # record this machine's baseline
+    python benchmarks/bench_suite.py --only plot       # cases whose name contains 'plot'
+
+A case is flagged (and the exit status is 1) when its p50 latency is more
+than --tolerance above the baseline. Baselines are machine specific;
+none is committed, so record one with --save-baseline on the machine you
+compare on before the first comparison.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.daq_interface import DAQInterface, BACKEND_ENV
+from src.data_logger import DataLogger
+from src.pipeline import SamplePipeline
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def channel_config(n):
+    return {str(301 + i): {'type': 'Pressure', 'unit': 'Pa', 'name': f'Channel_{i}',
+                           'coefficient': '2', 'offset': '3'} for i in range(n)}
+
+
+_qt_app = None
+
+
+def qt_app():
+    """Create the (offscreen) QApplication once and keep it alive."""
+    global _qt_app
+    from PyQt5 import QtWidgets
+    _qt_app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    return _qt_app
+
+
+def quiet(function, *args, **kwargs):
+    """Call function with stdout silenced (the app prints on start/stop)."""
+    stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        return function(*args, **kwargs)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+# -- Cases ---------------------------------------------------------------------
+# Each case builder returns (tick, samples_per_tick, teardown). samples_per_tick
+# may instead be a function returning a running sample count, read when timing
+# starts and stops. A tick that waits for its schedule returns the time it
+# actually spent working.
+
+def daq_read(channels):
+    daq = quiet(DAQInterface, backend='sim')
+    ids = list(channel_config(channels))
+    daq.configure_scan(ids)
+
+    def tick():
+        if daq.read_channels(ids) is None:
+            raise RuntimeError("DAQ read failed")
+    return tick, 1, None
+
+
+def logger_log_data(channels, log_dir):
+    logger = DataLogger(log_dir=log_dir, filename_prefix=f'log_data_{channels}')
+    ids = list(channel_config(channels))
+    quiet(logger.start_logging, ids)
+    row = {ch: 1.2345 for ch in ids}
+    return (lambda: logger.log_data(row)), 1, lambda: quiet(logger.stop_logging)
+
+
+def logger_log_block(channels, log_dir, log_format, block_size=10):
+    logger = DataLogger(log_dir=log_dir, filename_prefix=f'log_block_{log_format}_{channels}',
+                        log_format=log_format, threaded=True)
+    config = channel_config(channels)
+    quiet(logger.start_logging, config.keys(), include_raw=True, channels=config)
+    pipeline = SamplePipeline(config)
+    raw = np.ones((channels, block_size))
+    stamps = np.arange(block_size, dtype=np.int64)
+
+    def tick():
+        logger.log_block(pipeline.publish_block(stamps + time.perf_counter_ns(), raw.copy()))
+    return tick, block_size, lambda: quiet(logger.stop_logging)
+
+
+def plot_update(channels, history):
+    qt_app()
+    from src.plot_widget import PlotWidget
+    config = channel_config(channels)
+    widget = quiet(PlotWidget, 'bench', config, max_points=history, history_points=history)
+    # Start with a full history so every tick pays the steady-state cost
+    quiet(widget.add_block, SamplePipeline(config).publish_block(
+        np.arange(history, dtype=np.int64) * 10**8, np.zeros((channels, history))))
+    sample = {ch: 1.0 for ch in config}
+    state = {'t': history * 0.1}
+
+    def tick():
+        state['t'] += 0.1
+        widget.update_plot(sample, state['t'])
+    return tick, 1, widget.deleteLater
+
+
+def app_loop(channels, rate, log_dir, frame_interval=0.05):
+    qt_app()
+    from PyQt5 import QtWidgets
+    from unittest.mock import patch
+    from src.main import DAQReaderApp
+
+    config_path = os.path.join(log_dir, f'config_{channels}.json')
+    groups = ["Pressure", "Temperature", "Velocity", "STING"]
+    ids = list(channel_config(channels))
+    with open(config_path, 'w') as f:
+        json.dump({'channels': channel_config(channels),
+                   'graphs': {g: ids[i::len(groups)] for i, g in enumerate(groups) if ids[i::len(groups)]},
+                   'daq': {'backend': 'sim'}}, f)
+
+    logger = lambda **kwargs: DataLogger(log_dir=log_dir, threaded=True, filename_prefix=f'app_{channels}_{rate}')
+    with patch('src.main.DataLogger', logger), patch.dict(os.environ, {BACKEND_ENV: 'sim'}):
+        app = quiet(DAQReaderApp)
+    with patch.object(QtWidgets.QFileDialog, 'getOpenFileName', return_value=(config_path, '')):
+        quiet(app.load_config)
+    app.sample_interval = 1.0 / rate
+    quiet(app.start_measuring)
+    app.timer.stop()  # The benchmark drives update_plots itself
+    state = {'next': time.perf_counter()}
+
+    def tick():
+        # Keep the GUI on its own frame schedule, independent of the sample rate
+        state['next'] += frame_interval
+        delay = state['next'] - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        t0 = time.perf_counter()
+        app.update_plots()
+        app.renderer.render_frame()  # The frame the scheduler would draw
+        return time.perf_counter() - t0  # Time the frame, not the wait for it
+
+    def teardown():
+        stats = app.acquisition.stats()
+        quiet(app.stop_measuring)
+        app.deleteLater()
+        return {'acquired': stats['samples'], 'dropped': stats['dropped'], 'late': stats['late']}
+    return tick, lambda: app.acquisition.stats()['samples'], teardown
+
+
+def cases(log_dir, quick):
+    channel_counts = (7, 32) if quick else (7, 32, 120)
+    histories = (50, 5000) if quick else (50, 5000, 50000)
+    rates = (10, 100) if quick else (10, 100, 500)
+    for n in channel_counts:
+        yield f'daq_read[ch={n}]', lambda n=n: daq_read(n), 200
+    for n in channel_counts:
+        yield f'logger_log_data[ch={n}]', lambda n=n: logger_log_data(n, log_dir), 2000
+        for log_format in ('csv', 'binary'):
+            yield (f'logger_log_block[{log_format},ch={n}]',
+                   lambda n=n, f=log_format: logger_log_block(n, log_dir, f), 500)
+    for n in channel_counts[:2]:
+        for history in histories:
+            yield f'plot_update[ch={n},hist={history}]', lambda n=n, h=history: plot_update(n, h), 300
+    for rate in rates:
+        yield f'app_loop[ch=7,rate={rate}Hz]', lambda r=rate: app_loop(7, r, log_dir), 40
+
+
+# -- Runner --------------------------------------------------------------------
+
+def run_case(build, ticks):
+    tick, samples_per_tick, teardown = build()
+    for _ in range(min(10, ticks)):  # Warm up
+        tick()
+    tracemalloc.start()
+    memory_before = tracemalloc.get_traced_memory()[0]
+    latencies = np.empty(ticks)
+    counted = callable(samples_per_tick)
+    samples_before = samples_per_tick() if counted else 0
+    start = time.perf_counter()
+    for i in range(ticks):
+        t0 = time.perf_counter()
+        busy = tick()
+        latencies[i] = time.perf_counter() - t0 if busy is None else busy
+    elapsed = time.perf_counter() - start
+    samples = samples_per_tick() - samples_before if counted else None
+    memory_growth = tracemalloc.get_traced_memory()[0] - memory_before
+    tracemalloc.stop()
+    extra = teardown() if teardown else None
+
+    result = {
+        'ticks': ticks,
+        'p50_ms': float(np.percentile(latencies, 50) * 1e3),
+        'p99_ms': float(np.percentile(latencies, 99) * 1e3),
+        'memory_growth_kb': memory_growth / 1024,
+    }
+    if counted:
+        result['samples_per_s'] = samples / elapsed
+    elif samples_per_tick is not None:
+        result['samples_per_s'] = ticks * samples_per_tick / elapsed
+    if isinstance(extra, dict):
+        result.update(extra)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--only', help="run only cases whose name contains this text")
+    parser.add_argument('--quick', action='store_true', help="smaller grid and fewer ticks")
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed p50 slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    elif not args.save_baseline:
+        print(f"No baseline at {args.baseline}; run once with --save-baseline to record one")
+
+    results = {}
+    regressions = []
+    print(f"{'case':38} {'samples/s':>11} {'p50 ms':>8} {'p99 ms':>8} {'mem KB':>8}  vs baseline")
+    with tempfile.TemporaryDirectory() as log_dir:
+        for name, build, ticks in cases(log_dir, args.quick):
+            if args.only and args.only not in name:
+                continue
+            if args.quick:
+                ticks = max(ticks // 4, 10)
+            result = results[name] = run_case(build, ticks)
+            note = ''
+            if name in baseline:
+                ratio = result['p50_ms'] / baseline[name]['p50_ms']
+                note = f"{ratio:5.2f}x"
+                if ratio > 1 + args.tolerance:
+                    note += '  SLOWER'
+                    regressions.append(name)
+            print(f"{name:38} {result.get('samples_per_s', 0):11.0f} {result['p50_ms']:8.3f} "
+                  f"{result['p99_ms']:8.3f} {result['memory_growth_kb']:8.1f}  {note}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than baseline by more than {args.tolerance:.0%}:")
+        for name in regressions:
+            print(f"  {name}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
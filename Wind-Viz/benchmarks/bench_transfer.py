@@ -0,0 +1,85 @@
+# benchmarks/bench_transfer.py
+"""Compare ASCII and binary (FORM:DATA REAL) transfer of a block of stream readings.
+
+Fills the simulated DAQ970A's reading memory with --sweeps sweeps, takes
+one DATA:REM? reply in each format, and then times DAQInterface.read_stream
+decoding that reply over and over with the instrument answering instantly,
+so only the host side is measured: bytes on the bus and parse time.
+The last column is the largest difference from the ASCII readings.
+
+    python benchmarks/bench_transfer.py --channels 20 --sweeps 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pyvisa
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.daq_interface import DAQInterface
+
+
+class CannedReply:
+    """Answers DATA:POIN? and DATA:REM? with one recorded reply, as fast as possible."""
+
+    def __init__(self, points, reply):
+        self.points = points
+        self.reply = reply
+
+    def query(self, command):
+        if 'POIN' in command:
+            return str(self.points)
+        return self.reply.decode('latin-1')
+
+    def query_binary_values(self, command, datatype='f', is_big_endian=False, container=list, **kwargs):
+        return pyvisa.util.from_ieee_block(self.reply, datatype, is_big_endian, container)
+
+    def close(self):
+        pass
+
+
+def run(data_format, channel_ids, sweeps, repeats):
+    # Seeded noise without the sine, so every format gets the same readings
+    signals = {'default': {'offset': 1.0, 'amplitude': 0.0, 'noise': 0.01}}
+    daq = DAQInterface(backend='sim', data_format=data_format, simulator={'signals': signals})
+    daq.start_stream(channel_ids, 1e-6, count=sweeps)
+    time.sleep(sweeps * 1e-6 + 0.01)
+    points = sweeps * len(channel_ids)
+    daq.instrument.write(f":DATA:REM? {points}")
+    reply = daq.instrument.read_raw()
+
+    daq.instrument = CannedReply(points, reply)
+    best = float('inf')
+    for _ in range(repeats):
+        daq._stream_sweeps = 0
+        start = time.perf_counter()
+        block = daq.read_stream()
+        best = min(best, time.perf_counter() - start)
+    assert block.raw.shape == (len(channel_ids), sweeps)
+    return len(reply), best, block.raw
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--channels', type=int, default=20)
+    parser.add_argument('--sweeps', type=int, default=5000)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    channel_ids = [str(301 + i) for i in range(args.channels)]
+    readings = args.channels * args.sweeps
+    print(f"channels: {args.channels}, sweeps: {args.sweeps} ({readings} readings per transfer)")
+    ascii_bytes, ascii_time, ascii_raw = run('ascii', channel_ids, args.sweeps, args.repeats)
+    for data_format in ('ascii', 'real64', 'real32'):
+        size, elapsed, raw = run(data_format, channel_ids, args.sweeps, args.repeats)
+        error = np.abs(raw - ascii_raw).max()
+        print(f"{data_format:7s} {size / 1e6:8.2f} MB  {elapsed * 1e3:8.2f} ms decode  "
+              f"{readings / elapsed / 1e6:7.2f} M readings/s  "
+              f"{ascii_bytes / size:5.1f}x fewer bytes  {ascii_time / elapsed:6.1f}x faster  "
+              f"max diff {error:.1e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,6 @@
+# daq_reader/headless.py
+import sys
+from src.headless import main
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,145 @@
+import queue
+import threading
+import time
+
+
+class AcquisitionWorker:
+    """Reads the DAQ on a fixed schedule in a background thread.
+
+    Samples are pushed into a bounded queue that the GUI drains at its own
+    frame rate, so slow instrument replies or slow redraws never stretch
+    the sample period of the other side.
+
+    With stream=True the instrument times the sweeps itself (see
+    DAQInterface.start_stream) and the thread only drains its reading
+    memory every poll_interval seconds; the queue then holds StreamBlocks
+    instead of Samples.
+
+    instrumentation, if given, records the duration of every instrument
+    read as the 'daq_read' (or 'stream_read') stage.
+    """
+
+    def __init__(self, daq, channel_ids, interval=0.1, max_queue=10000, stream=False,
+                 poll_interval=0.05, instrumentation=None):
+        self.daq = daq
+        self.channel_ids = list(channel_ids)
+        self.interval = interval
+        self.stream = stream
+        self.poll_interval = poll_interval
+        self.instrumentation = instrumentation
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.start_ns = None
+        self.samples = 0  # Samples successfully read
+        self.dropped = 0  # Samples discarded because the queue was full
+        self.late = 0  # Scheduled ticks missed because a read overran its slot
+        self.failed = 0  # Reads that returned no data
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start sampling. Does nothing if already running."""
+        if self.is_running():
+            return
+        self._stop_event.clear()
+        self.start_ns = time.perf_counter_ns()
+        self._thread = threading.Thread(target=self._run, name="daq-acquisition", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """Stop sampling and wait for the current read to finish."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def drain(self, max_items=None):
+        """Return the queued samples (oldest first) without blocking."""
+        samples = []
+        while max_items is None or len(samples) < max_items:
+            try:
+                samples.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return samples
+
+    def stats(self):
+        return {
+            'samples': self.samples,
+            'dropped': self.dropped,
+            'late': self.late,
+            'failed': self.failed,
+            'queued': self.queue.qsize(),
+        }
+
+    def _put(self, sample):
+        try:
+            self.queue.put_nowait(sample)
+        except queue.Full:
+            # Consumer has fallen behind: drop the oldest sample, keep the newest
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.dropped += 1
+            self.queue.put_nowait(sample)
+
+    def _run(self):
+        if self.stream:
+            self._run_stream()
+            return
+        period_ns = max(int(self.interval * 1e9), 1)
+        next_tick = self.start_ns
+        while not self._stop_event.is_set():
+            # The DAQ stamps each sample with perf_counter_ns() itself
+            start = time.perf_counter_ns()
+            sample = self.daq.read_sample(self.channel_ids)
+            if self.instrumentation is not None:
+                self.instrumentation.record('daq_read', time.perf_counter_ns() - start)
+            if sample is None:
+                self.failed += 1
+            else:
+                self.samples += 1
+                self._put(sample)
+
+            # Stay on the original grid; if the read overran, skip the slots
+            # we missed instead of firing them back to back
+            next_tick += period_ns
+            now = time.perf_counter_ns()
+            if now > next_tick:
+                missed = (now - next_tick) // period_ns + 1
+                self.late += missed
+                next_tick += missed * period_ns
+            self._stop_event.wait((next_tick - now) / 1e9)
+
+    def _run_stream(self):
+        armed = False
+        try:
+            while not self._stop_event.is_set():
+                if not armed:
+                    armed = self.daq.start_stream(self.channel_ids, self.interval)
+                    if not armed:
+                        self.failed += 1
+                        self._stop_event.wait(self.poll_interval)
+                        continue
+                self._stop_event.wait(self.poll_interval)
+                armed = self._drain_stream()  # Re-arm after a failed read
+            if armed:
+                self._drain_stream()  # Sweeps taken since the last poll
+        finally:
+            self.daq.stop_stream()
+
+    def _drain_stream(self):
+        start = time.perf_counter_ns()
+        block = self.daq.read_stream()
+        if self.instrumentation is not None:
+            self.instrumentation.record('stream_read', time.perf_counter_ns() - start)
+        if block is None:
+            self.failed += 1
+            return False
+        if len(block.timestamps_ns):
+            self.samples += len(block.timestamps_ns)
+            self._put(block)
+        return True
@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .acquisition import AcquisitionWorker
+
+
+class AsyncDAQ:
+    """asyncio front end for a DAQInterface (or a MultiDAQ or ReplaySource).
+
+    VISA calls block, so they run on one I/O thread of their own and the
+    event loop awaits them; one thread keeps to one instrument
+    conversation at a time. samples() pipelines a scan: the next READ? is
+    sent as soon as the previous reply is in, and that reply is parsed
+    and handed to the consumer while the next sweep is on the bus.
+    Channels outside the scan list, and instruments without query_scan(),
+    are read with read_sample() on the I/O thread instead.
+
+    timeout (seconds) bounds each await. A call that overruns is given up
+    on and returns None, but the blocking VISA call cannot be interrupted:
+    it finishes in the background, bounded by the VISA timeout, before
+    the next one starts. Cancelling a task that awaits a call cancels the
+    call too if it has not started yet.
+
+    Run it on any asyncio loop: a qasync QEventLoop in the GUI thread, or
+    the loop of an AsyncAcquisitionWorker's thread, which is how the app
+    bridges it to the Qt event loop. Setting stop_event makes a read
+    still waiting for its tick return None straight away.
+    """
+
+    def __init__(self, daq, timeout=None, stop_event=None):
+        self.daq = daq
+        self.timeout = timeout
+        # Setting it (or close()) ends a wait for the next tick at once
+        self.stop_event = stop_event or threading.Event()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="daq-io")
+        self.timeouts = 0  # Calls given up on
+        self.late = 0  # Scheduled ticks samples() missed because a read overran its slot
+        self.read_ns = 0  # How long the last read took on the I/O thread
+
+    def _submit(self, fn, *args):
+        return asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def _wait(self, future):
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            print(f"DAQ call gave no answer within {self.timeout} s")
+            return None
+
+    async def call(self, fn, *args):
+        """Run a blocking DAQ call on the I/O thread; None if it timed out."""
+        return await self._wait(self._submit(fn, *args))
+
+    def _pipelined(self, channel_ids):
+        return hasattr(self.daq, 'query_scan') and channel_ids == getattr(self.daq, 'scan_channels', None)
+
+    def _read(self, pipelined, channel_ids, not_before_ns):
+        """Runs on the I/O thread: wait for the tick, then read."""
+        delay = not_before_ns - time.perf_counter_ns()
+        if delay > 0 and self.stop_event.wait(delay / 1e9):
+            return None
+        start = time.perf_counter_ns()
+        result = self.daq.query_scan() if pipelined else self.daq.read_sample(channel_ids)
+        self.read_ns = time.perf_counter_ns() - start
+        return result
+
+    def _finish(self, channel_ids, pipelined, result):
+        if result is None or not pipelined:
+            return result
+        return self.daq.parse_scan(channel_ids, *result)
+
+    async def read_sample(self, channel_ids):
+        """Read the channels once; returns a Sample or None on failure."""
+        channel_ids = list(channel_ids)
+        pipelined = self._pipelined(channel_ids)
+        result = await self.call(self._read, pipelined, channel_ids, 0)
+        return self._finish(channel_ids, pipelined, result)
+
+    async def samples(self, channel_ids, interval=0.0, count=None):
+        """Async generator of Samples (None for a failed read) every interval seconds, count times.
+
+        Ticks are on a fixed grid from the first read; after a read overruns
+        its slot the missed ticks are skipped (and counted in late). With an
+        interval of 0 the instrument is read back to back.
+        """
+        channel_ids = list(channel_ids)
+        pipelined = self._pipelined(channel_ids)
+        period_ns = int(interval * 1e9)
+        tick = time.perf_counter_ns()
+        pending = self._submit(self._read, pipelined, channel_ids, tick)
+        taken = 0
+        try:
+            while pending is not None:
+                result = await self._wait(pending)
+                taken += 1
+                pending = None
+                if count is None or taken < count:
+                    tick += period_ns
+                    now = time.perf_counter_ns()
+                    if period_ns and now > tick:
+                        missed = (now - tick) // period_ns + 1
+                        self.late += missed
+                        tick += missed * period_ns
+                    # The next sweep goes out before this one is parsed
+                    pending = self._submit(self._read, pipelined, channel_ids, tick)
+                yield self._finish(channel_ids, pipelined, result)
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    def close(self):
+        self.stop_event.set()
+        self.executor.shutdown(wait=False)
+
+
+class AsyncAcquisitionWorker(AcquisitionWorker):
+    """AcquisitionWorker that reads through AsyncDAQ.samples(), so each reply is parsed while the next read is in flight.
+
+    Its thread runs an asyncio event loop and feeds the same queue the GUI
+    drains, which bridges the async I/O to the Qt event loop without
+    qasync. Streaming is unchanged.
+    """
+
+    def __init__(self, daq, channel_ids, timeout=None, **kwargs):
+        super().__init__(daq, channel_ids, **kwargs)
+        self.timeout = timeout
+
+    def _run(self):
+        if self.stream:
+            self._run_stream()
+            return
+        asyncio.run(self._acquire())
+
+    async def _acquire(self):
+        adaq = AsyncDAQ(self.daq, self.timeout, self._stop_event)
+        scan = adaq.samples(self.channel_ids, self.interval)
+        try:
+            async for sample in scan:
+                if sample is None and self._stop_event.is_set():
+                    break  # The read was waiting for its tick
+                if self.instrumentation is not None:
+                    self.instrumentation.record('daq_read', adaq.read_ns)
+                if sample is None:
+                    self.failed += 1
+                else:
+                    self.samples += 1
+                    self._put(sample)
+                self.late = adaq.late
+                if self._stop_event.is_set():
+                    break
+        finally:
+            await scan.aclose()
+            adaq.close()
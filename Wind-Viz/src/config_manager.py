@@ -1,9 +1,29 @@
 import json
 
+
+def parse_graph(spec):
+    """(type, channel ids, options) of one entry in the config's graphs section.
+
+    A list of channel ids is a time-series graph. A dict names the
+    "type" ("time" or "spectrum"), the "channels" and any options for
+    that type, e.g. {"type": "spectrum", "channels": ["305"], "segment": 2048}.
+    """
+    if isinstance(spec, dict):
+        options = dict(spec)
+        kind = options.pop('type', 'time')
+        return kind, list(options.pop('channels', [])), options
+    return 'time', list(spec), {}
+
+
 class ConfigManager:
     def __init__(self, config_path=None):
         self.channels = {}
         self.graphs = {}
+        self.derived = {}  # Optional derived channels, see src/derived.py
+        self.daq = {}  # Optional DAQInterface options, e.g. {"backend": "sim"}
+        self.display = {}  # Optional display options, e.g. {"fps": 30}
+        self.instrumentation = {}  # Optional profiling options, e.g. {"dump": "metrics.jsonl"}
+        self.logging = {}  # Optional log segmenting options, e.g. {"compress": "gzip"}
         if config_path:
             self.load_config(config_path)
 
@@ -11,4 +31,39 @@ class ConfigManager:
         with open(path, 'r') as f:
             config = json.load(f)
             self.channels = config.get('channels', {})
-            self.graphs = config.get('graphs', {})
\ No newline at end of file
+            self.graphs = config.get('graphs', {})
+            self.derived = config.get('derived', {})
+            self.daq = config.get('daq', {})
+            self.display = config.get('display', {})
+            self.instrumentation = config.get('instrumentation', {})
+            self.logging = config.get('logging', {})
+
+    def validate(self):
+        """Raise ValueError for the first entry that cannot be applied.
+
+        Checks the channels' measurements and calibrations, the derived
+        channels, the logging section and the display frame rate without
+        touching the instrument, so a bad config can be refused before any
+        of it is applied.
+        """
+        from .calibration import Calibration
+        from .daq_interface import parse_measurement
+        from .data_logger import check_segmenting
+        from .derived import DerivedChannels
+        for ch, info in self.channels.items():
+            spec = (info or {}).get('measurement')
+            if spec:
+                try:
+                    parse_measurement(spec)
+                except ValueError as e:
+                    raise ValueError(f"Channel {ch}: {e}") from None
+        calibration = Calibration(self.channels)
+        if self.derived:
+            DerivedChannels(self.derived, calibration.channel_ids)
+        try:
+            check_segmenting(**self.logging)
+        except TypeError as e:
+            raise ValueError(f"logging: {e}") from None
+        fps = self.display.get('fps')
+        if fps is not None and (isinstance(fps, bool) or not isinstance(fps, (int, float)) or fps <= 0):
+            raise ValueError(f"display: fps must be a positive number, not {fps!r}")
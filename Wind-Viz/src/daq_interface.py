@@ -1,55 +1,597 @@
+import os
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
 import pyvisa
 
+# One acquisition: time.perf_counter_ns() when the read was issued, the
+# {channel: value} dict, and optionally the instrument's own time stamp for
+# the sweep (seconds; see DAQInterface's instrument_time)
+Sample = namedtuple('Sample', ['timestamp_ns', 'values', 'instrument_time'], defaults=(None,))
+
+# A run of sweeps drained from the instrument's reading memory while
+# streaming: perf_counter_ns of each sweep (n,), readings (channels, n) with
+# rows in channel_ids order, and instrument time stamps (n,) or None
+StreamBlock = namedtuple('StreamBlock', ['channel_ids', 'timestamps_ns', 'raw', 'instrument_times'])
+
+# Environment variable that picks the instrument backend when none is given
+BACKEND_ENV = 'WINDVIZ_DAQ_BACKEND'
+
+# SCPI measurement functions a channel can be configured for, and the ones
+# that integrate (so take NPLC, aperture and autozero settings)
+MEASUREMENT_FUNCTIONS = ('VOLT:DC', 'VOLT:AC', 'CURR:DC', 'CURR:AC', 'RES', 'FRES', 'TEMP', 'FREQ', 'PER')
+INTEGRATING_FUNCTIONS = ('VOLT:DC', 'CURR:DC', 'RES', 'FRES', 'TEMP')
+
+# Reading transfer formats: the FORM:DATA argument and the struct type of
+# one reading in the binary block (None for ASCII text)
+DATA_FORMATS = {'ascii': ('ASC', None), 'real32': ('REAL,32', 'f'), 'real64': ('REAL,64', 'd')}
+
+def parse_measurement(spec):
+    """Check a channel's "measurement" config entry and turn it into SCPI arguments.
+
+        {"function": "TEMP", "transducer": "TC", "type": "K", "nplc": 1, "autozero": "ONCE"}
+        {"function": "VOLT:DC", "range": 10, "nplc": 0.02, "autozero": false}
+
+    Returns (function, configure arguments, sense settings): the arguments
+    CONF and MEAS? take before the channel list, e.g. ('TC', 'K') or
+    ('10',), and a tuple of (SENS subcommand, value) pairs such as
+    ('NPLC', '0.02'). Without a spec the channel measures DC volts on
+    autorange at the instrument's default integration time.
+    """
+    spec = dict(spec or {})
+    function = str(spec.pop('function', 'VOLT:DC')).upper()
+    if function not in MEASUREMENT_FUNCTIONS:
+        raise ValueError(f"Unknown measurement function '{function}'")
+    if function == 'TEMP':
+        arguments = (str(spec.pop('transducer', 'TC')).upper(), str(spec.pop('type', 'K')).upper())
+    else:
+        arguments = (str(spec.pop('range')).upper(),) if 'range' in spec else ()
+
+    settings = []
+    if 'nplc' in spec and 'aperture' in spec:
+        raise ValueError(f"{function}: give nplc or aperture, not both")
+    if 'nplc' in spec:
+        settings.append(('NPLC', f"{float(spec.pop('nplc')):g}"))
+    if 'aperture' in spec:
+        settings.append(('APER', f"{float(spec.pop('aperture')):g}"))
+    if 'autozero' in spec:
+        autozero = spec.pop('autozero')
+        if isinstance(autozero, bool):
+            autozero = 'ON' if autozero else 'OFF'
+        autozero = str(autozero).upper()
+        if autozero not in ('ON', 'OFF', 'ONCE'):
+            raise ValueError(f"{function}: autozero must be ON, OFF or ONCE, not {autozero}")
+        settings.append(('ZERO:AUTO', autozero))
+    if settings and function not in INTEGRATING_FUNCTIONS:
+        raise ValueError(f"{function} has no integration time or autozero setting")
+    if spec:
+        raise ValueError(f"{function}: unknown measurement settings {sorted(spec)}")
+    return function, arguments, tuple(settings)
+
+def open_resource_manager(backend='', simulator=None):
+    """Create the resource manager for a backend name.
+
+    'sim' gives the in-process SimulatedDAQ970A (simulator holds its
+    options: latency, reading_time, signals, seed). Anything else is handed
+    to pyvisa, so '' is the system VISA library and '@py' or '@sim' select
+    pyvisa-py or pyvisa-sim.
+    """
+    if backend == 'sim':
+        from .simulator import SimulatedResourceManager
+        return SimulatedResourceManager(**(simulator or {}))
+    return pyvisa.ResourceManager(backend) if backend else pyvisa.ResourceManager()
+
 class DAQInterface:
-    def __init__(self):
-        self.rm = pyvisa.ResourceManager()
+    """Talks to one DAQ970A over VISA.
+
+    connect() tries the last instrument that answered first and only then
+    enumerates the USB bus, opening each resource with open_timeout ms and
+    accepting it if its *IDN? contains idn_match (any instrument when
+    None). After a lost connection, reads return None straight away while
+    a reconnect attempt runs on its own thread (or inline with
+    background_reconnect=False); failed attempts back off exponentially
+    from reconnect_delay up to max_reconnect_delay seconds.
+
+    Each channel measures what set_measurements() gives it from the
+    config (DC volts by default). The scan setup goes to the instrument
+    once per connection: configure_scan() only writes it again when the
+    channels or their measurements have changed, or after a reconnect.
+
+    data_format 'real64' or 'real32' has readings sent as an IEEE binary
+    block (FORM:DATA REAL) instead of ASCII text. The block is viewed as
+    a NumPy array in place, so thousands of readings cost no Python float
+    each, and half (real64) or a quarter (real32) of the bytes; real32
+    keeps about 7 significant digits.
+    """
+
+    def __init__(self, instrument_time=None, backend=None, simulator=None, idn_match=None,
+                 open_timeout=2000, timeout=2000, background_reconnect=True,
+                 reconnect_delay=0.1, max_reconnect_delay=5.0, data_format='ascii'):
+        # Instrument backend (see open_resource_manager); the environment
+        # variable decides when none is given
+        if backend is None:
+            backend = os.environ.get(BACKEND_ENV, '')
+        self.backend = backend
+        self.rm = open_resource_manager(backend, simulator)
         self.instrument = None
         self.connected = False
+        self.idn_match = idn_match
+        self.open_timeout = open_timeout  # ms to open a resource
+        self.timeout = timeout  # ms VISA I/O timeout once open
+        self.resource_name = None  # Last resource that answered, tried first
+        self.idn = None  # Its *IDN? reply
+        self.background_reconnect = background_reconnect
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._backoff = reconnect_delay
+        self._next_attempt = 0.0  # monotonic() before which no reconnect is tried
+        self._reconnect_thread = None
+        self._io_lock = threading.RLock()  # One instrument conversation at a time
+        self.reconnects = 0  # Connection attempts after a lost connection
+        self.errors = 0  # VISA errors and failed reads
+        self.scan_channels = None  # Channel IDs in the configured scan list
+        self.scan_index = {}  # Channel ID -> position of its reading in a READ? reply
+        self.measurements = {}  # Channel ID -> parse_measurement() result, VOLT:DC when absent
+        self._setup_sent = None  # Scan setup commands the current session has been sent
+        self._format_sent = False  # Whether the current session has the reading format
+        # Ask the DAQ970A to stamp scan readings itself: None (off), 'relative'
+        # (seconds since the scan started) or 'absolute' (its real-time clock)
+        if instrument_time not in (None, 'relative', 'absolute'):
+            raise ValueError(f"instrument_time must be None, 'relative' or 'absolute', not {instrument_time!r}")
+        self.instrument_time = instrument_time
+        if data_format not in DATA_FORMATS:
+            raise ValueError(f"data_format must be one of {sorted(DATA_FORMATS)}, not {data_format!r}")
+        self.data_format = data_format
+        self.streaming = False  # A hardware-timed scan is filling reading memory
+        self.stream_interval = None
+        self.stream_start_ns = None  # perf_counter_ns() when the stream was armed
+        self._stream_sweeps = 0  # Sweeps drained so far
+        self._stream_order = None  # Row of each requested channel within a sweep
         self.connect()
 
     def connect(self):
-        """Connect to the DAQ970A instrument."""
+        """Connect to the DAQ970A instrument. Returns True on success."""
+        self.connected = False
+        if self.resource_name is not None:
+            # Usually the same instrument comes back under the same name
+            if self._open(self.resource_name, expect_idn=self.idn):
+                return True
+
         devices = self.rm.list_resources('USB?*INSTR')
-        
-        if devices:
-            n = 0
-            while True:
-                try:
-                    self.instrument = self.rm.open_resource(devices[n])
-                    self.instrument.clear()
-                    self.instrument.write('*IDN?')
-                    idn = self.instrument.read()
-                    print(f"Connected to: {idn}")
-
-                    #self._configure_instrument()
-                    self.connected = True
-                    return True
-                except pyvisa.errors.VisaIOError:
-                    n += 1
-        else:
+        if not devices:
             print("No USB instruments found")
             return False
+        for name in devices:
+            if name != self.resource_name and self._open(name):
+                return True
+        print("No DAQ970A answered on the USB bus")
+        return False
+
+    def _open(self, name, expect_idn=None):
+        """Open one resource and check its *IDN?; returns True if it is ours."""
+        instrument = None
+        try:
+            instrument = self.rm.open_resource(name, open_timeout=self.open_timeout)
+            instrument.timeout = self.timeout
+            instrument.clear()
+            instrument.write('*IDN?')
+            idn = instrument.read()
+        except pyvisa.errors.VisaIOError:
+            self.errors += 1
+            if instrument is not None:
+                try:
+                    instrument.close()  # Opened but not answering: don't leak the session
+                except Exception:
+                    pass
+            return False
+        if (expect_idn is not None and idn != expect_idn) or \
+                (self.idn_match is not None and self.idn_match not in idn):
+            instrument.close()
+            return False
+        if self.instrument is not None and self.instrument is not instrument:
+            try:
+                self.instrument.close()
+            except Exception:
+                pass  # The old session is usually already dead
+        self.instrument = instrument
+        self.resource_name = name
+        self.idn = idn
+        self._setup_sent = None  # A new session knows nothing of our setup
+        self._format_sent = False
+        print(f"Connected to: {idn}")
+        self.connected = True
+        return True
+
+    def _reconnect(self):
+        """Try to get a lost connection back without blocking the caller.
+
+        Starts at most one attempt at a time, and none before the backoff
+        delay since the last failed one has passed. Returns whether the
+        connection is up now.
+        """
+        if self.connected:
+            return True
+        running = self._reconnect_thread is not None and self._reconnect_thread.is_alive()
+        if running or time.monotonic() < self._next_attempt:
+            return False
+        self.reconnects += 1
+        if not self.background_reconnect:
+            self._reconnect_attempt()
+            return self.connected
+        self._reconnect_thread = threading.Thread(target=self._reconnect_attempt,
+                                                  name="daq-reconnect", daemon=True)
+        self._reconnect_thread.start()
+        return False
+
+    def _reconnect_attempt(self):
+        with self._io_lock:
+            if self.connect() and self.scan_channels is not None:
+                # A fresh connection may have lost the scan setup
+                self.configure_scan(self.scan_channels)
+            if self.connected:
+                self._backoff = self.reconnect_delay
+                return
+            self._next_attempt = time.monotonic() + self._backoff
+            self._backoff = min(self._backoff * 2, self.max_reconnect_delay)
+
+    def wait_connected(self, timeout=None):
+        """Wait for a running background reconnect; returns whether connected."""
+        thread = self._reconnect_thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.connected
+
+    @staticmethod
+    def channel_list(channel_ids):
+        """Build a SCPI channel list, collapsing consecutive channels into ranges.
+
+        ['301', '302', '303', '305'] -> '(@301:303,305)'
+        """
+        numbers = sorted(int(ch) for ch in channel_ids)
+        parts = []
+        start = prev = None
+        for n in numbers:
+            if start is None:
+                start = prev = n
+            elif n == prev + 1:
+                prev = n
+            else:
+                parts.append(f"{start}:{prev}" if prev != start else f"{start}")
+                start = prev = n
+        if start is not None:
+            parts.append(f"{start}:{prev}" if prev != start else f"{start}")
+        return "(@" + ",".join(parts) + ")"
+
+    def set_measurements(self, channels):
+        """Take each channel's measurement setup from the config's channels section.
+
+        Raises ValueError for an invalid "measurement" entry. The setup is
+        sent by the next configure_scan(), and only if it has changed.
+        """
+        measurements = {}
+        for ch, info in channels.items():
+            spec = (info or {}).get('measurement')
+            if spec:
+                try:
+                    measurements[ch] = parse_measurement(spec)
+                except ValueError as e:
+                    raise ValueError(f"Channel {ch}: {e}") from None
+        self.measurements = measurements
+
+    def measurement(self, ch):
+        """(function, configure arguments, sense settings) for a channel."""
+        return self.measurements.get(ch, ('VOLT:DC', (), ()))
+
+    def _configure_groups(self, channel_ids):
+        """Channels that one CONF or MEAS? can cover, as {(function, arguments): channels}.
+
+        Each group's channels are in ascending order, the order the
+        instrument returns their readings in.
+        """
+        groups = {}
+        for ch in sorted(channel_ids, key=int):
+            groups.setdefault(self.measurement(ch)[:2], []).append(ch)
+        return groups
+
+    def configure_scan(self, channel_ids):
+        """Configure every channel once and set up a single scan list.
+
+        After this, read_channels() with the same channel IDs takes one READ?
+        per tick instead of a MEAS? round trip per measurement function.
+        """
+        channel_ids = list(channel_ids)
+        if not channel_ids:
+            self.clear_scan()
+            return False
+
+        self.scan_channels = channel_ids
+        # The instrument returns scan readings in ascending channel order,
+        # whatever order the IDs were given in
+        ordered = sorted(channel_ids, key=int)
+        self.scan_index = {ch: i for i, ch in enumerate(ordered)}
 
-    def read_channels(self, channel_ids):
         if not self.connected:
-            self.connect()
-            if not self.connected:
-                print("No connection to DAQ970A. Skipping data read.")
-                return None  # Return None if connection fails
-        
+            return False
+        try:
+            self._send_scan_setup()
+            return True
+        except Exception as e:
+            print(f"Error configuring scan: {e}")
+            self.connected = False
+            return False
+
+    def clear_scan(self):
+        """Go back to MEAS? reads."""
+        self.scan_channels = None
+        self.scan_index = {}
+
+    def _scan_setup(self):
+        """The commands that set the instrument up for the scan list.
+
+        Channels with the same function and configure arguments share one
+        CONF, and channels with the same setting share one SENS command.
+        Every CONF comes first, as CONF resets the channels' settings.
+        """
+        commands = []
+        for (function, arguments), chs in self._configure_groups(self.scan_channels).items():
+            commands.append(f":CONF:{function} " + ",".join(arguments + (self.channel_list(chs),)))
+        settings = {}
+        for ch in sorted(self.scan_channels, key=int):
+            function, _, sense = self.measurement(ch)
+            for name, value in sense:
+                settings.setdefault((function, name, value), []).append(ch)
+        for (function, name, value), chs in settings.items():
+            commands.append(f":SENS:{function}:{name} {value},{self.channel_list(chs)}")
+        commands.append(":TRIG:SOUR IMM")
+        commands.append(":TRIG:COUN 1")
+        commands.append(f":ROUT:SCAN {self.channel_list(self.scan_channels)}")
+        return tuple(commands)
+
+    def _format_setup(self):
+        """The commands that set the reply format, which MEAS? and READ? both use."""
+        # Readings only: no channel number or units, time stamps only if asked for
+        commands = [":FORM:READ:CHAN OFF"]
+        if self.instrument_time is None:
+            commands.append(":FORM:READ:TIME OFF")
+        else:
+            commands.append(":FORM:READ:TIME ON")
+            commands.append(":FORM:READ:TIME:TYPE " + ("REL" if self.instrument_time == 'relative' else "ABS"))
+        commands.append(":FORM:READ:UNIT OFF")
+        commands.append(":FORM:DATA " + DATA_FORMATS[self.data_format][0])
+        return commands
+
+    def _send_format(self):
+        """Send the reply format once per session, before the first reading."""
+        if self._format_sent:
+            return
+        for command in self._format_setup():
+            self.instrument.write(command)
+        self._format_sent = True
+
+    def _send_scan_setup(self):
+        self._send_format()
+        commands = self._scan_setup()
+        if commands == self._setup_sent:
+            return  # The instrument is already set up like this
+        self._setup_sent = None  # Unknown until every command has gone out
+        for command in commands:
+            self.instrument.write(command)
+        self._setup_sent = commands
+
+    def read_channels(self, channel_ids):
+        """Read the channels once; returns {channel: value} or None on failure."""
+        sample = self.read_sample(channel_ids)
+        return None if sample is None else sample.values
+
+    def read_sample(self, channel_ids):
+        """Read the channels once; returns a time-stamped Sample or None on failure."""
+        if not self._reconnect():
+            print("No connection to DAQ970A. Skipping data read.")
+            return None  # Return None if connection fails
+
+        channel_ids = list(channel_ids)
         data = {}
         try:
-            for ch in channel_ids:
-                # Configure and read (example for DC voltage)
-                self.instrument.write(f":CONF:VOLT:DC (@{ch})")
-                value = float(self.instrument.query(f":MEAS:VOLT:DC? (@{ch})"))
-                data[ch] = value
-            return data
+            with self._io_lock:
+                timestamp = time.perf_counter_ns()
+                if self.scan_channels is not None and channel_ids == self.scan_channels:
+                    if self._setup_sent is None:
+                        self._send_scan_setup()  # A MEAS? since has undone it
+                    data, instrument_time = self._read_scan(channel_ids)
+                    return Sample(timestamp, data, instrument_time)
+                # Outside the scan list: one MEAS? per measurement function.
+                # MEAS? configures the channels itself, at the default
+                # integration time, and answers in ascending channel order.
+                # Time stamps, when on, follow each reading as in a scan.
+                # It also replaces the scan list and the channels' settings,
+                # so the scan setup has to go out again before the next scan.
+                stride = {None: 1, 'relative': 2, 'absolute': 7}[self.instrument_time]
+                self._send_format()
+                self._setup_sent = None
+                for (function, arguments), chs in self._configure_groups(channel_ids).items():
+                    query = f":MEAS:{function}? " + ",".join(arguments + (self.channel_list(chs),))
+                    values = self._readings(query)[::stride]
+                    if len(values) != len(chs):
+                        raise ValueError(f"Expected {len(chs)} readings, got {len(values)}")
+                    data.update(zip(chs, values.tolist()))
+                return Sample(timestamp, {ch: data[ch] for ch in channel_ids})
         except Exception as e:
             print(f"Error reading channels: {e}")
+            self.errors += 1
             self.connected = False  # Mark as disconnected for next attempt
             return None  # Return None on read error
 
+    def start_stream(self, channel_ids, interval, count=None):
+        """Arm a hardware-timed scan that collects into the instrument's memory.
+
+        The DAQ970A sweeps the scan list every interval seconds on its own
+        trigger timer, count times (until stop_stream() when None), so the
+        sample spacing does not depend on the host. Drain the readings with
+        read_stream(). Returns False if the instrument could not be armed.
+        """
+        if not self._reconnect() or not self.configure_scan(channel_ids):
+            print("No connection to DAQ970A. Cannot start streaming.")
+            return False
+        try:
+            self.instrument.write(":TRIG:SOUR TIM")
+            self.instrument.write(f":TRIG:TIM {interval:g}")
+            self.instrument.write(":TRIG:COUN " + ("INF" if count is None else str(int(count))))
+            self.instrument.write(":INIT")
+            self.stream_start_ns = time.perf_counter_ns()
+        except Exception as e:
+            print(f"Error starting stream: {e}")
+            self.connected = False
+            return False
+        self.streaming = True
+        self.stream_interval = interval
+        self._stream_sweeps = 0
+        self._stream_order = np.array([self.scan_index[ch] for ch in self.scan_channels])
+        return True
+
+    def read_stream(self, max_sweeps=None):
+        """Remove every complete sweep from reading memory (at most max_sweeps).
+
+        Returns a StreamBlock, with no sweeps if none were ready yet, or None
+        on failure. Sweep times come from the trigger timer, or from the
+        instrument's own relative time stamps when instrument_time is
+        'relative'.
+        """
+        if not self.streaming:
+            print("Not streaming. Call start_stream() first.")
+            return None
+        n_channels = len(self.scan_index)
+        try:
+            with self._io_lock:
+                sweeps = int(self.instrument.query(":DATA:POIN?")) // n_channels
+                if max_sweeps is not None:
+                    sweeps = min(sweeps, max_sweeps)
+                if sweeps == 0:
+                    return StreamBlock(self.scan_channels, np.empty(0, dtype=np.int64),
+                                       np.empty((n_channels, 0)), None)
+                fields = self._readings(f":DATA:REM? {sweeps * n_channels}")
+            block = self._parse_stream(fields, sweeps)
+        except Exception as e:
+            print(f"Error reading stream: {e}")
+            self.errors += 1
+            self.connected = False
+            self.streaming = False
+            return None
+        self._stream_sweeps += sweeps
+        return block
+
+    def _parse_stream(self, fields, sweeps):
+        stride = {None: 1, 'relative': 2, 'absolute': 7}[self.instrument_time]
+        n_channels = len(self.scan_index)
+        if fields.size != sweeps * n_channels * stride:
+            raise ValueError(f"Expected {sweeps * n_channels} readings, got {fields.size / stride:g}")
+        # One row per reading, then one plane per sweep: (sweeps, channels, stride)
+        fields = fields.reshape(sweeps, n_channels, stride)
+        # Gathered a channel at a time into native float64, with no temporaries
+        raw = np.empty((len(self._stream_order), sweeps))
+        for row, reading in enumerate(self._stream_order):
+            raw[row] = fields[:, reading, 0]
+
+        instrument_times = None
+        offsets = (self._stream_sweeps + np.arange(sweeps)) * self.stream_interval
+        if self.instrument_time == 'relative':
+            instrument_times = fields[:, 0, 1].copy()
+            offsets = instrument_times
+        elif self.instrument_time == 'absolute':
+            instrument_times = np.empty(sweeps)
+            for i, (year, month, day, hour, minute, second) in enumerate(fields[:, 0, 1:]):
+                instrument_times[i] = time.mktime((int(year), int(month), int(day), int(hour),
+                                                   int(minute), int(second), 0, 0, -1))
+                instrument_times[i] += second - int(second)
+        timestamps_ns = self.stream_start_ns + np.round(offsets * 1e9).astype(np.int64)
+        return StreamBlock(self.scan_channels, timestamps_ns, raw, instrument_times)
+
+    def stop_stream(self):
+        """Abort the hardware-timed scan and go back to one sweep per READ?."""
+        if not self.streaming:
+            return
+        self.streaming = False
+        try:
+            self.instrument.write(":ABOR")
+            # Back to one sweep per READ?; the rest of the setup still stands
+            self.instrument.write(":TRIG:SOUR IMM")
+            self.instrument.write(":TRIG:COUN 1")
+        except Exception as e:
+            print(f"Error stopping stream: {e}")
+            self.connected = False
+
+    def query_scan(self):
+        """The I/O half of a scan read: (perf_counter_ns when issued, READ? fields), or None on failure.
+
+        With parse_scan() this is read_sample() for the scan list split in
+        two, so the next sweep can be in flight while a reply is parsed
+        (see AsyncDAQ).
+        """
+        if not self._reconnect():
+            print("No connection to DAQ970A. Skipping data read.")
+            return None
+        try:
+            with self._io_lock:
+                if self._setup_sent is None and self.scan_channels is not None:
+                    self._send_scan_setup()  # A MEAS? since has undone it
+                timestamp = time.perf_counter_ns()
+                return timestamp, self._readings("READ?")
+        except Exception as e:
+            print(f"Error reading channels: {e}")
+            self.errors += 1
+            self.connected = False
+            return None
+
+    def parse_scan(self, channel_ids, timestamp, reply):
+        """Sample from a query_scan() reply, or None (and disconnected) if it was malformed."""
+        try:
+            data, instrument_time = self._parse_scan(reply, channel_ids)
+        except Exception as e:
+            print(f"Error reading channels: {e}")
+            self.errors += 1
+            self.connected = False
+            return None
+        return Sample(timestamp, data, instrument_time)
+
+    def _read_scan(self, channel_ids):
+        """Run one sweep of the scan list and map the readings back to channel IDs.
+
+        Returns the {channel: value} dict and the instrument time stamp of the
+        first reading (None unless instrument_time is set).
+        """
+        return self._parse_scan(self._readings("READ?"), channel_ids)
+
+    def _readings(self, command):
+        """Query readings; returns every field of the reply as a 1-D float array.
+
+        A binary reply is viewed in place by query_binary_values, without
+        per-value Python objects; ASCII text is split and converted.
+        """
+        datatype = DATA_FORMATS[self.data_format][1]
+        if datatype is None:
+            return np.array(self.instrument.query(command).strip().split(','), dtype=np.float64)
+        return self.instrument.query_binary_values(command, datatype=datatype, is_big_endian=True,
+                                                   container=np.array)
+
+    def _parse_scan(self, fields, channel_ids):
+        # With time stamps on, each reading is followed by one relative time
+        # field or six absolute ones (year, month, day, hour, minute, second)
+        stride = {None: 1, 'relative': 2, 'absolute': 7}[self.instrument_time]
+        values = fields[::stride]
+        if len(values) != len(self.scan_index) or len(fields) != stride * len(values):
+            raise ValueError(f"Expected {len(self.scan_index)} readings, got {len(fields) / stride:g}")
+        data = {ch: float(values[self.scan_index[ch]]) for ch in channel_ids}
+        instrument_time = None
+        if self.instrument_time == 'relative':
+            instrument_time = float(fields[1])
+        elif self.instrument_time == 'absolute':
+            year, month, day, hour, minute = (int(f) for f in fields[1:6])
+            second = float(fields[6])
+            instrument_time = time.mktime((year, month, day, hour, minute, int(second), 0, 0, -1))
+            instrument_time += second - int(second)
+        return data, instrument_time
+
     def __del__(self):
         if self.instrument:
-            self.instrument.close()
\ No newline at end of file
+            self.instrument.close()
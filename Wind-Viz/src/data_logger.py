@@ -1,61 +1,625 @@
 import csv
+import gzip
+import importlib.util
+import json
+import os
+import queue
+import shutil
+import struct
+import threading
 import time
 from pathlib import Path
 
+import numpy as np
+
+
+class CsvBackend:
+    """Text log: a human-readable timestamp column plus one column per channel.
+
+    Timestamps are wall-clock time to the microsecond, derived from each
+    sample's perf_counter_ns() stamp via the clock anchor taken at
+    start_logging(), so they share the acquisition clock.
+    """
+
+    extension = '.csv'
+    file_mode = 'w'
+
+    def __init__(self, file, channel_ids, clock, include_raw=False, channels=None,
+                 instrument_time=False, derived=None):
+        self.file = file
+        self.include_raw = include_raw
+        self.instrument_time = instrument_time
+        self.start_ns, self.wall_start_ns = clock
+        self.writer = csv.writer(file)
+        self._time_cache = (None, None)  # (whole second, formatted string)
+        # Write header: Timestamp + channel IDs, then derived channels (no raw columns)
+        header = ['Timestamp'] + [f"Channel {ch}" for ch in channel_ids]
+        header += [f"Derived {d}" for d in (derived or {})]
+        self._derived_gap = (len(channel_ids), [''] * len(derived or {}))  # Blanks in write_rows rows
+        if include_raw:
+            header += [f"Channel {ch} raw" for ch in channel_ids]
+        if instrument_time:
+            header.append('Instrument Time')
+        self.writer.writerow(header)
+
+    def _timestamp(self, timestamp_ns):
+        wall_ns = self.wall_start_ns + (int(timestamp_ns) - self.start_ns)
+        second, ns = divmod(wall_ns, 1_000_000_000)
+        # Date and time of day formatted once per second, microseconds appended
+        cached_second, text = self._time_cache
+        if second != cached_second:
+            text = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+            self._time_cache = (second, text)
+        return f"{text}.{ns // 1000:06d}"
+
+    def write_rows(self, timestamps_ns, rows, instrument_times=None):
+        n, blanks = self._derived_gap
+        if blanks:
+            # Rows from log_data() have no derived values
+            rows = [[*row[:n], *blanks, *row[n:]] for row in rows]
+        if self.instrument_time:
+            rows = [[*row, t] for row, t in zip(rows, instrument_times or [None] * len(rows))]
+        self.writer.writerows([self._timestamp(t), *row] for t, row in zip(timestamps_ns, rows))
+        return len(rows)
+
+    def write_block(self, block):
+        columns = block.values.tolist()
+        if self.include_raw:
+            columns += block.raw.tolist()
+        if self.instrument_time:
+            columns.append(block.instrument_times.tolist() if block.instrument_times is not None
+                           else [None] * block.values.shape[1])
+        stamps = map(self._timestamp, block.timestamps_ns.tolist())
+        self.writer.writerows([stamp, *row] for stamp, row in zip(stamps, zip(*columns)))
+        return block.values.shape[1]
+
+    def flush(self):
+        self.file.flush()
+
+
+class BinaryBackend:
+    """Fixed-width binary log that numpy can memory-map without parsing.
+
+    Layout: an 8-byte magic, a little-endian uint64 giving the total header
+    size, then a JSON header (padded to a multiple of 4096 bytes) with the
+    column names and channel metadata (name, unit, calibration). After the
+    header come float64 records of [time, channels..., derived channels...,
+    raw channels..., instrument_time], appended one block at a time; the
+    derived, raw and instrument_time columns are optional. time is seconds on the
+    acquisition's perf_counter clock since start_logging(), whose wall-clock
+    time is recorded in the header.
+    The row count is implied by the file size, so a file cut short by a
+    crash is still readable up to its last complete record.
+    """
+
+    extension = '.wvlog'
+    file_mode = 'wb'
+    magic = b'WVLOG\x00\x01\x00'
+    alignment = 4096
+
+    def __init__(self, file, channel_ids, clock, include_raw=False, channels=None,
+                 instrument_time=False, derived=None):
+        self.file = file
+        self.include_raw = include_raw
+        self.instrument_time = instrument_time
+        self.start_ns, wall_start_ns = clock
+        channel_ids = [str(ch) for ch in channel_ids]
+        derived = derived or {}
+        columns = ['time'] + channel_ids + list(derived)
+        columns += [f"{ch} raw" for ch in channel_ids] if include_raw else []
+        if instrument_time:
+            columns.append('instrument_time')
+        channels = channels or {}
+        metadata = {
+            'format': 'windviz-log',
+            'version': 1,
+            'dtype': '<f8',
+            'columns': columns,
+            'time': {'unit': 's', 'clock': 'perf_counter', 'start_ns': self.start_ns,
+                     'start_wall_ns': wall_start_ns},
+            'created': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            'channels': {ch: self._channel_metadata(channels.get(ch)) for ch in channel_ids},
+        }
+        if derived:
+            metadata['derived'] = derived
+        self.n_columns = len(columns)
+        self.n_channels = len(channel_ids)
+        self.raw_column = 1 + len(channel_ids) + len(derived)
+        body = json.dumps(metadata).encode('utf-8')
+        size = len(self.magic) + 8 + len(body)
+        size += -size % self.alignment
+        self.header_size = size
+        file.write(self.magic + struct.pack('<Q', size) + body.ljust(size - len(self.magic) - 8, b' '))
+
+    @staticmethod
+    def _channel_metadata(info):
+        if not isinstance(info, dict):
+            return {}
+        meta = {key: info[key] for key in ('name', 'unit', 'type') if key in info}
+        meta['calibration'] = info.get('calibration') or {
+            'type': 'linear',
+            'coefficient': info.get('coefficient', 1),
+            'offset': info.get('offset', 0),
+        }
+        return meta
+
+    def _times(self, timestamps_ns):
+        return (np.asarray(timestamps_ns, dtype=np.int64) - self.start_ns) / 1e9
+
+    def write_rows(self, timestamps_ns, rows, instrument_times=None):
+        values = np.asarray(rows, dtype='<f8')
+        records = np.full((len(rows), self.n_columns), np.nan, dtype='<f8')
+        records[:, 0] = self._times(timestamps_ns)
+        # Rows from log_data() hold channels then raw readings; derived
+        # and missing raw columns stay NaN
+        records[:, 1:1 + min(values.shape[1], self.n_channels)] = values[:, :self.n_channels]
+        raw = values[:, self.n_channels:]
+        records[:, self.raw_column:self.raw_column + raw.shape[1]] = raw
+        if self.instrument_time and instrument_times is not None:
+            records[:, -1] = [np.nan if t is None else t for t in instrument_times]
+        self.file.write(records.tobytes())
+        return len(rows)
+
+    def write_block(self, block):
+        n = block.values.shape[1]
+        records = np.full((n, self.n_columns), np.nan, dtype='<f8')
+        records[:, 0] = self._times(block.timestamps_ns)
+        columns = block.values.shape[0]  # Calibrated then derived channels
+        records[:, 1:1 + columns] = block.values.T
+        if self.include_raw:
+            records[:, 1 + columns:1 + columns + block.raw.shape[0]] = block.raw.T
+        if self.instrument_time and block.instrument_times is not None:
+            records[:, -1] = block.instrument_times
+        self.file.write(records.tobytes())
+        return n
+
+    def flush(self):
+        self.file.flush()
+
+
+BACKENDS = {
+    'csv': CsvBackend,
+    'binary': BinaryBackend,
+}
+
+
+class BinaryLog:
+    """Read-only view of a BinaryBackend log file, memory-mapped."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            magic = f.read(len(BinaryBackend.magic))
+            if magic != BinaryBackend.magic:
+                raise ValueError(f"{self.path} is not a Wind-Viz binary log")
+            (self.header_size,) = struct.unpack('<Q', f.read(8))
+            self.metadata = json.loads(f.read(self.header_size - len(magic) - 8).decode('utf-8'))
+        self.columns = self.metadata['columns']
+        self.channel_ids = list(self.metadata['channels'].keys())
+        self.derived_ids = list(self.metadata.get('derived', {}).keys())
+        n_columns = len(self.columns)
+        rows = (self.path.stat().st_size - self.header_size) // (8 * n_columns)
+        if rows > 0:
+            self.data = np.memmap(self.path, dtype='<f8', mode='r', offset=self.header_size,
+                                  shape=(rows, n_columns))
+        else:
+            self.data = np.empty((0, n_columns), dtype='<f8')
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    @property
+    def times(self):
+        return self.data[:, 0]
+
+    def column(self, name):
+        """One column as a (strided, zero-copy) view, e.g. '301' or '301 raw'."""
+        return self.data[:, self.columns.index(str(name))]
+
+    def export_csv(self, csv_path):
+        """Write the log out as CSV: time in seconds, then every other column."""
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Time (s)'] + [f"Channel {name}" for name in self.columns[1:]])
+            chunk = 65536
+            for start in range(0, len(self), chunk):
+                writer.writerows(self.data[start:start + chunk].tolist())
+
+
+# Segment compression methods and the suffix each adds to the file name
+COMPRESSORS = {'gzip': '.gz', 'zstd': '.zst'}
+
+
+def check_segmenting(max_segment_bytes=None, max_segment_seconds=None, compress=None):
+    """Raise ValueError unless the arguments are valid DataLogger.set_segmenting() settings."""
+    for name, limit in (('max_segment_bytes', max_segment_bytes), ('max_segment_seconds', max_segment_seconds)):
+        if limit is not None and (isinstance(limit, bool) or not isinstance(limit, (int, float)) or limit <= 0):
+            raise ValueError(f"{name} must be a positive number, not {limit!r}")
+    if compress is not None and compress not in COMPRESSORS:
+        raise ValueError(f"Unknown compression '{compress}', expected one of {sorted(COMPRESSORS)}")
+    if compress == 'zstd' and importlib.util.find_spec('zstandard') is None:
+        raise ValueError("zstd compression needs the zstandard package")
+
+
+def compress_file(path, method):
+    """Compress a closed log file next to itself, then remove it; returns the compressed file's path.
+
+    The output is written under a temporary name and renamed when
+    complete, so an interrupted run leaves the original in place. zstd
+    needs the optional zstandard package.
+    """
+    path = Path(path)
+    target = path.with_name(path.name + COMPRESSORS[method])
+    partial = target.with_name(target.name + '.tmp')
+    with open(path, 'rb') as source:
+        if method == 'gzip':
+            with gzip.open(partial, 'wb', compresslevel=6) as out:
+                shutil.copyfileobj(source, out, 1 << 20)
+        else:
+            import zstandard
+            with open(partial, 'wb') as out:
+                zstandard.ZstdCompressor(level=3).copy_stream(source, out)
+    os.replace(partial, target)
+    path.unlink()
+    return target
+
+
 class DataLogger:
-    def __init__(self, log_dir="/logs", filename_prefix="daq_data"):
+    """Logger for acquired samples.
+
+    log_format picks the file backend: 'csv' (default) or 'binary' (see
+    BinaryBackend, readable with BinaryLog).
+
+    By default every row is written and flushed on the calling thread. With
+    threaded=True, log_data()/log_block() only enqueue the values and a
+    writer thread formats and writes them in batches, flushing whenever
+    flush_rows rows or flush_interval seconds have accumulated, and on
+    stop_logging(). A process crash therefore loses at most about
+    flush_interval seconds / flush_rows rows of data. If the writer falls
+    more than max_queue batches behind, further batches are dropped and
+    counted in dropped_rows rather than blocking the caller.
+
+    instrumentation, if given (see src/instrumentation.py), records the
+    'log_write' and 'log_flush' stages, on whichever thread does the writing.
+
+    Every start_logging() opens a file with a fresh name, so no session
+    overwrites another. With max_segment_bytes or max_segment_seconds the
+    session is split into numbered segments (<prefix>_<time>_0001.csv,
+    ...), each a complete log with its own header; a segment is closed at
+    the first flush past either limit. With compress ('gzip' or 'zstd'),
+    closed segments are compressed on a background thread of their own,
+    off the writing path. Either way a <prefix>_<time>.manifest.json lists
+    the session's segments with their rows, time span (seconds since
+    start_logging(), as in BinaryBackend) and sizes.
+    """
+
+    def __init__(self, log_dir="/logs", filename_prefix="daq_data", threaded=False,
+                 flush_interval=1.0, flush_rows=1000, max_queue=10000, log_format='csv',
+                 instrumentation=None, max_segment_bytes=None, max_segment_seconds=None,
+                 compress=None):
+        self.is_logging = False
+        if log_format not in BACKENDS:
+            raise ValueError(f"Unknown log format '{log_format}', expected one of {sorted(BACKENDS)}")
+        self.backend_class = BACKENDS[log_format]
+
         # Ensure log directory exists relative to TEST/
         self.log_dir = Path(log_dir)
         self.log_dir.mkdir(exist_ok=True)
-        
-        # Generate filename with timestamp
-        timestamp = time.strftime("%Y%m%d_%H%M%S")
-        self.filename = self.log_dir / f"{filename_prefix}_{timestamp}.csv"
+
+        # Generate filename with timestamp; start_logging() picks a fresh one per session
+        self.filename_prefix = filename_prefix
+        self.session, self.filename = self._session_paths()
         self.file = None
         self.writer = None
         self.is_logging = False
+        self.include_raw = False
+
+        self.threaded = threaded
+        self.flush_interval = flush_interval
+        self.flush_rows = flush_rows
+        self.max_queue = max_queue
+        self.dropped_rows = 0
+        self.write_errors = 0  # Failed writes and flushes; the rows involved may be lost
+        self.last_error = None  # Message of the latest one
+        self.instrumentation = instrumentation
+        self._queue = None
+        self._writer_thread = None
+
+        self.set_segmenting(max_segment_bytes, max_segment_seconds, compress)
+        self.manifest_path = None
+        self._manifest = None  # The session's manifest, rewritten whenever a segment closes
+        self._manifest_lock = threading.Lock()  # Writer and compressor threads both update it
+        self._segment = None  # Bookkeeping for the open segment
+        self._session_args = None  # Backend arguments, to open the next segment with
+        self._compress_queue = queue.Queue()
+        self._compress_thread = None
 
-    def start_logging(self, channel_ids):
-        """Start logging with channel IDs as headers."""
+    def set_segmenting(self, max_segment_bytes=None, max_segment_seconds=None, compress=None):
+        """Set the segment limits and compression for the next session."""
+        check_segmenting(max_segment_bytes, max_segment_seconds, compress)
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+        self.compress = compress
+
+    @property
+    def segmented(self):
+        return bool(self.max_segment_bytes or self.max_segment_seconds or self.compress)
+
+    def _session_paths(self, segmented=False):
+        """(session name, first file) for a session starting now, never an existing file's name."""
+        extension = self.backend_class.extension
+        stem = f"{self.filename_prefix}_{time.strftime('%Y%m%d_%H%M%S')}"
+        session, n = stem, 1
+        while True:
+            path = self.log_dir / (f"{session}_0001{extension}" if segmented else f"{session}{extension}")
+            if not path.exists() and not (self.log_dir / f"{session}.manifest.json").exists():
+                return session, path
+            n += 1
+            session = f"{stem}_{n}"
+
+    def start_logging(self, channel_ids, include_raw=False, channels=None, instrument_time=False,
+                      derived=None):
+        """Start logging with channel IDs as headers.
+
+        derived is the config's derived channel dict; their values follow
+        the calibrated ones (log_block() only). With include_raw, every row
+        also carries the uncalibrated reading of each channel after those;
+        with instrument_time, the DAQ's own time stamp comes last. channels
+        is the config's channel dict, recorded as metadata by backends that
+        keep it.
+        """
         if self.is_logging:
             print("Already logging. Stop current session first.")
             return
-        
+
         try:
-            self.file = open(self.filename, 'w', newline='')
-            self.writer = csv.writer(self.file)
-            # Write header: Timestamp + channel IDs
-            header = ['Timestamp'] + [f"Channel {ch}" for ch in channel_ids]
-            self.writer.writerow(header)
+            self.session, self.filename = self._session_paths(self.segmented)
+            # Anchor the perf_counter_ns() sample stamps to wall-clock time once
+            clock = (time.perf_counter_ns(), time.time_ns())
+            self._session_args = (list(channel_ids), clock, include_raw, channels, instrument_time, derived)
+            self._open_segment(self.filename)
+            if self.segmented:
+                self.manifest_path = self.log_dir / f"{self.session}.manifest.json"
+                self._manifest = {
+                    'format': 'windviz-log-manifest',
+                    'version': 1,
+                    'session': self.session,
+                    'log_format': next(k for k, v in BACKENDS.items() if v is self.backend_class),
+                    'started': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                    'stopped': None,
+                    'clock': {'start_ns': clock[0], 'start_wall_ns': clock[1]},
+                    'channels': [str(ch) for ch in channel_ids],
+                    'derived': list(derived or {}),
+                    'segments': [],
+                }
+                self._write_manifest(self._manifest, self.manifest_path)
+            self.include_raw = include_raw
             self.is_logging = True
+            if self.threaded:
+                self.file.flush()
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._writer_thread = threading.Thread(target=self._writer_loop,
+                                                       name="data-logger", daemon=True)
+                self._writer_thread.start()
             print(f"Started logging to {self.filename}")
         except Exception as e:
             print(f"Failed to start logging: {e}")
             self.is_logging = False
 
-    def log_data(self, data):
-        """Log a single row of data with a timestamp."""
+    def log_data(self, data, raw=None, timestamp_ns=None, instrument_time=None):
+        """Log a single row of data with a timestamp.
+
+        timestamp_ns is the sample's perf_counter_ns() stamp; if omitted
+        the current time is used.
+        """
         if not self.is_logging or self.writer is None or data is None:
             return
         
         try:
-            # Human-readable timestamp
-            current_time = time.strftime("%Y-%m-%d %H:%M:%S")
-            # Data row: timestamp + values for each channel
-            row = [current_time] + [data[ch] for ch in data.keys()]
-            self.writer.writerow(row)
-            self.file.flush()  # Ensure data is written immediately
+            if timestamp_ns is None:
+                timestamp_ns = time.perf_counter_ns()
+            # Data row: values for each channel
+            row = [data[ch] for ch in data.keys()]
+            if self.include_raw and raw is not None:
+                row += [raw[ch] for ch in raw.keys()]
+            item = ('rows', [timestamp_ns], [row], [instrument_time])
+            if self.threaded:
+                self._enqueue(item)
+                return
+            self._write(item)
+            self._flush()  # Ensure data is written immediately
+        except Exception as e:
+            self._failed(e)
+
+    def log_block(self, block):
+        """Pipeline subscriber: log every sample of a calibrated SampleBlock."""
+        if not self.is_logging or self.writer is None:
+            return
+
+        try:
+            if self.threaded:
+                # Block arrays are read-only, so the writer thread can use them as-is
+                self._enqueue(('block', block))
+                return
+            self._write(('block', block))
+            self._flush()
         except Exception as e:
-            print(f"Error logging data: {e}")
+            self._failed(e)
+
+    def _failed(self, error, doing="logging data"):
+        """Report a failed write or flush and count it in write_errors."""
+        print(f"Error {doing}: {error}")
+        self.write_errors += 1
+        self.last_error = str(error)
+
+    def _write(self, item):
+        """Hand one queued item to the backend; returns the number of rows written."""
+        start = time.perf_counter_ns()
+        if item[0] == 'block':
+            rows = self.writer.write_block(item[1])
+            stamps = item[1].timestamps_ns
+        else:
+            rows = self.writer.write_rows(*item[1:])
+            stamps = item[1]
+        if self.instrumentation is not None:
+            self.instrumentation.record('log_write', time.perf_counter_ns() - start)
+        if rows:
+            segment = self._segment
+            if segment['rows'] == 0:
+                segment['first_ns'] = int(stamps[0])
+            segment['last_ns'] = int(stamps[-1])
+            segment['rows'] += rows
+        return rows
+
+    def _flush(self):
+        start = time.perf_counter_ns()
+        self.writer.flush()
+        if self.instrumentation is not None:
+            self.instrumentation.record('log_flush', time.perf_counter_ns() - start)
+        segment = self._segment
+        if segment['rows'] and (
+                (self.max_segment_bytes and self.file.tell() >= self.max_segment_bytes)
+                or (self.max_segment_seconds
+                    and time.monotonic() - segment['opened'] >= self.max_segment_seconds)):
+            try:
+                self._close_segment()
+                self.filename = self.log_dir / f"{self.session}_{segment['index'] + 1:04d}{self.backend_class.extension}"
+                self._open_segment(self.filename, segment['index'] + 1)
+            except Exception as e:
+                # Rows written before still stand; later ones fail and are counted too
+                self._failed(e, "starting the next log segment")
+                if self.file.closed:
+                    self.file = None  # Already closed and listed; Stop has nothing left to close
+
+    # -- Segments ------------------------------------------------------------
+
+    def _open_segment(self, path, index=1):
+        newline = '' if 'b' not in self.backend_class.file_mode else None
+        self.file = open(path, self.backend_class.file_mode, newline=newline)
+        self.writer = self.backend_class(self.file, *self._session_args)
+        self._segment = {'path': Path(path), 'index': index, 'opened': time.monotonic(), 'rows': 0,
+                         'first_ns': None, 'last_ns': None}
+
+    def _close_segment(self):
+        """Close the open segment, add it to the manifest and queue it for compression."""
+        self.file.close()
+        segment = self._segment
+        if self._manifest is None:
+            return
+        if segment['rows'] == 0 and segment['index'] > 1:
+            segment['path'].unlink()  # Opened by a rotation just before Stop: nothing in it
+            return
+        start_ns = self._session_args[1][0]
+        entry = {
+            'file': segment['path'].name,
+            'rows': segment['rows'],
+            'start': None if segment['first_ns'] is None else (segment['first_ns'] - start_ns) / 1e9,
+            'end': None if segment['last_ns'] is None else (segment['last_ns'] - start_ns) / 1e9,
+            'bytes': segment['path'].stat().st_size,
+            'compressed': None,
+        }
+        with self._manifest_lock:
+            self._manifest['segments'].append(entry)
+            self._write_manifest(self._manifest, self.manifest_path)
+        if self.compress:
+            self._compress_queue.put((segment['path'], self.compress, entry, self._manifest, self.manifest_path))
+            if self._compress_thread is None or not self._compress_thread.is_alive():
+                self._compress_thread = threading.Thread(target=self._compress_loop,
+                                                         name="log-compressor", daemon=True)
+                self._compress_thread.start()
+
+    @staticmethod
+    def _write_manifest(manifest, path):
+        partial = path.with_name(path.name + '.tmp')
+        with open(partial, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(partial, path)
+
+    def _compress_loop(self):
+        """Compress closed segments one at a time, oldest first."""
+        while True:
+            path, method, entry, manifest, manifest_path = self._compress_queue.get()
+            try:
+                target = compress_file(path, method)
+                with self._manifest_lock:
+                    entry['compressed'] = target.name
+                    entry['compressed_bytes'] = target.stat().st_size
+                    self._write_manifest(manifest, manifest_path)
+            except Exception as e:
+                print(f"Error compressing {path}: {e}")
+            finally:
+                self._compress_queue.task_done()
+
+    def wait_compressed(self, timeout=None):
+        """Wait until every closed segment has been compressed; returns whether they all were."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._compress_queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _enqueue(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped_rows += item[1].values.shape[1] if item[0] == 'block' else len(item[2])
+
+    def _writer_loop(self):
+        """Write queued rows in batches until stop_logging() sends None."""
+        rows_queue = self._queue
+        pending = 0
+        last_flush = time.monotonic()
+        while True:
+            timeout = max(self.flush_interval - (time.monotonic() - last_flush), 0)
+            try:
+                item = rows_queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False  # Time budget ran out with nothing new
+            if item is None:
+                break
+            if item:
+                try:
+                    pending += self._write(item)
+                except Exception as e:
+                    self._failed(e)
+            if pending and (pending >= self.flush_rows
+                            or time.monotonic() - last_flush >= self.flush_interval):
+                # A failed flush, e.g. a network drive gone away, must not end
+                # the thread: the queue would fill and stop_logging() wait on it
+                try:
+                    self._flush()
+                except Exception as e:
+                    self._failed(e)
+                pending = 0
+            if not pending:
+                last_flush = time.monotonic()
 
     def stop_logging(self):
         """Stop logging and close the file."""
         if not self.is_logging:
             return
-        
+
         try:
+            if self._writer_thread is not None:
+                # Everything queued before this point still gets written, as
+                # long as the thread is there to take it
+                while self._writer_thread.is_alive():
+                    try:
+                        self._queue.put(None, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                self._writer_thread.join()
+                self._writer_thread = None
+                self._queue = None
             if self.file:
-                self.file.close()
+                self._close_segment()
+            if self._manifest is not None:
+                with self._manifest_lock:
+                    self._manifest['stopped'] = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+                    self._write_manifest(self._manifest, self.manifest_path)
+                self._manifest = None
             self.is_logging = False
             print(f"Stopped logging to {self.filename}")
         except Exception as e:
@@ -66,4 +630,4 @@ class DataLogger:
 
     def __del__(self):
         """Ensure file is closed when object is destroyed."""
-        self.stop_logging()
\ No newline at end of file
+        self.stop_logging()
@@ -0,0 +1,129 @@
+import numpy as np
+
+from .ring_buffer import RingBuffer
+
+
+class MinMaxPyramid:
+    """Full-resolution sample history plus min/max summaries at coarser resolutions.
+
+    Level 0 is a RingBuffer of the raw samples. Level k keeps one (min, max)
+    pair per channel for every factor**k consecutive raw samples, stamped
+    with the time of the bucket's first sample, and is updated as samples
+    arrive. envelope() draws a window from the finest level that has no
+    more buckets than the screen has pixels, so the cost of a redraw does
+    not grow with the window and a one-sample spike stays visible at any
+    zoom.
+    """
+
+    def __init__(self, n_channels, capacity, factor=8):
+        if factor < 2:
+            raise ValueError("factor must be at least 2")
+        self.n_channels = n_channels
+        self.capacity = capacity
+        self.factor = factor
+        self.raw = RingBuffer(n_channels, capacity)
+        self.levels = []  # (mins, maxs) RingBuffers, finest first
+        size = capacity // factor
+        while size >= 2:
+            # One extra slot so a level spans at least the raw history
+            self.levels.append((RingBuffer(n_channels, size + 1), RingBuffer(n_channels, size + 1)))
+            size //= factor
+        self.total = 0  # Samples ever added
+        self._reset_pending()
+
+    def _reset_pending(self):
+        # Inputs of each level that do not fill a whole bucket yet
+        empty = np.empty((self.n_channels, 0))
+        self._pending = [(np.empty(0), empty, empty) for _ in self.levels]
+
+    def __len__(self):
+        return len(self.raw)
+
+    def append(self, timestamp, column):
+        """Add one sample; column holds one value per channel."""
+        self.extend(np.array([timestamp], dtype=np.float64),
+                    np.asarray(column, dtype=np.float64).reshape(self.n_channels, 1))
+
+    def extend(self, timestamps, block):
+        """Add a block of samples: timestamps has shape (n,), block (channels, n)."""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        block = np.asarray(block, dtype=np.float64)
+        if timestamps.shape[0] == 0:
+            return
+        self.raw.extend(timestamps, block)
+        self.total += timestamps.shape[0]
+
+        # Each level's finished buckets are the next level's input
+        times, mins, maxs = timestamps, block, block
+        for i, (level_min, level_max) in enumerate(self.levels):
+            pending_times, pending_min, pending_max = self._pending[i]
+            if pending_times.shape[0]:
+                times = np.concatenate((pending_times, times))
+                mins = np.concatenate((pending_min, mins), axis=1)
+                maxs = np.concatenate((pending_max, maxs), axis=1)
+            complete = times.shape[0] // self.factor * self.factor
+            self._pending[i] = (times[complete:].copy(), mins[:, complete:].copy(),
+                                maxs[:, complete:].copy())
+            if complete == 0:
+                break
+            times = times[:complete:self.factor]
+            mins = mins[:, :complete].reshape(self.n_channels, -1, self.factor).min(axis=2)
+            maxs = maxs[:, :complete].reshape(self.n_channels, -1, self.factor).max(axis=2)
+            level_min.extend(times, mins)
+            level_max.extend(times, maxs)
+
+    def clear(self):
+        self.raw.clear()
+        for level_min, level_max in self.levels:
+            level_min.clear()
+            level_max.clear()
+        self.total = 0
+        self._reset_pending()
+
+    def times(self):
+        """Raw timestamps, oldest first (read-only view)."""
+        return self.raw.times()
+
+    def values(self, channel=None):
+        """Raw values, oldest first, as a (channels, size) view or one channel's row."""
+        return self.raw.values(channel)
+
+    def envelope(self, start, end, pixels):
+        """Points to draw for the time window [start, end] at a width of pixels.
+
+        Returns (times, values) with values shaped (channels, m). When the
+        window holds at most two raw samples per pixel these are the raw
+        samples; otherwise each bucket of the chosen level contributes its
+        min then its max at the bucket's time, which draws the envelope.
+        """
+        raw_times = self.raw.times()
+        lo, hi = np.searchsorted(raw_times, [start, end], side='right')
+        lo = max(lo - 1, 0)  # Keep the sample just before the window so the line enters it
+        if hi - lo <= 2 * pixels or not self.levels:
+            return raw_times[lo:hi], self.raw.values()[:, lo:hi]
+
+        for k, (level_min, level_max) in enumerate(self.levels, 1):
+            times = level_min.times()
+            first, last = np.searchsorted(times, [start, end], side='right')
+            first = max(first - 1, 0)
+            if last - first <= pixels:
+                break
+        mins = level_min.values()[:, first:last]
+        maxs = level_max.values()[:, first:last]
+
+        # Raw samples newer than the level's last whole bucket form one
+        # partial bucket, so the newest data is drawn straight away
+        tail = min(self.total % self.factor ** k, len(self.raw))
+        tail_start = max(len(self.raw) - tail, lo)
+        if tail and tail_start < hi and last == len(times):
+            times = np.append(times[first:last], raw_times[tail_start])
+            tail_values = self.raw.values()[:, tail_start:hi]
+            mins = np.concatenate((mins, tail_values.min(axis=1, keepdims=True)), axis=1)
+            maxs = np.concatenate((maxs, tail_values.max(axis=1, keepdims=True)), axis=1)
+        else:
+            times = times[first:last]
+
+        values = np.empty((self.n_channels, 2 * times.shape[0]))
+        values[:, 0::2] = mins
+        values[:, 1::2] = maxs
+        return np.repeat(times, 2), values
@@ -0,0 +1,197 @@
+import numpy as np
+
+GAS_CONSTANT_AIR = 287.05  # J/(kg K), specific gas constant of dry air
+SEA_LEVEL_DENSITY = 1.225  # kg/m^3
+
+
+class SlidingStats:
+    """Mean and sum of squared deviations over the last `window` samples of one series.
+
+    Sliding-window Welford updates, vectorized per block: a sample x
+    entering while x_old leaves moves the mean by (x - x_old) / window and
+    M2 by (x - x_old) * (x - mean + x_old - mean_prev); until the window
+    fills, the usual growing Welford update applies. Both are running sums,
+    so a block of n samples costs a few numpy passes over n values whatever
+    the window length. The sums are recomputed exactly from the stored
+    window once every `window` samples, so rounding cannot build up.
+    """
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError("window must be at least 1 sample")
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.ring = np.zeros(self.window)  # Sample g is kept at g % window
+        self.total = 0  # Samples seen
+        self.sum = 0.0  # Sum of the samples in the window
+        self.m2 = 0.0  # Sum of squared deviations from the window mean
+        self._since_resync = 0
+
+    def update(self, x):
+        """Add a block of samples; returns (mean, m2, count) after each of them, as arrays."""
+        x = np.asarray(x, dtype=np.float64)
+        n = x.shape[0]
+        w = self.window
+        j = np.arange(n)
+        g = self.total + j
+        full = g >= w  # The window is full, so a sample leaves as this one enters
+
+        # The sample leaving is w samples back: still in the ring, or earlier in this block
+        old = np.zeros(n)
+        from_ring = full & (j < w)
+        old[from_ring] = self.ring[g[from_ring] % w]
+        if n > w:
+            old[w:] = x[:n - w]
+
+        count = np.minimum(g + 1, w)
+        sums = self.sum + np.cumsum(x - old)
+        mean = sums / count
+        mean_prev = np.empty(n)
+        mean_prev[0] = self.sum / min(self.total, w) if self.total else 0.0
+        mean_prev[1:] = mean[:-1]
+        steps = np.where(full, (x - old) * (x - mean + old - mean_prev),
+                         (x - mean_prev) * (x - mean))
+        m2 = self.m2 + np.cumsum(steps)
+
+        keep = min(n, w)
+        self.ring[g[n - keep:] % w] = x[n - keep:]
+        self.sum = sums[-1]
+        self.m2 = m2[-1]
+        self.total += n
+        self._since_resync += n
+        if self.total >= w and self._since_resync >= w:
+            self.sum = self.ring.sum()
+            self.m2 = float(((self.ring - self.sum / w) ** 2).sum())
+            self._since_resync = 0
+        return mean, np.maximum(m2, 0.0), count
+
+
+class DerivedChannels:
+    """Channels computed from calibrated ones, declared in the config's "derived" section.
+
+        "derived": {
+          "q":      {"name": "Dynamic_Pressure", "unit": "Pa", "type": "difference", "inputs": ["301", "302"]},
+          "V":      {"name": "Airspeed", "unit": "m/s", "type": "airspeed", "input": "q", "density": 1.225},
+          "N":      {"name": "Normal_Force", "unit": "N", "type": "linear", "inputs": ["305", "306", "307"],
+                     "weights": [12.1, 0.3, -0.2], "offset": 0},
+          "q_mean": {"type": "mean", "input": "q", "window": 100}
+        }
+
+    Types:
+        difference  inputs [a, b]: a - b, e.g. pitot total minus static pressure
+        linear      sum of weights[i] * inputs[i] plus offset, e.g. one row of a
+                    sting balance's calibration matrix
+        airspeed    sqrt(2 q / rho) from dynamic pressure q (Pa), negative q read as 0;
+                    rho is "density" (kg/m^3, default 1.225) or, given
+                    "static_pressure" (Pa) and "temperature" (C) channels, the ideal gas
+                    density p / (R T)
+        mean, rms, std
+                    over the last "window" samples of input (std is the sample
+                    standard deviation), see SlidingStats
+
+    Inputs are channel ids or derived ids declared earlier. Channels are
+    evaluated in declaration order, and every window statistic on the
+    same input and window shares one SlidingStats.
+    """
+
+    statistics = ('mean', 'rms', 'std')
+
+    def __init__(self, derived, channel_ids):
+        self.derived = derived or {}
+        self.channel_ids = list(channel_ids)
+        self.derived_ids = list(self.derived.keys())
+        self.ids = self.channel_ids + self.derived_ids
+        index = {ch: i for i, ch in enumerate(self.channel_ids)}
+        self._steps = []
+        self._windows = {}  # (input row, window) -> SlidingStats
+        for d_id, spec in self.derived.items():
+            if d_id in index:
+                raise ValueError(f"Derived channel {d_id}: id is already in use")
+
+            def row(ch):
+                if ch not in index:
+                    raise ValueError(f"Derived channel {d_id}: unknown input '{ch}'"
+                                     " (inputs must be channels or earlier derived channels)")
+                return index[ch]
+
+            kind = spec.get('type')
+            out = len(index)
+            if kind == 'difference':
+                inputs = spec.get('inputs', [])
+                if len(inputs) != 2:
+                    raise ValueError(f"Derived channel {d_id}: difference needs two inputs")
+                self._steps.append(('difference', out, (row(inputs[0]), row(inputs[1]))))
+            elif kind == 'linear':
+                rows = [row(ch) for ch in spec.get('inputs', [])]
+                weights = np.asarray(spec.get('weights', [1.0] * len(rows)), dtype=np.float64)
+                if not rows or weights.shape != (len(rows),):
+                    raise ValueError(f"Derived channel {d_id}: linear needs one weight per input")
+                self._steps.append(('linear', out, (np.array(rows, dtype=np.intp), weights[:, None],
+                                                    float(spec.get('offset', 0)))))
+            elif kind == 'airspeed':
+                q = row(spec.get('input'))
+                if 'static_pressure' in spec or 'temperature' in spec:
+                    density = (row(spec.get('static_pressure')), row(spec.get('temperature')))
+                else:
+                    density = float(spec.get('density', SEA_LEVEL_DENSITY))
+                    if density <= 0:
+                        raise ValueError(f"Derived channel {d_id}: density must be positive")
+                self._steps.append(('airspeed', out, (q, density)))
+            elif kind in self.statistics:
+                source, window = row(spec.get('input')), int(spec.get('window', 0))
+                if window < 1:
+                    raise ValueError(f"Derived channel {d_id}: {kind} needs a window of at least 1 sample")
+                stats = self._windows.get((source, window))
+                if stats is None:
+                    stats = self._windows[(source, window)] = SlidingStats(window)
+                self._steps.append((kind, out, (source, stats)))
+            else:
+                raise ValueError(f"Derived channel {d_id}: unknown type '{kind}'")
+            index[d_id] = out
+
+    def __len__(self):
+        return len(self.derived_ids)
+
+    def info(self):
+        """{derived id: channel info} for graphs and logs, with a name and unit for each."""
+        return {d_id: dict(spec, name=spec.get('name', d_id), unit=spec.get('unit', ''))
+                for d_id, spec in self.derived.items()}
+
+    def reset(self):
+        """Forget the window statistics' history, e.g. at the start of a run."""
+        for stats in self._windows.values():
+            stats.reset()
+
+    def apply(self, values):
+        """Append the derived rows to a (channels, n) calibrated block; returns (channels + derived, n)."""
+        values = np.asarray(values, dtype=np.float64)
+        out = np.empty((len(self.ids), values.shape[1]))
+        out[:values.shape[0]] = values
+        computed = {}  # SlidingStats -> (mean, m2, count) for this block
+        for kind, i, params in self._steps:
+            if kind == 'difference':
+                a, b = params
+                np.subtract(out[a], out[b], out=out[i])
+            elif kind == 'linear':
+                rows, weights, offset = params
+                out[i] = (weights * out[rows]).sum(axis=0) + offset
+            elif kind == 'airspeed':
+                q, density = params
+                if isinstance(density, tuple):
+                    pressure, temperature = density
+                    density = out[pressure] / (GAS_CONSTANT_AIR * (out[temperature] + 273.15))
+                np.sqrt(2.0 * np.maximum(out[q], 0.0) / density, out=out[i])
+            else:
+                source, stats = params
+                if stats not in computed:
+                    computed[stats] = stats.update(out[source])
+                mean, m2, count = computed[stats]
+                if kind == 'mean':
+                    out[i] = mean
+                elif kind == 'rms':
+                    np.sqrt(mean * mean + m2 / count, out=out[i])
+                else:
+                    np.sqrt(m2 / np.maximum(count - 1, 1), out=out[i])
+        return out
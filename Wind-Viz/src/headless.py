@@ -0,0 +1,130 @@
+"""Acquire and log without the GUI.
+
+Reads a config file, samples every channel in it for a fixed duration (or
+until Ctrl-C) and logs calibrated and raw values, printing a status line
+every few seconds. Nothing here imports Qt or pyqtgraph, so it starts fast
+and stays small for unattended runs:
+
+    python headless.py config.json --duration 3600 --rate 10 --format binary
+"""
+import argparse
+import sys
+import time
+
+from .acquisition import AcquisitionWorker
+from .async_daq import AsyncAcquisitionWorker
+from .config_manager import ConfigManager
+from .data_logger import DataLogger, BACKENDS
+from .multi_instrument import open_daq
+from .pipeline import SamplePipeline
+
+
+def publish(pipeline, items, start_ns, stream):
+    """Push drained queue items through the pipeline (Samples, or StreamBlocks when streaming)."""
+    if not items:
+        return
+    if not stream:
+        pipeline.publish(items, start_ns)
+        return
+    for block in items:
+        pipeline.publish_block(block.timestamps_ns, block.raw, start_ns, block.instrument_times)
+
+
+def run(config, duration=None, rate=10.0, log_format='csv', log_dir="../logs", stream=None,
+        daq=None, status_interval=5.0, poll_interval=0.1, out=sys.stdout):
+    """Acquire for duration seconds (None: until KeyboardInterrupt) and return a summary dict.
+
+    rate is in samples per second; 0 reads back to back. stream defaults to
+    the config's daq.stream setting. Raises ValueError for an invalid
+    config, before the instrument is set up or a log is started.
+    """
+    config.validate()
+    options = dict(config.daq)
+    config_stream = options.pop('stream', False)
+    options.pop('sample_interval', None)
+    pipelined = options.pop('pipelined', False)
+    stream = config_stream if stream is None else stream
+    interval = 1.0 / rate if rate > 0 else 0.0
+    if daq is None:
+        daq = open_daq(options)
+    channel_ids = list(config.channels.keys())
+
+    daq.set_measurements(config.channels)
+    daq.configure_scan(channel_ids)
+    pipeline = SamplePipeline(config.channels, derived=config.derived)
+    worker_class = AsyncAcquisitionWorker if pipelined else AcquisitionWorker
+    worker = worker_class(daq, channel_ids, interval=interval, stream=stream)
+
+    logger = DataLogger(log_dir=log_dir, threaded=True, log_format=log_format, **config.logging)
+    pipeline.subscribe(logger.log_block)
+    logger.start_logging(channel_ids, include_raw=True, channels=config.channels, derived=config.derived)
+    start = time.monotonic()
+    next_status = start + status_interval
+    worker.start()
+    try:
+        while duration is None or time.monotonic() - start < duration:
+            time.sleep(poll_interval)
+            publish(pipeline, worker.drain(), worker.start_ns, stream)
+            if status_interval and time.monotonic() >= next_status:
+                next_status += status_interval
+                stats = worker.stats()
+                print(f"{time.monotonic() - start:8.1f} s  samples: {stats['samples']}  "
+                      f"dropped: {stats['dropped']}  late: {stats['late']}  "
+                      f"failed: {stats['failed']}  log dropped: {logger.dropped_rows}", file=out)
+    except KeyboardInterrupt:
+        print("Interrupted, stopping", file=out)
+    finally:
+        worker.stop()
+        publish(pipeline, worker.drain(), worker.start_ns, stream)
+        elapsed = time.monotonic() - start
+        logger.stop_logging()
+
+    summary = worker.stats()
+    summary.update({
+        'elapsed': elapsed,
+        'rate': summary['samples'] / elapsed if elapsed > 0 else 0.0,
+        'log_dropped': logger.dropped_rows,
+        'log_file': str(logger.filename),
+    })
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('config', help="channel config (JSON), as loaded by the GUI")
+    parser.add_argument('--duration', type=float, help="seconds to acquire (default: until Ctrl-C)")
+    parser.add_argument('--rate', type=float, default=10.0, help="samples per second, 0 for as fast as possible")
+    parser.add_argument('--format', dest='log_format', choices=sorted(BACKENDS), default='csv')
+    parser.add_argument('--log-dir', default="../logs")
+    parser.add_argument('--stream', action='store_true', default=None,
+                        help="hardware-timed streaming from the instrument's memory")
+    parser.add_argument('--backend', help="instrument backend, e.g. 'sim' (overrides the config)")
+    parser.add_argument('--status-interval', type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    try:
+        config = ConfigManager(args.config)
+    except (OSError, ValueError) as e:
+        print(f"Cannot load {args.config}: {e}")
+        return 1
+    if not config.channels:
+        print(f"No channels in {args.config}")
+        return 1
+    if args.backend is not None:
+        config.daq = dict(config.daq, backend=args.backend)
+
+    try:
+        summary = run(config, args.duration, args.rate, args.log_format, args.log_dir, args.stream,
+                      status_interval=args.status_interval)
+    except (TypeError, ValueError) as e:
+        print(f"Cannot use {args.config}: {e}")
+        return 1
+    print(f"Logged {summary['samples']} samples in {summary['elapsed']:.1f} s "
+          f"({summary['rate']:.1f}/s) to {summary['log_file']}")
+    print(f"Dropped: {summary['dropped']}  Late: {summary['late']}  Failed reads: {summary['failed']}  "
+          f"Log dropped: {summary['log_dropped']}")
+    return 0 if summary['samples'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+
+
+class StageTimer:
+    """Latency histogram for one pipeline stage.
+
+    Durations are binned by power of two nanoseconds (bucket i holds
+    2**(i-1) <= ns < 2**i), so recording one is an int.bit_length() and a
+    list increment; percentiles are read back as the bucket's upper edge.
+    """
+
+    buckets = 48  # 2**47 ns is about 39 hours
+
+    def __init__(self):
+        self.histogram = [0] * self.buckets
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.last_ns = 0
+
+    def record(self, ns):
+        self.histogram[min(ns.bit_length(), self.buckets - 1)] += 1
+        self.count += 1
+        self.total_ns += ns
+        self.last_ns = ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile(self, q):
+        """Upper bound (ns) of the bucket holding the q-th percentile (0-100)."""
+        if not self.count:
+            return 0
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.histogram):
+            seen += n
+            if n and seen >= rank:
+                return min(2 ** i, self.max_ns)
+        return self.max_ns
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total_ns / self.count / 1e6 if self.count else 0.0,
+            'p50_ms': self.percentile(50) / 1e6,
+            'p99_ms': self.percentile(99) / 1e6,
+            'max_ms': self.max_ns / 1e6,
+            'last_ms': self.last_ns / 1e6,
+        }
+
+
+class Instrumentation:
+    """Per-stage timers and counters for the acquisition pipeline.
+
+    Code on the hot path times itself with perf_counter_ns() and calls
+    record(stage, ns); counters kept elsewhere (worker drops, reconnects,
+    VISA errors) are registered once with watch() and only read when a
+    snapshot is taken. snapshot() returns everything as a dict and dump()
+    appends it as one JSON line for offline analysis. With enabled=False,
+    record() returns straight away.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.stages = {}
+        self.counters = {}
+        self._watches = {}
+        self._lock = threading.Lock()  # Stages are recorded from several threads
+
+    def record(self, stage, ns):
+        """Add one duration (nanoseconds) to a stage's histogram."""
+        if not self.enabled:
+            return
+        with self._lock:
+            timer = self.stages.get(stage)
+            if timer is None:
+                timer = self.stages[stage] = StageTimer()
+            timer.record(ns)
+
+    def time(self, stage):
+        """Context manager timing its body as one record() of stage."""
+        return _Timed(self, stage)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def watch(self, name, read):
+        """Report read() as counter name in every snapshot."""
+        self._watches[name] = read
+
+    def stage(self, name):
+        """Summary of one stage, or None if it has not been recorded."""
+        timer = self.stages.get(name)
+        return None if timer is None else timer.summary()
+
+    def snapshot(self):
+        with self._lock:
+            stages = {name: timer.summary() for name, timer in self.stages.items()}
+            counters = dict(self.counters)
+        for name, read in self._watches.items():
+            try:
+                counters[name] = read()
+            except Exception as e:
+                print(f"Error reading counter {name}: {e}")
+        return {'time': time.time(), 'stages': stages, 'counters': counters}
+
+    def dump(self, path):
+        """Append a snapshot to path as one JSON line."""
+        line = json.dumps(self.snapshot())
+        with open(path, 'a') as f:
+            f.write(line + "\n")
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+
+
+class _Timed:
+    def __init__(self, instrumentation, stage):
+        self.instrumentation = instrumentation
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.instrumentation.record(self.stage, time.perf_counter_ns() - self.start)
+        return False
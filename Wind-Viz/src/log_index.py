@@ -0,0 +1,267 @@
+import csv
+import json
+import os
+import struct
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .data_logger import BinaryBackend, BinaryLog
+from .pipeline import SampleBlock
+from .replay import parse_csv_time
+
+
+def csv_to_binary(csv_path, binary_path, chunk_rows=100000):
+    """Convert a CsvBackend log to a BinaryBackend log, chunk_rows rows at a time.
+
+    Times become seconds since the first row; the wall-clock time of the
+    first row is recorded as the log's start.
+    """
+    with open(csv_path, newline='') as src, open(binary_path, 'wb') as out:
+        reader = csv.reader(src)
+        header = next(reader)
+        names = [name[len('Channel '):] if name.startswith('Channel ') else name for name in header[1:]]
+        instrument_time = 'Instrument Time' in names
+        derived = {name[len('Derived '):]: {} for name in names if name.startswith('Derived ')}
+        channel_ids = [name for name in names if name != 'Instrument Time'
+                       and not name.endswith(' raw') and not name.startswith('Derived ')]
+        include_raw = all(f"{ch} raw" in names for ch in channel_ids)
+        # Same row order as a pipeline block: channels then derived, raw separately
+        block_ids = channel_ids + list(derived)
+        value_columns = [names.index(ch) for ch in channel_ids] + [names.index(f"Derived {d}") for d in derived]
+        raw_columns = [names.index(f"{ch} raw") for ch in channel_ids] if include_raw else []
+        backend = None
+        seconds = {}
+        while True:
+            rows = [row for _, row in zip(range(chunk_rows), reader)]
+            if not rows:
+                break
+            times = np.array([parse_csv_time(row[0], seconds) for row in rows])
+            if backend is None:
+                first = times[0]
+                backend = BinaryBackend(out, channel_ids, (0, int(first * 1e9)), include_raw,
+                                        instrument_time=instrument_time, derived=derived)
+            columns = np.array([[float(row[1 + c]) if row[1 + c] else np.nan for c in value_columns + raw_columns]
+                                for row in rows]).reshape(len(rows), -1)
+            instrument_times = None
+            if instrument_time:
+                column = 1 + names.index('Instrument Time')
+                instrument_times = np.array([float(row[column]) if row[column] else np.nan for row in rows])
+            stamps = np.round((times - first) * 1e9).astype(np.int64)
+            values, raw = columns[:, :len(value_columns)].T, columns[:, len(value_columns):].T
+            backend.write_block(SampleBlock(block_ids, stamps, times - first, raw, values, instrument_times))
+        if backend is None:
+            BinaryBackend(out, channel_ids, (0, 0), include_raw, instrument_time=instrument_time,
+                          derived=derived)
+
+
+class LogIndex:
+    """Random access to a logged session for zooming and panning over all of it.
+
+    The log is memory-mapped (a CSV log is first converted to a binary copy
+    beside it, once). A sidecar file beside the log caches a min/max
+    pyramid of every channel: level k holds, for each run of factor**k
+    rows, the time of its first row and each channel's min and max. Every
+    level's times are contiguous, so they double as the time index:
+    finding a time is a binary search that touches a handful of pages.
+    envelope() then reads only the rows or buckets of the visible window,
+    whatever the size of the log.
+
+    The sidecar records the size and modification time of the log it was
+    built from and is rebuilt when they change, e.g. for a log that was
+    still being written.
+    """
+
+    magic = b'WVIDX\x00\x01\x00'
+    extension = '.wvidx'
+    alignment = 4096
+
+    def __init__(self, path, factor=8, chunk_rows=1 << 20, sidecar=None):
+        if factor < 2:
+            raise ValueError("factor must be at least 2")
+        self.path = Path(path)
+        self.factor = factor
+        self.chunk_rows = chunk_rows // factor * factor or factor  # Whole buckets per chunk
+        log_path = self.path
+        if self.path.suffix != BinaryBackend.extension:
+            log_path = Path(f"{self.path}{BinaryBackend.extension}")
+            if not self._fresh(log_path, self._stamp(self.path)):
+                print(f"Converting {self.path} to {log_path}")
+                csv_to_binary(self.path, log_path)
+                os.utime(log_path, ns=(time.time_ns(), self.path.stat().st_mtime_ns))
+        self.log = BinaryLog(log_path)
+        # Logged channels then derived channels, the first columns after time
+        self.channel_ids = self.log.channel_ids + self.log.derived_ids
+        self.channels = dict(self.log.metadata['channels'], **self.log.metadata.get('derived', {}))
+        self.sidecar = Path(sidecar) if sidecar else Path(f"{log_path}{self.extension}")
+        self.levels = self._load() or self._build()
+
+    # -- Sidecar -------------------------------------------------------------
+
+    @staticmethod
+    def _stamp(path):
+        stat = path.stat()
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    @staticmethod
+    def _fresh(path, source_stamp):
+        # Derived files carry the source's mtime (see os.utime above)
+        return path.exists() and path.stat().st_mtime_ns == source_stamp['mtime_ns']
+
+    def _level_sizes(self):
+        sizes = []
+        size = len(self.log)
+        while size > 2:
+            size = -(-size // self.factor)  # Last bucket may be partial
+            sizes.append(size)
+        return sizes
+
+    def _read_header(self):
+        with open(self.sidecar, 'rb') as f:
+            if f.read(len(self.magic)) != self.magic:
+                return None
+            (size,) = struct.unpack('<Q', f.read(8))
+            return json.loads(f.read(size - len(self.magic) - 8).decode('utf-8'))
+
+    def _load(self):
+        """Map the cached pyramid, or return None if it is missing or stale."""
+        if not self.sidecar.exists():
+            return None
+        try:
+            header = self._read_header()
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable index {self.sidecar}: {e}")
+            return None
+        if (header is None or header['source'] != self._stamp(self.log.path)
+                or header['factor'] != self.factor or header['channel_ids'] != self.channel_ids):
+            return None
+        return self._map(self.sidecar, header, 'r')
+
+    def _map(self, path, header, mode):
+        n = len(self.channel_ids)
+        levels = []
+        for level in header['levels']:
+            rows, offset = level['rows'], level['offset']
+            times = np.memmap(path, dtype='<f8', mode=mode, offset=offset, shape=(rows,))
+            offset += 8 * rows
+            mins = np.memmap(path, dtype='<f8', mode=mode, offset=offset, shape=(rows, n))
+            offset += 8 * rows * n
+            maxs = np.memmap(path, dtype='<f8', mode=mode, offset=offset, shape=(rows, n))
+            levels.append((times, mins, maxs))
+        return levels
+
+    def _build(self):
+        """Compute the pyramid chunk by chunk into a fresh sidecar and map it."""
+        n = len(self.channel_ids)
+        header = {'source': self._stamp(self.log.path), 'factor': self.factor,
+                  'channel_ids': self.channel_ids, 'levels': []}
+        body_size = 4096  # Room for the JSON header, grown below if needed
+        while True:
+            offset = body_size
+            header['levels'] = []
+            for rows in self._level_sizes():
+                header['levels'].append({'rows': rows, 'offset': offset})
+                offset += 8 * rows * (1 + 2 * n)
+            body = json.dumps(header).encode('utf-8')
+            if len(self.magic) + 8 + len(body) <= body_size:
+                break
+            body_size += self.alignment
+        if not header['levels']:
+            return []
+
+        temporary = self.sidecar.with_name(self.sidecar.name + '.tmp')
+        try:
+            with open(temporary, 'wb') as f:
+                f.write(self.magic + struct.pack('<Q', body_size) + body.ljust(body_size - len(self.magic) - 8, b' '))
+                f.truncate(offset)
+        except OSError as e:
+            # e.g. a log on a read-only share; keep the index in the temp directory instead
+            fallback = Path(tempfile.gettempdir()) / self.sidecar.name
+            if self.sidecar == fallback:
+                raise
+            print(f"Cannot write {self.sidecar} ({e}), using {fallback}")
+            self.sidecar = fallback
+            return self._load() or self._build()
+        levels = self._map(temporary, header, 'r+')
+        print(f"Indexing {len(self.log)} rows of {self.log.path}")
+
+        data = self.log.data
+        source = (lambda a, b: (data[a:b, 0], data[a:b, 1:1 + n], data[a:b, 1:1 + n]))
+        length = len(self.log)
+        for times, mins, maxs in levels:
+            for start in range(0, length, self.chunk_rows):
+                chunk_times, chunk_mins, chunk_maxs = source(start, start + self.chunk_rows)
+                out = slice(start // self.factor, start // self.factor + -(-len(chunk_times) // self.factor))
+                times[out], mins[out], maxs[out] = self._reduce(chunk_times, chunk_mins, chunk_maxs)
+            times.flush()
+            mins.flush()
+            maxs.flush()
+            source = (lambda t, lo, hi: lambda a, b: (t[a:b], lo[a:b], hi[a:b]))(times, mins, maxs)
+            length = len(times)
+        del levels, times, mins, maxs, source  # Unmap before the rename (required on Windows)
+
+        os.replace(temporary, self.sidecar)
+        return self._map(self.sidecar, header, 'r')
+
+    def _reduce(self, times, mins, maxs):
+        """One level up: first time, min and max of every factor rows (last bucket may be partial)."""
+        whole = len(times) // self.factor * self.factor
+        shape = (-1, self.factor, mins.shape[1])
+        # fmin/fmax skip NaN (missing readings) unless a whole bucket is NaN
+        out_mins = np.fmin.reduce(np.asarray(mins[:whole]).reshape(shape), axis=1)
+        out_maxs = np.fmax.reduce(np.asarray(maxs[:whole]).reshape(shape), axis=1)
+        if whole < len(times):
+            out_mins = np.vstack((out_mins, np.fmin.reduce(mins[whole:], axis=0)))
+            out_maxs = np.vstack((out_maxs, np.fmax.reduce(maxs[whole:], axis=0)))
+        return times[::self.factor], out_mins, out_maxs
+
+    # -- Queries -------------------------------------------------------------
+
+    def __len__(self):
+        return len(self.log)
+
+    @property
+    def start(self):
+        return float(self.log.data[0, 0]) if len(self.log) else 0.0
+
+    @property
+    def end(self):
+        return float(self.log.data[-1, 0]) if len(self.log) else 0.0
+
+    def _search(self, t):
+        """Row index of the first logged row after time t (searchsorted side='right')."""
+        data = self.log.data
+        if not self.levels:
+            return int(np.searchsorted(np.asarray(data[:, 0]), t, side='right'))
+        # The level-1 times bound the row to one bucket; search only that
+        bucket = int(np.searchsorted(self.levels[0][0], t, side='right')) - 1
+        if bucket < 0:
+            return 0
+        lo = bucket * self.factor
+        return lo + int(np.searchsorted(np.asarray(data[lo:lo + self.factor, 0]), t, side='right'))
+
+    def envelope(self, start, end, pixels):
+        """Points to draw for the time window [start, end] at a width of pixels.
+
+        Same contract as MinMaxPyramid.envelope(): (times, values) with
+        values shaped (channels, m), either raw rows or each bucket's min
+        then max at the bucket's time.
+        """
+        n = len(self.channel_ids)
+        lo = max(self._search(start) - 1, 0)  # Keep the row just before the window
+        hi = self._search(end)
+        if hi - lo <= 2 * pixels or not self.levels:
+            rows = np.asarray(self.log.data[lo:hi])
+            return rows[:, 0], rows[:, 1:1 + n].T
+
+        for times, mins, maxs in self.levels:
+            first, last = np.searchsorted(times, [start, end], side='right')
+            first = max(first - 1, 0)
+            if last - first <= pixels:
+                break
+        values = np.empty((n, 2 * (last - first)))
+        values[:, 0::2] = mins[first:last].T
+        values[:, 1::2] = maxs[first:last].T
+        return np.repeat(times[first:last], 2), values
@@ -1,11 +1,21 @@
 import sys
 from PyQt5 import QtWidgets, QtCore
-from .config_manager import ConfigManager
+from .config_manager import ConfigManager, parse_graph
 from .daq_interface import DAQInterface
+from .multi_instrument import open_daq
+import numpy as np
 import pyqtgraph as pg
 import time
 from .plot_widget import PlotWidget
+from .spectrum_widget import SpectrumWidget
 from .data_logger import DataLogger  # Import the new logger
+from .acquisition import AcquisitionWorker
+from .async_daq import AsyncAcquisitionWorker
+from .pipeline import SamplePipeline
+from .render_scheduler import RenderScheduler
+from .instrumentation import Instrumentation
+from .replay import ReplaySource
+from .viewer import LogViewer
 
 class DAQReaderApp(QtWidgets.QMainWindow):
     def __init__(self):
@@ -15,14 +25,48 @@ class DAQReaderApp(QtWidgets.QMainWindow):
 
         self.config = ConfigManager()
         self.daq = DAQInterface()
-        self.logger = DataLogger(log_dir="../logs")  # Logs in TEST/logs/
+        # Per-stage timings and counters, shown in the status bar and optionally
+        # appended as JSON lines to metrics_path every metrics_interval seconds
+        self.metrics = Instrumentation()
+        self.metrics_path = None
+        self.metrics_interval = 5.0
+        self._last_metrics_dump = 0.0
+        self.logger = DataLogger(log_dir="../logs", threaded=True,
+                                 instrumentation=self.metrics)  # Logs in TEST/logs/, written off the GUI thread
         self.measuring = False
+        self.acquisition = None  # Background sampler, created per run
+        self.sample_interval = 0.1  # Seconds between DAQ reads
+        self.stream = False  # Let the instrument time the scan (hardware-timed streaming)
+        self.streaming = False  # Whether the current run hands over StreamBlocks
+        self.replay = None  # Log chosen with Replay Log, played instead of the instrument by the next run
+        self.pipelined = False  # Parse each reply while the next read is in flight (AsyncDAQ)
+        self.frame_interval = 50  # Milliseconds between acquisition queue drains
+        # Redraws graphs at most once per display frame, however fast samples arrive
+        self.renderer = RenderScheduler(fps=30, instrumentation=self.metrics)
+
+        # Calibrates each block once and fans it out to the logger and graphs
+        self.pipeline = SamplePipeline(instrumentation=self.metrics)
+        self.pipeline.subscribe(self.logger.log_block)
+        self.watch_counters()
         
         self.setup_ui()
 
+        # Drains the acquisition queue; never touches the instrument itself
         self.timer = QtCore.QTimer()
         self.timer.timeout.connect(self.update_plots)
 
+    def watch_counters(self):
+        """Include the loss and error counters kept by each component in metrics snapshots."""
+        worker = lambda name: lambda: getattr(self.acquisition, name, 0) if self.acquisition else 0
+        self.metrics.watch('samples_dropped', worker('dropped'))
+        self.metrics.watch('reads_late', worker('late'))
+        self.metrics.watch('reads_failed', worker('failed'))
+        self.metrics.watch('log_rows_dropped', lambda: self.logger.dropped_rows)
+        self.metrics.watch('log_write_errors', lambda: self.logger.write_errors)
+        self.metrics.watch('reconnects', lambda: self.daq.reconnects)
+        self.metrics.watch('visa_errors', lambda: self.daq.errors)
+        self.metrics.watch('frames_dropped', lambda: self.renderer.dropped)
+
     def setup_ui(self):
         central_widget = QtWidgets.QWidget()
         self.setCentralWidget(central_widget)
@@ -49,6 +93,13 @@ class DAQReaderApp(QtWidgets.QMainWindow):
         load_action = QtWidgets.QAction('Load Config', self)
         load_action.triggered.connect(self.load_config)
         file_menu.addAction(load_action)
+        replay_action = QtWidgets.QAction('Replay Log...', self)
+        replay_action.triggered.connect(self.open_replay)
+        file_menu.addAction(replay_action)
+        viewer_action = QtWidgets.QAction('Open Log Viewer...', self)
+        viewer_action.triggered.connect(self.open_viewer)
+        file_menu.addAction(viewer_action)
+        self.viewers = []  # Open LogViewer windows
 
         self.plot_widgets = {}
         graph_types = ["Pressure", "Temperature", "Velocity", "STING"]
@@ -63,8 +114,27 @@ class DAQReaderApp(QtWidgets.QMainWindow):
             QtWidgets.QMessageBox.warning(self, "No Config", "Please load a configuration file first.")
             return
         self.measuring = True
-        self.logger.start_logging(self.config.channels.keys())  # Start logging with channel IDs
-        self.timer.start(100)
+        source = self.daq
+        self.streaming = self.stream
+        if self.replay is not None:
+            # This run plays the log; the instrument is left as it is
+            source = self.replay
+            self.streaming = True  # Rows are handed over in blocks as they fall due
+            if self.replay.calibrated:
+                # Only calibrated values were logged; show them as they are
+                self.pipeline.configure({ch: self.replay.channels[ch] for ch in self.config.channels},
+                                        self.config.derived)
+        source.configure_scan(self.config.channels.keys())  # One scan list for all channels
+        self.pipeline.reset()  # Derived window statistics start with the run
+        self.logger.start_logging(self.config.channels.keys(), include_raw=True,
+                                  channels=self.config.channels,
+                                  derived=self.config.derived)  # Calibrated, derived and raw columns
+        worker = AsyncAcquisitionWorker if self.pipelined else AcquisitionWorker
+        self.acquisition = worker(source, self.config.channels.keys(),
+                                  interval=self.sample_interval, stream=self.streaming,
+                                  instrumentation=self.metrics)
+        self.acquisition.start()
+        self.timer.start(self.frame_interval)
         self.start_button.setEnabled(False)
         self.stop_button.setEnabled(True)
         print("Started measuring")
@@ -72,42 +142,182 @@ class DAQReaderApp(QtWidgets.QMainWindow):
     def stop_measuring(self):
         self.measuring = False
         self.timer.stop()
+        if self.acquisition is not None:
+            self.acquisition.stop()
+            self.process_samples(self.acquisition.drain())  # Keep the tail of the run
         self.logger.stop_logging()  # Stop logging
+        if self.replay is not None:
+            # A replay lasts one run; the next one reads the instrument again
+            if self.replay.calibrated:
+                self.pipeline.configure(self.config.channels, self.config.derived)
+            self.replay.close()
+            self.replay = None
+        if self.metrics_path:
+            self.metrics.dump(self.metrics_path)
         self.start_button.setEnabled(True)
         self.stop_button.setEnabled(False)
         print("Stopped measuring")
 
     def load_config(self):
+        if self.measuring:
+            # The running worker, the graphs and the open log all follow the
+            # current config's channels; a new one waits for Stop
+            QtWidgets.QMessageBox.warning(self, "Load Config", "Stop measuring before loading a config.")
+            return
         file_name, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Open Config", "../", "JSON Files (*.json)")
         if file_name:
-            self.config.load_config(file_name)
+            # Everything is checked before anything is applied, so a bad
+            # config leaves the current one in place
+            config = ConfigManager()
+            try:
+                config.load_config(file_name)
+                config.validate()
+                options = dict(config.daq)
+                stream = options.pop('stream', False)
+                pipelined = options.pop('pipelined', False)
+                sample_interval = options.pop('sample_interval', self.sample_interval)
+                if options:
+                    # Config picks the instrument backend, e.g. the simulator, or
+                    # several mainframes
+                    daq = open_daq(options)
+            except (OSError, TypeError, ValueError) as e:
+                QtWidgets.QMessageBox.warning(self, "Load Config", f"Cannot load {file_name}: {e}")
+                return
+            self.config = config
+            self.stream = stream
+            self.pipelined = pipelined
+            self.sample_interval = sample_interval
+            if options:
+                self.daq = daq
+            # Sent with the next scan setup, and only if it changed
+            self.daq.set_measurements(self.config.channels)
+            # Segment size/length and compression for the next run's log
+            self.logger.set_segmenting(**self.config.logging)
+            self.renderer.set_fps(self.config.display.get('fps', self.renderer.fps))
+            profiling = self.config.instrumentation
+            self.metrics.enabled = profiling.get('enabled', True)
+            self.metrics_path = profiling.get('dump', self.metrics_path)
+            self.metrics_interval = profiling.get('dump_interval', self.metrics_interval)
+            # Compile calibrations and derived channels once per config
+            self.pipeline.configure(self.config.channels, self.config.derived)
             self.update_plot_layout()
 
+    def open_replay(self):
+        """Play a recorded log instead of reading the instrument in the next run."""
+        if self.measuring:
+            return
+        if not self.config.channels:
+            QtWidgets.QMessageBox.warning(self, "No Config", "Please load a configuration file first.")
+            return
+        file_name, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Replay Log", "../logs",
+                                                             "Logs (*.csv *.wvlog)")
+        if not file_name:
+            return
+        speed, ok = QtWidgets.QInputDialog.getDouble(
+            self, "Replay Speed", "Speed (x real time, 0 = as fast as possible):", 1.0, 0.0, 1000.0, 1)
+        if not ok:
+            return
+        replay = ReplaySource(file_name, speed=speed)
+        missing = [ch for ch in self.config.channels if ch not in replay.channel_ids]
+        if missing:
+            replay.close()
+            QtWidgets.QMessageBox.warning(self, "Replay", f"The log has no data for channels {missing}.")
+            return
+        if self.replay is not None:
+            self.replay.close()  # Chosen before but never played
+        self.replay = replay
+        print(f"Replaying {file_name} at {speed or 'full'} speed")
+
+    def open_viewer(self):
+        """Browse a whole recorded log in a separate window, laid out like the loaded config."""
+        file_name, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Open Log", "../logs",
+                                                             "Logs (*.csv *.wvlog)")
+        if not file_name:
+            return
+        try:
+            viewer = LogViewer(file_name, graphs=self.config.graphs, channels=self.config.channels,
+                               fps=self.renderer.fps)
+        except (OSError, ValueError) as e:
+            QtWidgets.QMessageBox.warning(self, "Log Viewer", f"Cannot open {file_name}: {e}")
+            return
+        self.viewers = [v for v in self.viewers if v.isVisible()] + [viewer]
+        viewer.show()
+
     def update_plot_layout(self):
         for i in reversed(range(self.plot_layout.count())):
             self.plot_layout.itemAt(i).widget().setParent(None)
+        for widget in self.plot_widgets.values():
+            if widget:
+                self.pipeline.unsubscribe(widget.add_block)
+                self.renderer.discard(widget)
 
-        positions = [(0, 0), (0, 1), (1, 0), (1, 1)]
-        for i, (g_type, channel_ids) in enumerate(self.config.graphs.items()):
-            channels_to_plot = {ch: self.config.channels[ch] for ch in channel_ids}
-            self.plot_widgets[g_type] = PlotWidget(g_type, channels_to_plot)
-           # print(f"Adding {g_type} at {positions[i]}")
-            self.plot_layout.addWidget(self.plot_widgets[g_type], *positions[i])
+        # Graphs may show derived channels too
+        known = dict(self.config.channels)
+        known.update((d, dict(spec, name=spec.get('name', d))) for d, spec in self.config.derived.items())
+        graph_classes = {'time': PlotWidget, 'spectrum': SpectrumWidget}
+        position = 0
+        for g_type, spec in self.config.graphs.items():
+            kind, channel_ids, options = parse_graph(spec)
+            if kind not in graph_classes:
+                print(f"Graph {g_type}: unknown type '{kind}', expected one of {sorted(graph_classes)}")
+                continue
+            channels_to_plot = {ch: known[ch] for ch in channel_ids}
+            self.plot_widgets[g_type] = graph_classes[kind](g_type, channels_to_plot, **options)
+            self.pipeline.subscribe(self.plot_widgets[g_type].add_block)
+            # Two graphs per row
+            self.plot_layout.addWidget(self.plot_widgets[g_type], position // 2, position % 2)
             self.plot_widgets[g_type].show()
+            position += 1
         self.plot_container.update()
         self.plot_container.show()
 
     def update_plots(self):
-        if not self.measuring or not self.config.channels:
+        if not self.measuring or not self.config.channels or self.acquisition is None:
             return
-        data = self.daq.read_channels(self.config.channels.keys())
-        if data is not None:  # Only log and update if data is valid
-            self.logger.log_data(data)  # Log the data
-            for g_type, widget in self.plot_widgets.items():
-                if widget:
-                    widget.update_plot(data)
-        self.centralWidget().repaint()
-        self.repaint()
+        start = time.perf_counter_ns()
+        self.process_samples(self.acquisition.drain())
+        self.metrics.record('frame', time.perf_counter_ns() - start)
+        if self.replay is not None and self.replay.finished:
+            self.stop_measuring()  # End of the recording
+            return
+        stats = self.acquisition.stats()
+        render = self.renderer.stats()
+        read = self.metrics.stage('stream_read' if self.streaming else 'daq_read')
+        self.statusBar().showMessage(
+            f"Samples: {stats['samples']}  Dropped: {stats['dropped']}  "
+            f"Late: {stats['late']}  Failed reads: {stats['failed']}  "
+            f"Read p50: {read['p50_ms'] if read else 0:.1f} ms  "
+            f"Reconnects: {self.daq.reconnects}  VISA errors: {self.daq.errors}  "
+            f"Render: {render['render_ms_avg']:.1f} ms/frame  Dropped frames: {render['dropped']}"
+            + (f"  Log errors: {self.logger.write_errors} ({self.logger.last_error})"
+               if self.logger.write_errors else ""))
+        now = time.monotonic()
+        if self.metrics_path and now - self._last_metrics_dump >= self.metrics_interval:
+            self.metrics.dump(self.metrics_path)
+            self._last_metrics_dump = now
+
+    def process_samples(self, samples):
+        """Publish queued samples through the pipeline and mark the graphs for the next frame."""
+        if not samples:
+            return
+        if self.streaming:
+            # Already arrays: join the drained StreamBlocks into one block
+            self.pipeline.publish_block(
+                np.concatenate([b.timestamps_ns for b in samples]),
+                np.concatenate([b.raw for b in samples], axis=1),
+                self.acquisition.start_ns,
+                None if samples[0].instrument_times is None else
+                np.concatenate([b.instrument_times for b in samples]))
+        else:
+            self.pipeline.publish(samples, self.acquisition.start_ns)
+        for widget in self.plot_widgets.values():
+            if widget:
+                self.renderer.mark_dirty(widget)
+
+    def closeEvent(self, event):
+        if self.measuring:
+            self.stop_measuring()
+        super().closeEvent(event)
 
 if __name__ == '__main__':
     app = QtWidgets.QApplication(sys.argv)
@@ -0,0 +1,242 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .daq_interface import DAQInterface, Sample, StreamBlock
+
+
+def open_daq(options):
+    """The instrument for the config's daq section: a MultiDAQ when it lists "instruments", else a DAQInterface."""
+    options = dict(options)
+    instruments = options.pop('instruments', None)
+    if instruments:
+        return MultiDAQ(instruments, **options)
+    return DAQInterface(**options)
+
+
+class MultiDAQ:
+    """Several DAQ970A mainframes read as one instrument, a drop-in for DAQInterface.
+
+        "daq": {
+          "instruments": {
+            "main":    {"idn_match": "MY59001234"},
+            "balance": {"idn_match": "MY59005678", "instrument_time": "relative"}
+          }
+        }
+
+    instruments maps a name to that mainframe's DAQInterface options;
+    options outside it (backend, timeouts, ...) apply to every mainframe.
+    Each needs an idn_match, e.g. its serial number, so they are told
+    apart. A channel goes to the mainframe named by its "instrument"
+    entry, the first one by default, and is read there as its "channel"
+    entry (its id by default), so two mainframes can share channel numbers:
+
+        "B101": {"name": "Balance_1", "instrument": "balance", "channel": "101"}
+
+    Every mainframe has its own worker thread, so one read or stream poll
+    takes about as long as the slowest mainframe rather than the sum.
+    Samples read together form one frame, stamped when the reads were
+    issued. Streams run on each mainframe's own timer and are joined sweep
+    by sweep: a sweep of the first mainframe is matched to the nearest
+    sweep of each other one within half an interval, and dropped (counted
+    in unmatched) if some mainframe has none.
+    """
+
+    def __init__(self, instruments, **options):
+        if not instruments:
+            raise ValueError("MultiDAQ needs at least one instrument")
+        if len(instruments) > 1:
+            missing = [name for name, opts in instruments.items() if not (opts or {}).get('idn_match')]
+            if missing:
+                raise ValueError(f"Instruments {missing} need an idn_match to tell them apart")
+        self.names = list(instruments.keys())
+        self.executor = ThreadPoolExecutor(max_workers=len(self.names), thread_name_prefix="daq-device")
+        self.devices = dict(zip(self.names, self._each(
+            lambda name: DAQInterface(**dict(options, **(instruments[name] or {}))), self.names)))
+        self.routes = {}  # Channel ID -> (instrument name, channel on that instrument)
+        self.scan_channels = None
+        self.streaming = False
+        self.stream_interval = None
+        self.skew_ns = 0  # Spread of the read times of the last frame
+        self.unmatched = 0  # Stream sweeps dropped for lack of a partner on every mainframe
+        self._pending = {}  # Instrument name -> (timestamps_ns, raw, instrument_times) not yet joined
+
+    def _each(self, fn, names):
+        """fn(name) for every instrument in names, on their worker threads; results in order."""
+        return list(self.executor.map(fn, names))
+
+    # -- DAQInterface interface ------------------------------------------------
+
+    @property
+    def connected(self):
+        return all(device.connected for device in self.devices.values())
+
+    @property
+    def reconnects(self):
+        return sum(device.reconnects for device in self.devices.values())
+
+    @property
+    def errors(self):
+        return sum(device.errors for device in self.devices.values())
+
+    def wait_connected(self, timeout=None):
+        return all(device.wait_connected(timeout) for device in self.devices.values())
+
+    def route(self, ch):
+        """(instrument name, channel on that instrument) for a channel ID."""
+        return self.routes.get(ch, (self.names[0], ch))
+
+    def set_measurements(self, channels):
+        """Take each channel's instrument, channel and measurement setup from the config."""
+        routes = {}
+        per_device = {name: {} for name in self.names}
+        for ch, info in channels.items():
+            info = info or {}
+            name = info.get('instrument', self.names[0])
+            if name not in self.devices:
+                raise ValueError(f"Channel {ch}: unknown instrument '{name}'")
+            device_ch = str(info.get('channel', ch))
+            if device_ch in per_device[name]:
+                raise ValueError(f"Channel {ch}: {name} channel {device_ch} is already in use")
+            routes[ch] = (name, device_ch)
+            per_device[name][device_ch] = info
+        for name, device in self.devices.items():
+            device.set_measurements(per_device[name])
+        self.routes = routes
+
+    def _split(self, channel_ids):
+        """{instrument name: its channels in the order given}, instruments in config order."""
+        split = {name: [] for name in self.names}
+        for ch in channel_ids:
+            name, device_ch = self.route(ch)
+            split[name].append(device_ch)
+        return {name: chs for name, chs in split.items() if chs}
+
+    def configure_scan(self, channel_ids):
+        channel_ids = list(channel_ids)
+        if not channel_ids:
+            self.clear_scan()
+            return False
+        self.scan_channels = channel_ids
+        split = self._split(channel_ids)
+        return all(self._each(lambda name: self.devices[name].configure_scan(split[name]), list(split)))
+
+    def clear_scan(self):
+        self.scan_channels = None
+        for device in self.devices.values():
+            device.clear_scan()
+
+    def read_channels(self, channel_ids):
+        sample = self.read_sample(channel_ids)
+        return None if sample is None else sample.values
+
+    def read_sample(self, channel_ids):
+        """Read every mainframe at once; returns one Sample for all the channels, or None if any read failed."""
+        channel_ids = list(channel_ids)
+        split = self._split(channel_ids)
+        names = list(split)
+        samples = dict(zip(names, self._each(lambda name: self.devices[name].read_sample(split[name]), names)))
+        if any(sample is None for sample in samples.values()):
+            return None
+        stamps = [sample.timestamp_ns for sample in samples.values()]
+        self.skew_ns = max(stamps) - min(stamps)
+        values = {}
+        for ch in channel_ids:
+            name, device_ch = self.route(ch)
+            values[ch] = samples[name].values[device_ch]
+        return Sample(min(stamps), values, samples[names[0]].instrument_time)
+
+    def start_stream(self, channel_ids, interval, count=None):
+        """Arm every mainframe's hardware-timed scan; False (with none left running) if any failed."""
+        channel_ids = list(channel_ids)
+        split = self._split(channel_ids)
+        names = list(split)
+        armed = self._each(lambda name: self.devices[name].start_stream(split[name], interval, count), names)
+        if not all(armed):
+            self._each(lambda name: self.devices[name].stop_stream(), names)
+            return False
+        self.scan_channels = channel_ids
+        self.streaming = True
+        self.stream_interval = interval
+        self._stream_names = names
+        self._stream_rows = self._rows(channel_ids, split)
+        self._pending = {name: (np.empty(0, dtype=np.int64), np.empty((len(split[name]), 0)), None)
+                         for name in names}
+        return True
+
+    def _rows(self, channel_ids, split):
+        """(instrument name, row in its stream blocks) for each channel, in order."""
+        rows = []
+        for ch in channel_ids:
+            name, device_ch = self.route(ch)
+            rows.append((name, split[name].index(device_ch)))
+        return rows
+
+    def read_stream(self, max_sweeps=None):
+        """Drain every mainframe and return the sweeps that could be joined so far as one StreamBlock."""
+        if not self.streaming:
+            print("Not streaming. Call start_stream() first.")
+            return None
+        names = self._stream_names
+        blocks = self._each(lambda name: self.devices[name].read_stream(max_sweeps), names)
+        if any(block is None for block in blocks):
+            self.streaming = False
+            return None
+        for name, block in zip(names, blocks):
+            times, raw, instrument_times = self._pending[name]
+            if block.instrument_times is not None:
+                previous = instrument_times if instrument_times is not None else np.empty(0)
+                instrument_times = np.concatenate([previous, block.instrument_times])
+            self._pending[name] = (np.concatenate([times, block.timestamps_ns]),
+                                   np.concatenate([raw, block.raw], axis=1), instrument_times)
+        return self._join()
+
+    def _join(self):
+        """Match the pending sweeps of the first mainframe to the others' and take the decided ones off."""
+        names = self._stream_names
+        tolerance = int(self.stream_interval * 1e9) // 2
+        times, raw, instrument_times = self._pending[names[0]]
+        # A sweep is decided once every mainframe has sweeps past it
+        horizon = min(self._pending[name][0][-1] if len(self._pending[name][0]) else -1 for name in names)
+        decided = int(np.searchsorted(times, horizon, side='right'))
+        keep = np.ones(decided, dtype=bool)
+        matches = {names[0]: np.arange(decided)}
+        for name in names[1:]:
+            other = self._pending[name][0]
+            if not len(other):
+                # Nothing to match yet; then nothing is decided either
+                keep[:] = False
+                matches[name] = np.zeros(decided, dtype=int)
+                continue
+            right = np.clip(np.searchsorted(other, times[:decided]), 0, len(other) - 1)
+            left = np.clip(right - 1, 0, len(other) - 1)
+            nearest = np.where(np.abs(other[left] - times[:decided]) <= np.abs(other[right] - times[:decided]),
+                               left, right)
+            keep &= np.abs(other[nearest] - times[:decided]) <= tolerance
+            matches[name] = nearest
+        self.unmatched += int(decided - keep.sum())
+
+        block_raw = np.empty((len(self._stream_rows), int(keep.sum())))
+        for i, (name, row) in enumerate(self._stream_rows):
+            block_raw[i] = self._pending[name][1][row, matches[name][keep]]
+        block = StreamBlock(self.scan_channels, times[:decided][keep], block_raw,
+                            None if instrument_times is None else instrument_times[:decided][keep])
+
+        # Sweeps too early to match any later sweep of the first mainframe are done with
+        cutoff = times[decided - 1] + tolerance if decided else None
+        for name in names:
+            p_times, p_raw, p_instrument = self._pending[name]
+            done = decided if name == names[0] else (
+                0 if cutoff is None else int(np.searchsorted(p_times, cutoff)))
+            self._pending[name] = (p_times[done:], p_raw[:, done:],
+                                   None if p_instrument is None else p_instrument[done:])
+        return block
+
+    def stop_stream(self):
+        if not self.streaming:
+            return
+        self.streaming = False
+        self._each(lambda name: self.devices[name].stop_stream(), list(self.devices))
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,107 @@
+from collections import namedtuple
+
+import time
+
+import numpy as np
+
+from .calibration import Calibration
+from .derived import DerivedChannels
+
+# A run of consecutive samples, shared read-only by every subscriber.
+# timestamps_ns: (n,) int64 perf_counter_ns of each read
+# times: (n,) float64 seconds since the start of the run, from timestamps_ns
+# raw: (channels, n) float64, the measured channels' readings in channel order
+# values: (len(channel_ids), n) float64, calibrated channels then any derived channels
+# instrument_times: (n,) float64 instrument time stamps (NaN where missing), or None
+SampleBlock = namedtuple('SampleBlock', ['channel_ids', 'timestamps_ns', 'times', 'raw', 'values',
+                                         'instrument_times'], defaults=(None,))
+
+
+class SamplePipeline:
+    """Single calibration stage between the DAQ and everything that consumes samples.
+
+    Each block of raw samples is calibrated exactly once, derived channels
+    (see DerivedChannels) are appended to it, and the resulting
+    SampleBlock is handed to every subscriber (graphs, logger, ...). All
+    subscribers get the same arrays; they are marked read-only so nobody
+    can change what the others see.
+
+    instrumentation, if given, records the 'calibrate' and 'derive' stages
+    and one 'deliver:<subscriber>' stage per subscriber for every block.
+    """
+
+    def __init__(self, channels=None, instrumentation=None, derived=None):
+        self.subscribers = []
+        self.instrumentation = instrumentation
+        self.configure(channels or {}, derived)
+
+    def configure(self, channels, derived=None):
+        """Compile the calibration and derived channels for a newly loaded config."""
+        self.calibration = Calibration(channels)
+        self.channel_ids = self.calibration.channel_ids  # Measured channels, the rows of raw
+        self.derived = DerivedChannels(derived, self.channel_ids) if derived else None
+        self.block_ids = self.derived.ids if self.derived else self.channel_ids
+
+    def reset(self):
+        """Start derived window statistics afresh, e.g. for a new run."""
+        if self.derived:
+            self.derived.reset()
+
+    def subscribe(self, callback):
+        """Call callback(block) for every published block. Returns the callback."""
+        if callback not in self.subscribers:
+            self.subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def publish(self, samples, start_ns=0):
+        """Calibrate a list of acquisition Samples and fan them out as one block."""
+        if not samples:
+            return None
+        channel_ids = self.channel_ids
+        timestamps_ns = np.fromiter((s.timestamp_ns for s in samples), dtype=np.int64, count=len(samples))
+        raw = np.array([[s.values[ch] for ch in channel_ids] for s in samples], dtype=np.float64).T
+        instrument_times = None
+        if any(s.instrument_time is not None for s in samples):
+            instrument_times = np.array([np.nan if s.instrument_time is None else s.instrument_time
+                                         for s in samples])
+        return self.publish_block(timestamps_ns, raw, start_ns, instrument_times)
+
+    def publish_block(self, timestamps_ns, raw, start_ns=0, instrument_times=None):
+        """Calibrate a (channels, n) raw block and fan it out.
+
+        The arrays are shared with subscribers and made read-only, so the
+        caller should not reuse raw afterwards.
+        """
+        timestamps_ns = np.asarray(timestamps_ns, dtype=np.int64)
+        raw = np.ascontiguousarray(raw, dtype=np.float64)
+        times = (timestamps_ns - start_ns) / 1e9
+        start = time.perf_counter_ns()
+        values = self.calibration.apply(raw)
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            instrumentation.record('calibrate', time.perf_counter_ns() - start)
+        if self.derived:
+            start = time.perf_counter_ns()
+            values = self.derived.apply(values)
+            if instrumentation is not None:
+                instrumentation.record('derive', time.perf_counter_ns() - start)
+        arrays = [timestamps_ns, times, raw, values]
+        if instrument_times is not None:
+            instrument_times = np.asarray(instrument_times, dtype=np.float64)
+            arrays.append(instrument_times)
+        for array in arrays:
+            array.flags.writeable = False
+        block = SampleBlock(self.block_ids, timestamps_ns, times, raw, values, instrument_times)
+        for callback in list(self.subscribers):
+            if instrumentation is None:
+                callback(block)
+                continue
+            start = time.perf_counter_ns()
+            callback(block)
+            instrumentation.record('deliver:' + getattr(callback, '__qualname__', repr(callback)),
+                                   time.perf_counter_ns() - start)
+        return block
@@ -1,17 +1,33 @@
 from PyQt5 import QtWidgets
 import pyqtgraph as pg
 import time
+from .decimation import MinMaxPyramid
 
 class PlotWidget(QtWidgets.QWidget):
-    def __init__(self, title, channels, parent=None):
+    """Time-series graph of the latest window seconds of its channels.
+
+    window comes from the graph's "window" option in the config (5 s by
+    default) and may be as long as history_points samples cover. The x
+    range follows the newest sample until the user pans or zooms; the
+    graph then stays where it was put, still drawing from history, until
+    a double click makes it follow again.
+    """
+
+    def __init__(self, title, channels, parent=None, max_points=50, history_points=200000,
+                 window=None):
         super().__init__(parent)
         self.channels = channels
         self.channel_ids = list(channels.keys())
-        self.max_points = 50
+        self.max_points = max_points
         self.update_interval = 0.1
-        
-        self.data = {ch: [] for ch in self.channel_ids}
-        self.times = []
+        # Seconds shown, newest last
+        self.window = window if window is not None else self.max_points * self.update_interval
+        self.follow = True  # Keep the newest sample in view; off once the user pans or zooms
+
+        # Full-resolution history, one row per channel in channel_ids order,
+        # with min/max summaries so long windows draw at a fixed cost
+        self.history = MinMaxPyramid(len(self.channel_ids), max(history_points, max_points))
+        self._block_rows = (None, None)  # (block channel_ids, row indices) cache
         self.start_time = None
         
         layout = QtWidgets.QVBoxLayout()
@@ -33,47 +49,73 @@ class PlotWidget(QtWidgets.QWidget):
             self.curves[ch_id] = self.plot_widget.plot(pen=pg.mkPen(color, width=2), 
                                                        name=ch_info['name'])
         
-        self.plot_widget.setXRange(0, self.max_points * self.update_interval, padding=0)
+        self.plot_widget.setXRange(0, self.window, padding=0)
         self.plot_widget.enableAutoRange('y', True)
+        self.plot_widget.getViewBox().sigRangeChangedManually.connect(self._range_changed_manually)
+        self.plot_widget.scene().sigMouseClicked.connect(self._mouse_clicked)
+
+    def _range_changed_manually(self, *args):
+        self.follow = False
+
+    def _mouse_clicked(self, event):
+        if event.double():
+            self.follow = True
+            self.refresh()
 
-    def update_plot(self, new_data):
+    def update_plot(self, new_data, timestamp=None):
+        """Append one calibrated sample and redraw straight away."""
         if new_data is None:
             print("No valid data received. Plot update skipped.")
             return
-        
-        if self.start_time is None:
-            self.start_time = time.time()
-        
-        current_time = time.time() - self.start_time
-        
-        self.times.append(current_time)
-        
-        # Apply coefficient and offset (y = mx + b) to each channel's data
-        for ch_id in self.channel_ids:
-            # Get raw value from DAQ
-            raw_value = new_data[ch_id]
-            # Get coefficient and offset from channel config, converting to float
-            m = float(self.channels[ch_id]['coefficient'])
-            b = float(self.channels[ch_id]['offset'])
-            # Apply transformation: y = mx + b
-            transformed_value = (m * raw_value) + b
-            # Store the transformed value
-            self.data[ch_id].append(transformed_value)
-        
-        # Trim data if exceeding max_points
-        if len(self.times) > self.max_points:
-            self.times.pop(0)
-            for ch_id in self.channel_ids:
-                self.data[ch_id].pop(0)
-        
-        # Update plot curves with transformed data
-        for ch_id in self.channel_ids:
-            self.curves[ch_id].setData(self.times, self.data[ch_id])
-        
+        self.add_sample(new_data, timestamp)
+        self.refresh()
+
+    def add_sample(self, new_data, timestamp=None):
+        """Append one {channel: calibrated value} sample without redrawing.
+
+        timestamp is seconds since the start of the run; if omitted it is
+        taken from perf_counter(), the clock the acquisition stamps use.
+        """
+        if new_data is None:
+            return
+
+        if timestamp is None:
+            if self.start_time is None:
+                self.start_time = time.perf_counter()
+            timestamp = time.perf_counter() - self.start_time
+
+        self.history.append(timestamp, [new_data[ch_id] for ch_id in self.channel_ids])
+
+    def add_block(self, block):
+        """Pipeline subscriber: append this graph's rows of a calibrated SampleBlock."""
+        channel_ids, rows = self._block_rows
+        if channel_ids is not block.channel_ids:
+            index = {ch: i for i, ch in enumerate(block.channel_ids)}
+            rows = [index[ch] for ch in self.channel_ids]
+            self._block_rows = (block.channel_ids, rows)
+        self.history.extend(block.times, block.values[rows])
+
+    def set_window(self, seconds):
+        """Show the last `seconds` of history (up to what history_points holds) and follow it."""
+        self.window = seconds
+        self.follow = True
+
+    def refresh(self):
+        """Push the visible window of history to the curves, decimated to the plot width."""
+        if self.follow:
+            times = self.history.times()
+            start = end = 0
+            if len(times):
+                end = times[-1]
+                start = max(0, end - self.window)
+        else:
+            start, end = self.plot_widget.viewRange()[0]  # Where the user left it
+        pixels = max(self.plot_widget.width(), 100)
+        times, values = self.history.envelope(start, end, pixels)
+        for i, ch_id in enumerate(self.channel_ids):
+            self.curves[ch_id].setData(times, values[i])
+
         # Adjust X range
-        if self.times:
-            latest_time = self.times[-1]
-            self.plot_widget.setXRange(max(0, latest_time - (self.max_points * self.update_interval)), 
-                                     latest_time, padding=0)
-        
-        self.plot_widget.repaint()
\ No newline at end of file
+        if self.follow and len(times):
+            self.plot_widget.setXRange(start, end, padding=0)
+        # setData/setXRange schedule the repaint; Qt does it once per event loop pass
@@ -0,0 +1,94 @@
+import time
+
+from PyQt5 import QtCore
+
+
+class RenderScheduler(QtCore.QObject):
+    """Redraws dirty widgets at most once per display frame.
+
+    Anything that changes a widget's data calls mark_dirty(widget) instead
+    of redrawing. The first mark after an idle period schedules one frame
+    on the next frame boundary (1 / fps apart); every widget marked before
+    then is refreshed once in that frame, however many samples arrived. If
+    a frame overruns, the frames it covered are dropped rather than queued
+    and the next one starts on the following boundary.
+
+    instrumentation, if given, records each frame as the 'render' stage.
+    """
+
+    def __init__(self, fps=30, parent=None, instrumentation=None):
+        super().__init__(parent)
+        self.instrumentation = instrumentation
+        self.dirty = []  # Widgets to refresh next frame, in the order marked
+        self.frames = 0  # Frames rendered
+        self.dropped = 0  # Frame slots skipped because rendering overran
+        self.last_ms = 0.0  # Render time of the latest frame
+        self.average_ms = 0.0  # Exponential moving average of the render time
+        self.max_ms = 0.0
+        self._last_frame = None  # perf_counter() at the start of the latest frame
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self._timer.timeout.connect(self.render_frame)
+        self.set_fps(fps)
+
+    def set_fps(self, fps):
+        if fps <= 0:
+            raise ValueError("fps must be positive")
+        self.fps = fps
+        self.frame_period = 1.0 / fps
+
+    def mark_dirty(self, widget):
+        """Ask for widget.refresh() in the next frame."""
+        if widget not in self.dirty:
+            self.dirty.append(widget)
+        if not self._timer.isActive():
+            self._timer.start(int(self._until_next_frame() * 1000))
+
+    def discard(self, widget):
+        """Forget a pending refresh, e.g. for a widget that is being removed."""
+        if widget in self.dirty:
+            self.dirty.remove(widget)
+
+    def _until_next_frame(self):
+        """Seconds to the first frame boundary after now (0 when idle long enough)."""
+        if self._last_frame is None:
+            return 0.0
+        since = time.perf_counter() - self._last_frame
+        if since >= self.frame_period:
+            return 0.0
+        return self.frame_period - since
+
+    def render_frame(self):
+        """Refresh every dirty widget now. Called by the frame timer."""
+        self._timer.stop()
+        if not self.dirty:
+            return
+        start = time.perf_counter()
+        dirty, self.dirty = self.dirty, []
+        for widget in dirty:
+            widget.refresh()
+        elapsed = time.perf_counter() - start
+        # Frames that would have started while this one was still rendering
+        # are not made up afterwards
+        self.dropped += int(elapsed / self.frame_period)
+        self._last_frame = start + int(elapsed / self.frame_period) * self.frame_period
+        self._record(elapsed)
+        if self.instrumentation is not None:
+            self.instrumentation.record('render', int(elapsed * 1e9))
+
+    def _record(self, elapsed):
+        self.last_ms = elapsed * 1000
+        self.average_ms = self.last_ms if self.frames == 0 else 0.9 * self.average_ms + 0.1 * self.last_ms
+        self.max_ms = max(self.max_ms, self.last_ms)
+        self.frames += 1
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'dropped': self.dropped,
+            'fps': self.fps,
+            'render_ms': self.last_ms,
+            'render_ms_avg': self.average_ms,
+            'render_ms_max': self.max_ms,
+        }
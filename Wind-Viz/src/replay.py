@@ -0,0 +1,246 @@
+import csv
+import time
+
+import numpy as np
+
+from .daq_interface import Sample, StreamBlock
+from .data_logger import BinaryBackend, BinaryLog
+
+
+def parse_csv_time(stamp, seconds):
+    """Epoch seconds of a CsvBackend timestamp ("YYYY-mm-dd HH:MM:SS.ffffff").
+
+    seconds caches the parsed whole seconds, so each is parsed only once.
+    """
+    whole, _, fraction = stamp.partition('.')
+    if whole not in seconds:
+        seconds[whole] = time.mktime(time.strptime(whole, "%Y-%m-%d %H:%M:%S"))
+    return seconds[whole] + float('0.' + (fraction or '0'))
+
+
+class ReplaySource:
+    """Plays a DataLogger file back through the DAQInterface read interface.
+
+    Drop it in where a DAQInterface goes: read_sample()/read_channels()
+    return one logged row per call, and start_stream()/read_stream() hand
+    over every row that has fallen due as a StreamBlock, which is what the
+    acquisition worker uses in stream mode. Rows fall due at their recorded
+    spacing divided by speed (2.0 plays twice as fast); speed=None plays as
+    fast as the consumer reads. The file is read chunk_rows rows at a time,
+    so a multi-gigabyte log is never loaded whole.
+
+    Values are the logged raw readings when the log has them, so the
+    pipeline calibrates them again with the current config. Otherwise the
+    calibrated values are replayed and calibrated is True; channels then
+    describes the channels with an identity calibration.
+    """
+
+    def __init__(self, path, speed=1.0, chunk_rows=10000):
+        self.path = str(path)
+        self.speed = speed or None
+        self.chunk_rows = chunk_rows
+        self.binary = self.path.endswith(BinaryBackend.extension)
+        self.connected = True
+        self.reconnects = 0
+        self.errors = 0
+        self.streaming = False
+        self.scan_channels = None
+        self._open()
+
+    # -- File reading --------------------------------------------------------
+
+    def _open(self):
+        """(Re)start reading from the first row."""
+        self.finished = False
+        self.rows_read = 0
+        self.start_ns = None  # perf_counter_ns() when playback started
+        self._t0 = None  # Recorded time of the first row
+        self._buffer = None  # (times, values, instrument_times) of the current chunk
+        self._position = 0  # Next row within the buffered chunk
+        if self.binary:
+            self._log = BinaryLog(self.path)
+            columns = self._log.columns
+            self.channel_ids = self._log.channel_ids
+            self._chunks = self._binary_chunks(columns)
+        else:
+            self._file = open(self.path, newline='')
+            reader = csv.reader(self._file)
+            columns = [name[len('Channel '):] if name.startswith('Channel ') else name
+                       for name in next(reader)]
+            self.channel_ids = [name for name in columns[1:] if name != 'Instrument Time'
+                                and not name.endswith(' raw') and not name.startswith('Derived ')]
+            self._chunks = self._csv_chunks(reader, columns)
+        self.calibrated = not all(f"{ch} raw" in columns for ch in self.channel_ids)
+        names = ({ch: info.get('name', ch) for ch, info in self._log.metadata['channels'].items()}
+                 if self.binary else {})
+        self.channels = {ch: {'name': names.get(ch) or f"Channel {ch}", 'coefficient': 1, 'offset': 0}
+                         for ch in self.channel_ids}
+
+    def _value_columns(self, columns):
+        suffix = '' if self.calibrated else ' raw'
+        return [columns.index(f"{ch}{suffix}") for ch in self.channel_ids]
+
+    def _binary_chunks(self, columns):
+        data = self._log.data
+        value_columns = self._value_columns(columns)
+        instrument = columns.index('instrument_time') if 'instrument_time' in columns else None
+        for start in range(0, len(data), self.chunk_rows):
+            chunk = np.asarray(data[start:start + self.chunk_rows])
+            yield (chunk[:, 0].copy(), chunk[:, value_columns].T.copy(),
+                   None if instrument is None else chunk[:, instrument].copy())
+
+    def _csv_chunks(self, reader, columns):
+        value_columns = self._value_columns(columns)
+        instrument = columns.index('Instrument Time') if 'Instrument Time' in columns else None
+        seconds = {}
+        while True:
+            rows = [row for _, row in zip(range(self.chunk_rows), reader)]
+            if not rows:
+                self._file.close()
+                return
+            times = np.array([parse_csv_time(row[0], seconds) for row in rows])
+            values = np.array([[float(row[c]) if row[c] else np.nan for c in value_columns]
+                               for row in rows]).T
+            instrument_times = None
+            if instrument is not None:
+                instrument_times = np.array([float(row[instrument]) if row[instrument] else np.nan
+                                             for row in rows])
+            yield times, values.reshape(len(value_columns), len(rows)), instrument_times
+
+    def _next_chunk(self):
+        try:
+            self._buffer = next(self._chunks)
+        except StopIteration:
+            self._buffer = None
+            self.finished = True
+            return False
+        self._position = 0
+        return True
+
+    def _take(self, until=None, limit=None):
+        """Remove rows recorded no later than until (all when None), at most limit of them."""
+        times_parts, value_parts, instrument_parts = [], [], []
+        taken = 0
+        while limit is None or taken < limit:
+            if self._buffer is None or self._position >= len(self._buffer[0]):
+                if self.finished or not self._next_chunk():
+                    break
+            times, values, instrument_times = self._buffer
+            if self._t0 is None:
+                self._t0 = times[0]
+            end = len(times)
+            if until is not None:
+                end = int(np.searchsorted(times, until, side='right'))
+            if limit is not None:
+                end = min(end, self._position + limit - taken)
+            if end <= self._position:
+                break
+            times_parts.append(times[self._position:end])
+            value_parts.append(values[:, self._position:end])
+            if instrument_times is not None:
+                instrument_parts.append(instrument_times[self._position:end])
+            taken += end - self._position
+            self._position = end
+        self.rows_read += taken
+        if not taken:
+            return np.empty(0), np.empty((len(self.channel_ids), 0)), None
+        return (np.concatenate(times_parts), np.concatenate(value_parts, axis=1),
+                np.concatenate(instrument_parts) if instrument_parts else None)
+
+    def _due(self):
+        """Latest recorded time that should have been played by now."""
+        if self.speed is None:
+            return None
+        if self._t0 is None and self._peek() is None:
+            return None  # Empty file; there is nothing to take anyway
+        return self._t0 + (time.perf_counter_ns() - self.start_ns) / 1e9 * self.speed
+
+    def _peek(self):
+        """Recorded time of the next row, loading the next chunk if needed; None at the end."""
+        if self._buffer is None or self._position >= len(self._buffer[0]):
+            if self.finished or not self._next_chunk():
+                return None
+        recorded = self._buffer[0][self._position]
+        if self._t0 is None:
+            self._t0 = recorded
+        return recorded
+
+    def _stamps(self, times):
+        # Keep the recorded spacing, so graphs show the recording's time axis
+        return self.start_ns + np.round((times - self._t0) * 1e9).astype(np.int64)
+
+    def _rows(self, channel_ids):
+        index = {ch: i for i, ch in enumerate(self.channel_ids)}
+        return [index[ch] for ch in channel_ids]
+
+    # -- DAQInterface interface ------------------------------------------------
+
+    def set_measurements(self, channels):
+        pass  # The log holds readings already taken
+
+    def configure_scan(self, channel_ids):
+        channel_ids = list(channel_ids)
+        missing = [ch for ch in channel_ids if ch not in self.channel_ids]
+        if missing:
+            print(f"Channels {missing} are not in {self.path}")
+            return False
+        self.scan_channels = channel_ids
+        return True
+
+    def clear_scan(self):
+        self.scan_channels = None
+
+    def read_channels(self, channel_ids):
+        sample = self.read_sample(channel_ids)
+        return None if sample is None else sample.values
+
+    def read_sample(self, channel_ids):
+        """Next logged row as a Sample, waiting until it is due; None at the end of the file."""
+        if self.start_ns is None:
+            self.start_ns = time.perf_counter_ns()
+        recorded = self._peek()
+        if recorded is None:
+            return None
+        if self.speed is not None:
+            delay = (recorded - self._t0) / self.speed - (time.perf_counter_ns() - self.start_ns) / 1e9
+            if delay > 0:
+                time.sleep(delay)
+        times, values, instrument_times = self._take(limit=1)
+        if not len(times):
+            return None
+        rows = self._rows(channel_ids)
+        data = {ch: float(values[row, 0]) for ch, row in zip(channel_ids, rows)}
+        instrument_time = None if instrument_times is None else float(instrument_times[0])
+        return Sample(int(self._stamps(times)[0]), data, instrument_time)
+
+    def start_stream(self, channel_ids, interval=None, count=None):
+        """Start handing out rows as they fall due; interval and count are ignored."""
+        if not self.configure_scan(channel_ids):
+            return False
+        if self.start_ns is None:
+            self.start_ns = time.perf_counter_ns()
+        self.streaming = True
+        return True
+
+    def read_stream(self, max_sweeps=None):
+        """Every row due by now (at most max_sweeps, or chunk_rows at full speed) as a StreamBlock."""
+        if not self.streaming:
+            print("Not streaming. Call start_stream() first.")
+            return None
+        limit = max_sweeps if max_sweeps is not None or self.speed is not None else self.chunk_rows
+        times, values, instrument_times = self._take(self._due(), limit)
+        raw = values[self._rows(self.scan_channels)]
+        return StreamBlock(self.scan_channels, self._stamps(times) if len(times) else
+                           np.empty(0, dtype=np.int64), raw, instrument_times)
+
+    def stop_stream(self):
+        self.streaming = False
+
+    def rewind(self):
+        """Play the file again from the start."""
+        self.close()
+        self._open()
+
+    def close(self):
+        if not self.binary and not self._file.closed:
+            self._file.close()
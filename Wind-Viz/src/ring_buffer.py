@@ -0,0 +1,77 @@
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-capacity sample history: a time vector plus a channels x points array.
+
+    Storage is preallocated once and every sample is written twice, at slot
+    i and i + capacity. That keeps the newest `size` samples contiguous in
+    memory, so times() and values() are always zero-copy views and appends
+    are O(1) whatever the capacity.
+    """
+
+    def __init__(self, n_channels, capacity, dtype=np.float64):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.n_channels = n_channels
+        self.capacity = capacity
+        self._times = np.zeros(2 * capacity, dtype=np.float64)
+        self._values = np.zeros((n_channels, 2 * capacity), dtype=dtype)
+        self._head = 0  # Slot the next sample goes into
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, timestamp, column):
+        """Add one sample; column holds one value per channel."""
+        head = self._head
+        mirror = head + self.capacity
+        self._times[head] = self._times[mirror] = timestamp
+        self._values[:, head] = self._values[:, mirror] = column
+        self._head = (head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def extend(self, timestamps, block):
+        """Add a block of samples: timestamps has shape (n,), block (channels, n)."""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        block = np.asarray(block)
+        n = timestamps.shape[0]
+        if n == 0:
+            return
+        if n > self.capacity:
+            # Only the newest `capacity` samples can survive anyway
+            skip = n - self.capacity
+            self._head = (self._head + skip) % self.capacity
+            timestamps = timestamps[skip:]
+            block = block[:, skip:]
+            n = self.capacity
+        slots = (self._head + np.arange(n)) % self.capacity
+        self._times[slots] = timestamps
+        self._times[slots + self.capacity] = timestamps
+        self._values[:, slots] = block
+        self._values[:, slots + self.capacity] = block
+        self._head = (self._head + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def clear(self):
+        self._head = 0
+        self.size = 0
+
+    def _window(self):
+        end = self._head + self.capacity
+        return end - self.size, end
+
+    def times(self):
+        """Timestamps of the stored samples, oldest first (read-only view)."""
+        start, end = self._window()
+        view = self._times[start:end]
+        view.flags.writeable = False
+        return view
+
+    def values(self, channel=None):
+        """Stored values, oldest first, as a (channels, size) view or one channel's row."""
+        start, end = self._window()
+        view = self._values[:, start:end] if channel is None else self._values[channel, start:end]
+        view.flags.writeable = False
+        return view
@@ -0,0 +1,332 @@
+import math
+import re
+import time
+
+import numpy as np
+import pyvisa
+
+
+class SimulatedDAQ970A:
+    """In-process stand-in for a DAQ970A VISA resource.
+
+    Understands the subset of SCPI that DAQInterface sends: *IDN?, *RST,
+    *CLS, CONF, MEAS?, SENS:<function>:NPLC/APER/ZERO:AUTO, ROUT:SCAN,
+    FORM:READ:*, FORM:DATA, TRIG:SOUR/COUN/TIM, READ?, INIT, ABOR, FETCH?,
+    DATA:POIN?, DATA:REM?, R? and SYST:ERR?. Unknown commands go onto the
+    error queue, like on the real instrument.
+
+    With FORM:DATA REAL,64 (or REAL,32) readings come back as a big-endian
+    IEEE definite-length block: read it with read_raw() or
+    query_binary_values(), as with pyvisa.
+
+    With TRIG:SOUR TIM, INIT arms the scan instead of running it: one sweep
+    falls due every TRIG:TIM seconds (stamped at its exact slot) and is
+    added to reading memory when memory is next queried.
+
+    latency maps a command keyword ('READ', 'MEAS', 'CONF', '*IDN', ...)
+    to the seconds each transaction takes, with 'default' for the rest;
+    reading_time is added per reading taken, scaled by the channel's NPLC
+    (1 by default, as on the instrument). signals maps a channel (int)
+    to a noise model {'offset', 'amplitude', 'frequency', 'noise'}: a sine
+    wave plus Gaussian noise; 'default' applies to channels not listed.
+    serial goes into the *IDN? reply and the resource name, so several
+    simulated mainframes can be told apart by idn_match.
+    """
+
+    def __init__(self, latency=None, reading_time=0.0, signals=None, seed=0, serial='SIM00001'):
+        self.latency = {'default': 0.0}
+        self.latency.update(latency or {})
+        self.reading_time = reading_time
+        self.signals = {'default': {'offset': 0.0, 'amplitude': 1.0, 'frequency': 1.0, 'noise': 0.01}}
+        for key, model in (signals or {}).items():
+            self.signals[key if key == 'default' else int(key)] = model
+        self.rng = np.random.default_rng(seed)
+        self.idn = f"Keysight Technologies,DAQ970A,{serial},A.03.00-SIM"
+        self.timeout = 2000
+        self.closed = False
+        self.unplugged = False  # Every transaction fails, like a pulled USB cable
+        self.writes = []  # Every command received, for tests and debugging
+        self._t0 = time.perf_counter()
+        self.reset()
+
+    def reset(self):
+        self.functions = {}  # Channel -> configured measurement function
+        self.settings = {}  # Channel -> {'NPLC': ..., 'APER': ..., 'ZERO:AUTO': ...}
+        self.scan = []
+        self.trigger_source = 'IMM'
+        self.trigger_count = 1
+        self.trigger_timer = 1.0
+        self.time_stamps = False
+        self.time_type = 'REL'
+        self.data_type = None  # numpy dtype of binary readings; None for ASCII
+        self.errors = []
+        self._response = None
+        self._scan_start = None
+        self._memory = []  # Readings held by INIT until FETCH? or DATA:REM?
+        self._armed_at = None  # Start of a TRIG:SOUR TIM scan in progress
+        self._swept = 0  # Sweeps of that scan taken so far
+
+    # -- VISA resource interface ---------------------------------------------
+
+    def clear(self):
+        self._check_link()
+        self._response = None
+
+    def close(self):
+        self.closed = True
+
+    def _check_link(self):
+        if self.unplugged:
+            raise pyvisa.errors.VisaIOError(pyvisa.constants.StatusCode.error_connection_lost)
+
+    def write(self, command):
+        self._check_link()
+        self._delay(command)
+        self.writes.append(command)
+        self._response = self._execute(command.strip())
+
+    def read(self):
+        response = self.read_raw()
+        return response.decode('latin-1').rstrip('\n')  # pyvisa strips the termination character
+
+    def read_raw(self):
+        self._check_link()
+        response, self._response = self._response, None
+        if response is None:
+            # What a real instrument does when read without a pending query
+            raise pyvisa.errors.VisaIOError(pyvisa.constants.StatusCode.error_timeout)
+        if isinstance(response, str):
+            response = response.encode('latin-1')
+        return response + b'\n'
+
+    def query_binary_values(self, message, datatype='f', is_big_endian=False, container=list, **kwargs):
+        self.write(message)
+        return pyvisa.util.from_ieee_block(self.read_raw(), datatype, is_big_endian, container)
+
+    def query(self, command):
+        self.write(command)
+        return self.read()
+
+    # -- Simulation ----------------------------------------------------------
+
+    def _delay(self, command):
+        keyword = command.strip().lstrip(':').split(' ')[0].split(':')[0].rstrip('?').upper()
+        delay = self.latency.get(keyword, self.latency['default'])
+        if delay > 0:
+            time.sleep(delay)
+
+    @staticmethod
+    def parse_channels(command):
+        """Channel numbers from the (@...) list of a command, ranges expanded."""
+        match = re.search(r'\(@([^)]*)\)', command)
+        if not match:
+            return []
+        channels = []
+        for part in match.group(1).split(','):
+            part = part.strip()
+            if ':' in part:
+                first, last = part.split(':')
+                channels.extend(range(int(first), int(last) + 1))
+            elif part:
+                channels.append(int(part))
+        return channels
+
+    def value(self, channel, t):
+        model = self.signals.get(channel, self.signals['default'])
+        return (model.get('offset', 0.0)
+                + model.get('amplitude', 0.0) * math.sin(2 * math.pi * model.get('frequency', 0.0) * t)
+                + model.get('noise', 0.0) * self.rng.standard_normal())
+
+    def _sweep(self, channels, now=None):
+        """Take one reading per channel; returns a list of (value, time) pairs.
+
+        now is the scan's own clock for timer-triggered sweeps; without it the
+        sweep happens (and takes reading_time per channel) right away.
+        """
+        if now is None:
+            if self.reading_time > 0:
+                time.sleep(self.reading_time * sum(self.settings.get(ch, {}).get('NPLC', 1.0)
+                                                   for ch in channels))
+            now = time.perf_counter() - self._t0
+        if self._scan_start is None:
+            self._scan_start = now
+        return [(self.value(ch, now), now) for ch in channels]
+
+    def _advance(self):
+        """Add the timer-triggered sweeps that have fallen due to reading memory."""
+        if self._armed_at is None:
+            return
+        elapsed = time.perf_counter() - self._t0 - self._armed_at
+        due = min(self.trigger_count, int(elapsed / self.trigger_timer) + 1)
+        for k in range(self._swept, due):
+            self._memory.extend(self._sweep(self.scan, self._armed_at + k * self.trigger_timer))
+        self._swept = max(self._swept, due)
+
+    def _format(self, readings):
+        fields = []
+        for value, t in readings:
+            fields.append(f"{value:+.9E}")
+            if self.time_stamps:
+                if self.time_type == 'REL':
+                    fields.append(f"{t - self._scan_start:+.3f}")
+                else:
+                    wall = time.time() - (time.perf_counter() - self._t0 - t)
+                    parts = time.localtime(wall)
+                    seconds = parts.tm_sec + (wall - int(wall))
+                    fields.extend([str(parts.tm_year), str(parts.tm_mon), str(parts.tm_mday),
+                                   str(parts.tm_hour), str(parts.tm_min), f"{seconds:06.3f}"])
+        if self.data_type is not None:
+            data = np.array(fields, dtype=np.float64).astype(self.data_type).tobytes()
+            return f"#{len(str(len(data)))}{len(data)}".encode() + data
+        return ",".join(fields)
+
+    def _execute(self, command):
+        upper = command.upper().lstrip(':')
+        head = upper.split(' ')[0]
+        argument = command.split(' ', 1)[1].strip() if ' ' in command else ''
+
+        if head == '*IDN?':
+            return self.idn
+        if head == '*RST':
+            self.reset()
+            return None
+        if head in ('*CLS', '*OPC'):
+            self.errors = []
+            return None
+        if head == '*OPC?':
+            return "1"
+        if head.startswith('CONF'):
+            function = head[len('CONF'):].lstrip(':') or 'VOLT:DC'
+            for ch in self.parse_channels(command):
+                self.functions[ch] = function
+                self.settings.pop(ch, None)  # CONF restores the default settings
+            return None
+        if head.startswith('SENS'):
+            setting = next((name for name in ('NPLC', 'APER', 'ZERO:AUTO') if head.endswith(':' + name)), None)
+            if setting is None:
+                self.errors.append(f'-113,"Undefined header; {command}"')
+                return None
+            value = argument.split(',')[0].strip().upper()
+            for ch in self.parse_channels(command):
+                self.settings.setdefault(ch, {})[setting] = value if setting == 'ZERO:AUTO' else float(value)
+            return None
+        if head.startswith('MEAS') and head.endswith('?'):
+            channels = self.parse_channels(command)
+            for ch in channels:
+                self.functions[ch] = head[len('MEAS'):].lstrip(':').rstrip('?') or 'VOLT:DC'
+                self.settings.pop(ch, None)
+            self.scan = channels  # MEAS? redefines the scan list, as on the DAQ970A
+            self._scan_start = None
+            return self._format(self._sweep(channels))
+        if head in ('ROUT:SCAN', 'ROUTE:SCAN'):
+            self.scan = self.parse_channels(command)
+            return None
+        if head == 'FORM:READ:TIME':
+            self.time_stamps = argument.upper() in ('ON', '1')
+            return None
+        if head == 'FORM:READ:TIME:TYPE':
+            self.time_type = 'REL' if argument.upper().startswith('REL') else 'ABS'
+            return None
+        if head in ('FORM:DATA', 'FORMAT:DATA'):
+            kind, _, bits = argument.upper().partition(',')
+            if kind.startswith('ASC'):
+                self.data_type = None
+            elif kind == 'REAL' and bits.strip() in ('', '32', '64'):
+                self.data_type = '>f4' if bits.strip() == '32' else '>f8'
+            else:
+                self.errors.append(f'-224,"Illegal parameter value; {command}"')
+            return None
+        if head in ('FORM:READ:CHAN', 'FORM:READ:UNIT', 'FORM:READ:ALAR'):
+            return None
+        if head == 'TRIG:SOUR':
+            self.trigger_source = argument.upper()
+            return None
+        if head == 'TRIG:COUN':
+            # 9.9E37 is how SCPI spells INFinity
+            count = float('inf') if argument.upper().startswith('INF') else float(argument)
+            self.trigger_count = math.inf if count >= 9.9e37 else int(count)
+            return None
+        if head in ('TRIG:TIM', 'TRIG:TIMER'):
+            self.trigger_timer = float(argument)
+            return None
+        if head == 'INIT':
+            self._scan_start = None
+            self._memory = []
+            self._armed_at = None
+            if self.trigger_source in ('TIM', 'TIMER'):
+                self._armed_at = self._scan_start = time.perf_counter() - self._t0
+                self._swept = 0
+                return None
+            for _ in range(self.trigger_count):
+                self._memory.extend(self._sweep(self.scan))
+            return None
+        if head in ('ABOR', 'ABORT'):
+            self._advance()
+            self._armed_at = None
+            return None
+        if head in ('FETC?', 'FETCH?'):
+            self._advance()
+            return self._format(self._memory)
+        if head in ('DATA:POIN?', 'DATA:POINTS?'):
+            self._advance()
+            return str(len(self._memory))
+        if head in ('DATA:REM?', 'DATA:REMOVE?'):
+            self._advance()
+            count = int(argument)
+            if count > len(self._memory):
+                self.errors.append('-222,"Data out of range"')
+                return None
+            readings, self._memory = self._memory[:count], self._memory[count:]
+            return self._format(readings)
+        if head == 'R?':
+            # Up to the requested number of readings as a definite-length block
+            self._advance()
+            count = int(argument) if argument else len(self._memory)
+            readings, self._memory = self._memory[:count], self._memory[count:]
+            data = self._format(readings)
+            if self.data_type is not None:
+                return data  # Already a block
+            return f"#{len(str(len(data)))}{len(data)}{data}"
+
+        if head == 'READ?':
+            self._execute('INIT')
+            return self._format(self._memory)
+        if head == 'SYST:ERR?':
+            return self.errors.pop(0) if self.errors else '+0,"No error"'
+        self.errors.append(f'-113,"Undefined header; {command}"')
+        return None
+
+
+class SimulatedResourceManager:
+    """Drop-in for pyvisa.ResourceManager that exposes one SimulatedDAQ970A.
+
+    unplug() and plug() simulate pulling and reconnecting the USB cable.
+    """
+
+    def __init__(self, **options):
+        self.options = options
+        self.resource_name = f"USB0::0x2A8D::0x5101::{options.get('serial', 'SIM00001')}::0::INSTR"
+        self.instrument = None
+        self.plugged = True
+
+    def unplug(self):
+        self.plugged = False
+        if self.instrument is not None:
+            self.instrument.unplugged = True
+
+    def plug(self):
+        self.plugged = True
+
+    def list_resources(self, query='?*::INSTR'):
+        return (self.resource_name,) if self.plugged else ()
+
+    def open_resource(self, resource_name, **kwargs):
+        if resource_name != self.resource_name:
+            raise ValueError(f"Unknown resource {resource_name}")
+        if not self.plugged:
+            raise pyvisa.errors.VisaIOError(pyvisa.constants.StatusCode.error_resource_not_found)
+        self.instrument = SimulatedDAQ970A(**self.options)
+        return self.instrument
+
+    def close(self):
+        pass
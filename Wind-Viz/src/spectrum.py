@@ -0,0 +1,98 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .ring_buffer import RingBuffer
+
+
+class WelchPSD:
+    """Welch-averaged power spectral density of the latest samples, kept up to date incrementally.
+
+    extend() only copies samples into a RingBuffer, so it is cheap enough
+    for a pipeline subscriber. update() takes every Hann-windowed segment
+    of `segment` samples completed since the previous call (consecutive
+    segments overlap by `overlap`), detrends them by their mean and
+    transforms them in one batched rfft; the last `averages` periodograms
+    are kept, and psd() is their mean. Each sample is transformed about
+    1 / (1 - overlap) times however often update() is called.
+
+    The sample rate is measured from the timestamps of each batch; if it
+    changes by more than 1%, the periodograms taken at the old rate are
+    discarded.
+    """
+
+    def __init__(self, n_channels, segment=1024, overlap=0.5, averages=8):
+        if segment < 4:
+            raise ValueError("segment must be at least 4 samples")
+        if not 0 <= overlap < 1:
+            raise ValueError("overlap must be in [0, 1)")
+        if averages < 1:
+            raise ValueError("averages must be at least 1")
+        self.n_channels = n_channels
+        self.segment = segment
+        self.hop = max(1, int(round(segment * (1 - overlap))))
+        self.averages = averages
+        self.window = np.hanning(segment + 1)[:-1]  # Periodic Hann, as for spectral analysis
+        self._scale = 1.0 / (self.window ** 2).sum()
+        # Enough history for the newest `averages` overlapping segments
+        self.history = RingBuffer(n_channels, segment + self.hop * (averages - 1))
+        self.periodograms = np.zeros((averages, n_channels, segment // 2 + 1))
+        self.clear()
+
+    def clear(self):
+        self.history.clear()
+        self.total = 0  # Samples added since the last clear()
+        self.fs = None  # Measured sample rate (Hz)
+        self.segments = 0  # Segments transformed since the last clear()
+        self._next_start = 0  # Sample index the next segment starts at
+        self._reset_average()
+
+    def _reset_average(self):
+        self._slot = 0
+        self.filled = 0
+
+    def extend(self, times, block):
+        """Add a block of samples: times (n,) in seconds, block (channels, n)."""
+        self.history.extend(times, block)
+        self.total += len(times)
+
+    def update(self):
+        """Transform the segments completed since the last update; returns how many there were."""
+        first = self.total - len(self.history)  # Sample index of the oldest stored sample
+        start = max(self._next_start, first)
+        if start + self.segment > self.total:
+            return 0
+        starts = np.arange(start, self.total - self.segment + 1, self.hop)[-self.averages:]
+        self._next_start = int(starts[-1]) + self.hop
+        offsets = starts - first
+
+        times = self.history.times()
+        span = offsets[-1] + self.segment - 1 - offsets[0]
+        elapsed = times[offsets[-1] + self.segment - 1] - times[offsets[0]]
+        if elapsed <= 0:
+            return 0
+        fs = span / elapsed
+        if self.fs is not None and abs(fs - self.fs) > 0.01 * self.fs:
+            self._reset_average()
+        self.fs = fs
+
+        segments = sliding_window_view(self.history.values(), self.segment, axis=1)[:, offsets]
+        segments = segments - segments.mean(axis=2, keepdims=True)
+        spectra = np.fft.rfft(segments * self.window, axis=2)
+        power = spectra.real ** 2 + spectra.imag ** 2
+        power *= self._scale / fs
+        power[..., 1:(self.segment + 1) // 2] *= 2  # One-sided: fold in the negative frequencies
+
+        k = power.shape[1]
+        slots = (self._slot + np.arange(k)) % self.averages
+        self.periodograms[slots] = power.transpose(1, 0, 2)
+        self._slot = (self._slot + k) % self.averages
+        self.filled = min(self.filled + k, self.averages)
+        self.segments += k
+        return k
+
+    def psd(self):
+        """(frequencies in Hz, PSD shaped (channels, bins) in unit**2/Hz), or (None, None) before the first segment."""
+        if not self.filled:
+            return None, None
+        return (np.fft.rfftfreq(self.segment, 1.0 / self.fs),
+                self.periodograms[:self.filled].mean(axis=0))
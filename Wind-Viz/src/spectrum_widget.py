@@ -0,0 +1,59 @@
+from PyQt5 import QtWidgets
+import numpy as np
+import pyqtgraph as pg
+from .spectrum import WelchPSD
+
+class SpectrumWidget(QtWidgets.QWidget):
+    """Live power spectral density of a graph's channels, a drop-in for PlotWidget.
+
+    add_block() is the pipeline subscriber and only buffers samples; the
+    FFTs run in refresh(), which the RenderScheduler calls at most once per
+    display frame, so spectral work never runs on the acquisition thread
+    and never more often than the screen is redrawn.
+    """
+
+    def __init__(self, title, channels, parent=None, segment=1024, overlap=0.5, averages=8):
+        super().__init__(parent)
+        self.channels = channels
+        self.channel_ids = list(channels.keys())
+        self.welch = WelchPSD(len(self.channel_ids), segment, overlap, averages)
+        self._block_rows = (None, None)  # (block channel_ids, row indices) cache
+
+        layout = QtWidgets.QVBoxLayout()
+        self.setLayout(layout)
+
+        self.plot_widget = pg.PlotWidget(title=title)
+        self.plot_widget.setBackground('k')
+        self.plot_widget.showGrid(x=True, y=True, alpha=0.3)
+        self.plot_widget.setLabel('bottom', 'Frequency (Hz)')
+        unit = next((info.get('unit') for info in channels.values() if info.get('unit')), None)
+        self.plot_widget.setLabel('left', f"PSD ({unit}²/Hz)" if unit else "PSD (1/Hz)")
+        self.plot_widget.setLogMode(y=True)
+        layout.addWidget(self.plot_widget)
+
+        self.colors = ['r', 'g', 'b', 'y', 'c', 'm', 'w']
+
+        self.plot_widget.addLegend()
+        self.curves = {}
+        for i, (ch_id, ch_info) in enumerate(channels.items()):
+            color = self.colors[i % len(self.colors)]
+            self.curves[ch_id] = self.plot_widget.plot(pen=pg.mkPen(color, width=2),
+                                                       name=ch_info['name'])
+
+    def add_block(self, block):
+        """Pipeline subscriber: buffer this graph's rows of a calibrated SampleBlock."""
+        channel_ids, rows = self._block_rows
+        if channel_ids is not block.channel_ids:
+            index = {ch: i for i, ch in enumerate(block.channel_ids)}
+            rows = [index[ch] for ch in self.channel_ids]
+            self._block_rows = (block.channel_ids, rows)
+        self.welch.extend(block.times, block.values[rows])
+
+    def refresh(self):
+        """Transform the segments completed since the last frame and redraw if there were any."""
+        if not self.welch.update():
+            return
+        freqs, psd = self.welch.psd()
+        psd = np.maximum(psd, np.finfo(np.float64).tiny)  # Log axis: no zeros
+        for i, ch_id in enumerate(self.channel_ids):
+            self.curves[ch_id].setData(freqs[1:], psd[i, 1:])  # DC is removed by the detrend
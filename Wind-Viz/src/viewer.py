@@ -0,0 +1,73 @@
+from PyQt5 import QtWidgets
+
+from .config_manager import parse_graph
+from .log_index import LogIndex
+from .plot_widget import PlotWidget
+from .render_scheduler import RenderScheduler
+
+
+class LogPlotWidget(PlotWidget):
+    """PlotWidget drawing a LogIndex instead of live history.
+
+    The x axis is free to pan and zoom; whenever its range changes the
+    widget asks the scheduler for a frame, and refresh() then draws the
+    visible window straight from the index at the plot's pixel width.
+    """
+
+    def __init__(self, index, title, channels, renderer, parent=None):
+        super().__init__(title, channels, parent, history_points=0)
+        self.index = index
+        self.renderer = renderer
+        self.rows = [index.channel_ids.index(ch) for ch in self.channel_ids]
+        self.plot_widget.setXRange(index.start, index.end, padding=0)
+        self.plot_widget.sigXRangeChanged.connect(lambda *_: self.renderer.mark_dirty(self))
+
+    def refresh(self):
+        """Draw the visible x range of the log, decimated to the plot width."""
+        start, end = self.plot_widget.viewRange()[0]
+        pixels = max(self.plot_widget.width(), 100)
+        times, values = self.index.envelope(start, end, pixels)
+        for i, ch_id in zip(self.rows, self.channel_ids):
+            self.curves[ch_id].setData(times, values[i])
+
+
+class LogViewer(QtWidgets.QMainWindow):
+    """Window for scrubbing and zooming through a whole recorded session.
+
+    graphs is the config's graphs section; its time-series graphs are
+    shown, without the channels the log does not contain, and without
+    graphs every channel goes in one graph. The graphs share their x axis.
+    """
+
+    def __init__(self, path, graphs=None, channels=None, fps=30, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Log Viewer - {path}")
+        self.resize(1200, 800)
+        self.index = LogIndex(path)
+        self.renderer = RenderScheduler(fps=fps, parent=self)
+
+        info = {}
+        for ch in self.index.channel_ids:
+            info[ch] = dict(self.index.channels.get(ch) or {})
+            info[ch].update((channels or {}).get(ch) or {})
+            info[ch].setdefault('name', f"Channel {ch}")
+        graphs = graphs or {"Log": self.index.channel_ids}
+
+        central_widget = QtWidgets.QWidget()
+        self.setCentralWidget(central_widget)
+        layout = QtWidgets.QVBoxLayout(central_widget)
+        self.plot_widgets = {}
+        for title, spec in graphs.items():
+            kind, channel_ids, _ = parse_graph(spec)
+            present = [ch for ch in channel_ids if ch in info]
+            if kind != 'time' or not present:
+                continue  # Spectra are live-only
+            widget = LogPlotWidget(self.index, title, {ch: info[ch] for ch in present}, self.renderer)
+            if self.plot_widgets:
+                widget.plot_widget.setXLink(next(iter(self.plot_widgets.values())).plot_widget)
+            self.plot_widgets[title] = widget
+            layout.addWidget(widget)
+            self.renderer.mark_dirty(widget)
+        self.statusBar().showMessage(
+            f"{len(self.index)} rows, {self.index.end - self.index.start:.1f} s, "
+            f"{len(self.index.channel_ids)} channels")
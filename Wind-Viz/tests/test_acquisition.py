@@ -0,0 +1,92 @@
+import time
+import numpy as np
+import pytest
+from unittest.mock import Mock
+from src.acquisition import AcquisitionWorker
+from src.daq_interface import Sample, StreamBlock
+
+@pytest.fixture
+def daq():
+    daq = Mock()
+    daq.read_sample.side_effect = lambda channel_ids: Sample(time.perf_counter_ns(), {'301': 1.0, '302': 2.0})
+    return daq
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+def test_worker_queues_timestamped_samples(daq):
+    worker = AcquisitionWorker(daq, ['301', '302'], interval=0.01)
+    worker.start()
+    assert wait_for(lambda: worker.samples >= 3)
+    worker.stop()
+
+    samples = worker.drain()
+    assert len(samples) >= 3
+    assert all(isinstance(s, Sample) for s in samples)
+    assert samples[0].values == {'301': 1.0, '302': 2.0}
+    assert samples[0].timestamp_ns >= worker.start_ns
+    assert [s.timestamp_ns for s in samples] == sorted(s.timestamp_ns for s in samples)
+    daq.read_sample.assert_called_with(['301', '302'])
+    assert not worker.is_running()
+
+def test_worker_counts_failed_reads(daq):
+    daq.read_sample.side_effect = None
+    daq.read_sample.return_value = None
+    worker = AcquisitionWorker(daq, ['301'], interval=0.01)
+    worker.start()
+    assert wait_for(lambda: worker.failed >= 2)
+    worker.stop()
+    assert worker.drain() == []
+    assert worker.samples == 0
+
+def test_full_queue_drops_oldest(daq):
+    worker = AcquisitionWorker(daq, ['301'], max_queue=2)
+    for i in range(3):
+        worker._put(Sample(i, {'301': float(i)}))
+
+    assert worker.dropped == 1
+    assert [s.timestamp_ns for s in worker.drain()] == [1, 2]
+
+def test_slow_read_counts_late_ticks(daq):
+    def slow_read(channel_ids):
+        time.sleep(0.035)
+        return Sample(time.perf_counter_ns(), {'301': 1.0})
+    daq.read_sample.side_effect = slow_read
+    worker = AcquisitionWorker(daq, ['301'], interval=0.01)
+    worker.start()
+    assert wait_for(lambda: worker.samples >= 2)
+    worker.stop()
+    assert worker.late >= 3
+
+def test_drain_limit(daq):
+    worker = AcquisitionWorker(daq, ['301'])
+    for i in range(5):
+        worker._put(Sample(i, {'301': 0.0}))
+    assert len(worker.drain(max_items=3)) == 3
+    assert worker.stats()['queued'] == 2
+
+def test_stream_mode_queues_blocks(daq):
+    block = StreamBlock(['301'], np.array([1, 2]), np.array([[1.0, 2.0]]), None)
+    daq.start_stream.return_value = True
+    daq.read_stream.return_value = block
+    worker = AcquisitionWorker(daq, ['301'], interval=0.001, stream=True, poll_interval=0.01)
+    worker.start()
+    assert wait_for(lambda: worker.samples >= 4)
+    worker.stop()
+
+    daq.start_stream.assert_called_once_with(['301'], 0.001)
+    daq.stop_stream.assert_called_once()
+    daq.read_sample.assert_not_called()
+    assert all(item is block for item in worker.drain())
+
+def test_stream_mode_rearms_after_failed_read(daq):
+    daq.start_stream.return_value = True
+    daq.read_stream.return_value = None
+    worker = AcquisitionWorker(daq, ['301'], stream=True, poll_interval=0.005)
+    worker.start()
+    assert wait_for(lambda: worker.failed >= 2)
+    worker.stop()
+    assert daq.start_stream.call_count >= 2
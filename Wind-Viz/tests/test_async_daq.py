@@ -0,0 +1,105 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import Mock
+from src.async_daq import AsyncDAQ, AsyncAcquisitionWorker
+from src.daq_interface import DAQInterface, Sample
+
+CHANNELS = ['301', '302', '303']
+
+def sim_daq(**simulator):
+    daq = DAQInterface(backend='sim', simulator=simulator)
+    daq.configure_scan(CHANNELS)
+    return daq
+
+def collect(adaq, count, interval=0.0, work=0.0):
+    """Take count samples, spending work seconds on each as a consumer would."""
+    async def consume():
+        samples = []
+        async for sample in adaq.samples(CHANNELS, interval, count):
+            time.sleep(work)  # Parsing, logging, ... in the event loop's thread
+            samples.append(sample)
+        return samples
+    return asyncio.run(consume())
+
+def test_read_sample():
+    daq = sim_daq()
+    adaq = AsyncDAQ(daq)
+    sample = asyncio.run(adaq.read_sample(CHANNELS))
+    assert isinstance(sample, Sample)
+    assert list(sample.values) == CHANNELS
+    # Channels outside the scan list go through read_sample on the I/O thread
+    assert list(asyncio.run(adaq.read_sample(['305'])).values) == ['305']
+    adaq.close()
+
+def test_samples_overlap_io_with_the_consumer():
+    daq = sim_daq(latency={'READ': 0.02})
+    adaq = AsyncDAQ(daq)
+    start = time.perf_counter()
+    samples = collect(adaq, 10, work=0.02)
+    elapsed = time.perf_counter() - start
+    adaq.close()
+    assert len(samples) == 10 and all(s is not None for s in samples)
+    assert [s.timestamp_ns for s in samples] == sorted(s.timestamp_ns for s in samples)
+    assert elapsed < 0.35  # Reading then working in turn would take 0.4 s
+
+def test_samples_follow_the_interval():
+    adaq = AsyncDAQ(sim_daq())
+    samples = collect(adaq, 5, interval=0.02)
+    adaq.close()
+    gaps = [(b.timestamp_ns - a.timestamp_ns) / 1e9 for a, b in zip(samples, samples[1:])]
+    assert all(0.015 < gap < 0.03 for gap in gaps)
+    assert adaq.late == 0
+
+def test_timeout_gives_up_on_a_slow_read():
+    adaq = AsyncDAQ(sim_daq(latency={'READ': 0.2}), timeout=0.05)
+    start = time.perf_counter()
+    assert asyncio.run(adaq.read_sample(CHANNELS)) is None
+    assert time.perf_counter() - start < 0.15
+    assert adaq.timeouts == 1
+    adaq.close()
+
+def test_cancelling_the_consumer_cancels_the_next_read():
+    daq = Mock(spec=['read_sample'])
+    daq.read_sample.side_effect = lambda channel_ids: Sample(time.perf_counter_ns(), {'301': 1.0})
+    adaq = AsyncDAQ(daq)
+
+    async def consume():
+        async for _ in adaq.samples(['301'], interval=10.0):
+            pass
+
+    async def main():
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    adaq.close()  # Wakes the read waiting for its tick
+    assert daq.read_sample.call_count == 1
+    assert time.perf_counter() - start < 1.0
+
+def test_worker_queues_samples():
+    worker = AsyncAcquisitionWorker(sim_daq(), CHANNELS, interval=0.01)
+    worker.start()
+    deadline = time.monotonic() + 2.0
+    while worker.samples < 5 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    worker.stop()
+    assert not worker.is_running()
+    samples = worker.drain()
+    assert len(samples) >= 5
+    assert worker.failed == 0
+
+def test_worker_stops_during_a_long_interval():
+    worker = AsyncAcquisitionWorker(sim_daq(), CHANNELS, interval=10.0)
+    worker.start()
+    time.sleep(0.05)
+    start = time.perf_counter()
+    worker.stop()
+    assert time.perf_counter() - start < 0.5
+    assert not worker.is_running()
+    assert worker.samples == 1
+    assert worker.failed == 0
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from calibration import Calibration
+
+CHANNELS = {
+    '301': {'name': 'Pressure_1', 'coefficient': '2', 'offset': '3'},
+    '302': {'name': 'Pressure_2', 'coefficient': '4', 'offset': '2'},
+}
+
+def test_linear_from_config_strings():
+    cal = Calibration(CHANNELS)
+    assert cal.all_linear
+    np.testing.assert_array_equal(cal.coefficient, [2.0, 4.0])
+    np.testing.assert_array_equal(cal.offset, [3.0, 2.0])
+    np.testing.assert_array_equal(cal.apply([1.0, 1.0]), [5.0, 6.0])
+
+def test_linear_block():
+    cal = Calibration(CHANNELS)
+    raw = np.array([[0.0, 1.0, 2.0], [0.5, 1.0, 1.5]])
+    np.testing.assert_array_equal(cal.apply(raw), [[3.0, 5.0, 7.0], [4.0, 6.0, 8.0]])
+
+def test_apply_dict_uses_channel_order():
+    cal = Calibration(CHANNELS)
+    np.testing.assert_array_equal(cal.apply_dict({'302': 1.0, '301': 0.0}), [3.0, 6.0])
+
+def test_missing_coefficient_defaults_to_identity():
+    cal = Calibration({'301': {'name': 'raw'}})
+    np.testing.assert_array_equal(cal.apply([1.25]), [1.25])
+
+def test_polynomial_and_table_mixed_with_linear():
+    channels = {
+        '301': {'coefficient': '2', 'offset': '1'},
+        '302': {'calibration': {'type': 'polynomial', 'coefficients': [1, 0, 2]}},
+        '303': {'calibration': {'type': 'polynomial', 'coefficients': [0, 3]}},
+        '304': {'calibration': {'type': 'table', 'x': [1.0, 0.0], 'y': [100.0, 0.0]}},
+    }
+    cal = Calibration(channels)
+    assert not cal.all_linear
+    x = np.array([0.0, 0.5, 2.0])
+    raw = np.vstack([x, x, x, x])
+    out = cal.apply(raw)
+    np.testing.assert_allclose(out[0], 2 * x + 1)
+    np.testing.assert_allclose(out[1], 1 + 2 * x ** 2)
+    np.testing.assert_allclose(out[2], 3 * x)
+    # Table is sorted on x and clamped past its last point
+    np.testing.assert_allclose(out[3], [0.0, 50.0, 100.0])
+
+def test_invalid_calibrations():
+    with pytest.raises(ValueError):
+        Calibration({'301': {'calibration': {'type': 'spline'}}})
+    with pytest.raises(ValueError):
+        Calibration({'301': {'calibration': {'type': 'table', 'x': [0.0], 'y': [1.0]}}})
+    with pytest.raises(ValueError):
+        Calibration({'301': {'calibration': {'type': 'polynomial', 'coefficients': []}}})
@@ -90,4 +90,13 @@ def test_init_with_real_file(temp_config_file):
     """Test initialization with a real temporary file"""
     config_mgr = ConfigManager(temp_config_file)
     assert config_mgr.channels == {'test_channel': 'value'}
-    assert config_mgr.graphs == {'test_graph': 'value'}
\ No newline at end of file
+    assert config_mgr.graphs == {'test_graph': 'value'}
+
+
+def test_parse_graph():
+    """Test that graphs are channel lists or dicts with a type and options"""
+    from config_manager import parse_graph
+    assert parse_graph(["301", "302"]) == ('time', ["301", "302"], {})
+    assert parse_graph({"type": "spectrum", "channels": ["305"], "segment": 2048}) == \
+        ('spectrum', ["305"], {"segment": 2048})
+    assert parse_graph({"channels": ["301"]}) == ('time', ["301"], {})
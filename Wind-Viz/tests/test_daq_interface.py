@@ -1,11 +1,21 @@
+import time
+from contextlib import contextmanager
 import pytest
 from unittest.mock import Mock, patch, MagicMock
+import numpy as np
 import pyvisa
-from daq_interface import DAQInterface
+from daq_interface import DAQInterface, Sample, parse_measurement
+
+@contextmanager
+def one_instrument():
+    """Patch pyvisa with a USB bus holding one (mock) instrument."""
+    with patch('pyvisa.ResourceManager') as mock_rm:
+        mock_rm.return_value.list_resources.return_value = ('USB0::INSTR',)
+        yield mock_rm
 
 @pytest.fixture
 def daq():
-    with patch('pyvisa.ResourceManager') as mock_rm:
+    with one_instrument() as mock_rm:
         daq = DAQInterface()
         yield daq
 
@@ -47,7 +57,7 @@ def test_connect_visa_error():
         mock_instrument = MagicMock()
         mock_rm.return_value.list_resources.return_value = ('USB0::INSTR', 'USB1::INSTR')
         
-        def open_resource_side_effect(resource):
+        def open_resource_side_effect(resource, **kwargs):
             if resource == 'USB0::INSTR':
                 raise pyvisa.errors.VisaIOError(1073676290)
             return mock_instrument
@@ -56,33 +66,86 @@ def test_connect_visa_error():
         mock_instrument.read.return_value = "Test Instrument IDN"
         
         daq = DAQInterface()
+        assert daq.connected is True
+        assert mock_rm.return_value.open_resource.call_count == 2
+        assert daq.resource_name == 'USB1::INSTR'
+        assert daq.errors == 1
         # Reset all mocks to clear calls from __init__
         mock_rm.return_value.open_resource.reset_mock()
+        mock_rm.return_value.list_resources.reset_mock()
         mock_instrument.clear.reset_mock()
         mock_instrument.write.reset_mock()
         mock_instrument.read.reset_mock()
         
         result = daq.connect()
         
+        # The instrument that answered last time is tried first, without enumerating
         assert result is True
         assert daq.connected is True
-        assert mock_rm.return_value.open_resource.call_count == 2
+        mock_rm.return_value.open_resource.assert_called_once_with('USB1::INSTR', open_timeout=2000)
+        mock_rm.return_value.list_resources.assert_not_called()
         mock_instrument.clear.assert_called_once()
         mock_instrument.write.assert_called_once_with('*IDN?')
         mock_instrument.read.assert_called_once()
 
+def test_connect_gives_up_when_no_resource_answers():
+    with patch('pyvisa.ResourceManager') as mock_rm:
+        mock_rm.return_value.list_resources.return_value = ('USB0::INSTR', 'USB1::INSTR')
+        mock_rm.return_value.open_resource.side_effect = pyvisa.errors.VisaIOError(-1073807339)
+        daq = DAQInterface()
+        assert daq.connected is False
+        assert mock_rm.return_value.open_resource.call_count == 2
+        assert daq.errors == 2
+
+def test_connect_closes_a_resource_that_does_not_answer():
+    with patch('pyvisa.ResourceManager') as mock_rm:
+        mute = MagicMock()
+        mute.read.side_effect = pyvisa.errors.VisaIOError(-1073807339)
+        mock_rm.return_value.list_resources.return_value = ('USB0::INSTR',)
+        mock_rm.return_value.open_resource.return_value = mute
+        daq = DAQInterface()
+        assert daq.connected is False
+        mute.close.assert_called_once()
+
+def test_connect_idn_match():
+    with patch('pyvisa.ResourceManager') as mock_rm:
+        other, daq970a = MagicMock(), MagicMock()
+        other.read.return_value = "Keysight Technologies,34465A,MY1,A.02"
+        daq970a.read.return_value = "Keysight Technologies,DAQ970A,MY2,A.03"
+        mock_rm.return_value.list_resources.return_value = ('USB0::INSTR', 'USB1::INSTR')
+        mock_rm.return_value.open_resource.side_effect = [other, daq970a]
+        daq = DAQInterface(idn_match='DAQ970A')
+        assert daq.instrument is daq970a
+        assert daq.idn.startswith("Keysight Technologies,DAQ970A")
+        other.close.assert_called_once()
+
+def test_cached_resource_must_be_the_same_instrument():
+    with patch('pyvisa.ResourceManager') as mock_rm:
+        first, replaced, original = MagicMock(), MagicMock(), MagicMock()
+        first.read.return_value = original.read.return_value = "DAQ970A,MY2"
+        replaced.read.return_value = "DAQ970A,MY9"
+        mock_rm.return_value.list_resources.return_value = ('USB0::INSTR', 'USB1::INSTR')
+        mock_rm.return_value.open_resource.side_effect = [first, replaced, original]
+        daq = DAQInterface()
+        assert daq.resource_name == 'USB0::INSTR'
+        # USB0 now answers with another serial number, so the bus is searched
+        assert daq.connect() is True
+        assert daq.instrument is original
+        assert daq.resource_name == 'USB1::INSTR'
+
 def test_read_channels_success(daq):
     channel_ids = ['101', '102']
-    daq.instrument.query.return_value = "5.678"
-    
     # Reset write count from initialization
     daq.instrument.write.reset_mock()
     
+    daq.instrument.query.return_value = "5.678,1.234"
     result = daq.read_channels(channel_ids)
     
-    assert result == {'101': 5.678, '102': 5.678}
-    assert daq.instrument.write.call_count == 2
-    assert daq.instrument.query.call_count == 2
+    assert result == {'101': 5.678, '102': 1.234}
+    # One MEAS? for both channels, which configures them itself; only the reply format is set first
+    writes = [c.args[0] for c in daq.instrument.write.call_args_list]
+    assert all(w.startswith(':FORM:') for w in writes) and ':FORM:DATA ASC' in writes
+    daq.instrument.query.assert_called_once_with(":MEAS:VOLT:DC? (@101:102)")
     assert daq.connected is True
 
 def test_read_channels_not_connected():
@@ -104,10 +167,29 @@ def test_read_channels_reconnect_success():
         
         daq = DAQInterface()
         daq.connected = False
+        # The reconnect runs in the background; this read does not wait for it
+        assert daq.read_channels(['101']) is None
+        assert daq.wait_connected(timeout=2.0) is True
         result = daq.read_channels(['101'])
         
         assert result == {'101': 5.678}
         assert daq.connected is True
+        assert daq.reconnects == 1
+
+def test_reconnect_backs_off():
+    with patch('pyvisa.ResourceManager') as mock_rm:
+        mock_rm.return_value.list_resources.return_value = ()
+        daq = DAQInterface(background_reconnect=False, reconnect_delay=0.05, max_reconnect_delay=0.1)
+        list_calls = mock_rm.return_value.list_resources.call_count
+        for _ in range(20):
+            assert daq.read_channels(['101']) is None
+        # One attempt, then nothing until the delay has passed
+        assert daq.reconnects == 1
+        assert mock_rm.return_value.list_resources.call_count == list_calls + 1
+        time.sleep(0.06)
+        daq.read_channels(['101'])
+        assert daq.reconnects == 2
+        assert daq._backoff == 0.1  # Doubled, capped at max_reconnect_delay
 
 def test_read_channels_error():
     with patch('pyvisa.ResourceManager') as mock_rm:
@@ -122,9 +204,203 @@ def test_read_channels_error():
         
         assert result is None
         assert daq.connected is False
+        assert daq.errors == 1
+
+def test_channel_list():
+    assert DAQInterface.channel_list(['301', '302', '303']) == '(@301:303)'
+    assert DAQInterface.channel_list(['305', '301', '302']) == '(@301:302,305)'
+    assert DAQInterface.channel_list(['101']) == '(@101)'
+
+def test_configure_scan(daq):
+    daq.instrument.write.reset_mock()
+
+    assert daq.configure_scan(['301', '302', '303']) is True
+
+    writes = [c.args[0] for c in daq.instrument.write.call_args_list]
+    assert ':CONF:VOLT:DC (@301:303)' in writes
+    assert ':ROUT:SCAN (@301:303)' in writes
+    assert daq.scan_channels == ['301', '302', '303']
+
+def test_read_channels_scan(daq):
+    daq.configure_scan(['302', '301'])
+    daq.instrument.write.reset_mock()
+    daq.instrument.query.reset_mock()
+    # Readings come back in ascending channel order
+    daq.instrument.query.return_value = "+1.5E+00,+2.5E+00\n"
+
+    result = daq.read_channels(['302', '301'])
+
+    assert result == {'302': 2.5, '301': 1.5}
+    assert list(result) == ['302', '301']
+    daq.instrument.query.assert_called_once_with("READ?")
+    daq.instrument.write.assert_not_called()
+
+def test_read_channels_scan_wrong_count(daq):
+    daq.configure_scan(['301', '302'])
+    daq.instrument.query.return_value = "+1.5E+00"
+
+    assert daq.read_channels(['301', '302']) is None
+    assert daq.connected is False
+
+def test_read_channels_other_channels_skip_scan(daq):
+    daq.configure_scan(['301', '302'])
+    daq.instrument.query.return_value = "5.678"
+    daq.instrument.query.reset_mock()
+
+    result = daq.read_channels(['303'])
+
+    assert result == {'303': 5.678}
+    daq.instrument.query.assert_called_once_with(":MEAS:VOLT:DC? (@303)")
+
+def test_read_sample_timestamp(daq):
+    daq.instrument.query.return_value = "1.0"
+    before = time.perf_counter_ns()
+    sample = daq.read_sample(['101'])
+    after = time.perf_counter_ns()
+
+    assert isinstance(sample, Sample)
+    assert before <= sample.timestamp_ns <= after
+    assert sample.values == {'101': 1.0}
+    assert sample.instrument_time is None
+
+def test_read_sample_relative_instrument_time():
+    with one_instrument():
+        daq = DAQInterface(instrument_time='relative')
+    daq.configure_scan(['301', '302'])
+    writes = [c.args[0] for c in daq.instrument.write.call_args_list]
+    assert ':FORM:READ:TIME ON' in writes
+    assert ':FORM:READ:TIME:TYPE REL' in writes
+    daq.instrument.query.return_value = "+1.5E+00,+0.125,+2.5E+00,+0.130"
+
+    sample = daq.read_sample(['301', '302'])
+    assert sample.values == {'301': 1.5, '302': 2.5}
+    assert sample.instrument_time == 0.125
+
+def test_read_sample_absolute_instrument_time():
+    with one_instrument():
+        daq = DAQInterface(instrument_time='absolute')
+    daq.configure_scan(['301'])
+    daq.instrument.query.return_value = "+1.5E+00,2026,10,17,12,30,15.250"
+
+    sample = daq.read_sample(['301'])
+    expected = time.mktime((2026, 10, 17, 12, 30, 15, 0, 0, -1)) + 0.25
+    assert sample.values == {'301': 1.5}
+    assert sample.instrument_time == pytest.approx(expected)
+
+def test_binary_data_format():
+    with one_instrument():
+        daq = DAQInterface(data_format='real64')
+    daq.configure_scan(['301', '302'])
+    writes = [c.args[0] for c in daq.instrument.write.call_args_list]
+    assert ':FORM:DATA REAL,64' in writes
+    daq.instrument.query_binary_values.return_value = np.array([1.5, 2.5], dtype='>f8')
+
+    assert daq.read_channels(['302', '301']) is not None  # Not the scan list: MEAS?
+    daq.instrument.query_binary_values.reset_mock()
+    assert daq.read_channels(['301', '302']) == {'301': 1.5, '302': 2.5}
+    daq.instrument.query_binary_values.assert_called_once_with(
+        "READ?", datatype='d', is_big_endian=True, container=np.array)
+    daq.instrument.query.assert_not_called()
+
+def test_invalid_data_format():
+    with patch('pyvisa.ResourceManager'):
+        with pytest.raises(ValueError):
+            DAQInterface(data_format='real16')
+
+def test_invalid_instrument_time():
+    with patch('pyvisa.ResourceManager'):
+        with pytest.raises(ValueError):
+            DAQInterface(instrument_time='gps')
+
+MEASUREMENTS = {
+    '301': {'name': 'Pressure_1', 'measurement': {'function': 'VOLT:DC', 'range': 10, 'nplc': 0.02}},
+    '302': {'name': 'Pressure_2', 'measurement': {'function': 'VOLT:DC', 'range': 10, 'nplc': 0.02,
+                                                  'autozero': False}},
+    '303': {'name': 'Temp_1', 'measurement': {'function': 'TEMP', 'type': 'J', 'nplc': 1}},
+    '304': {'name': 'Vel_1'},
+}
+
+def test_parse_measurement():
+    assert parse_measurement(None) == ('VOLT:DC', (), ())
+    assert parse_measurement({'function': 'temp', 'autozero': 'once'}) == \
+        ('TEMP', ('TC', 'K'), (('ZERO:AUTO', 'ONCE'),))
+    assert parse_measurement({'range': 'auto', 'aperture': 0.001}) == ('VOLT:DC', ('AUTO',), (('APER', '0.001'),))
+    for bad in ({'function': 'VOLT:XX'}, {'nplc': 1, 'aperture': 0.1}, {'function': 'FREQ', 'nplc': 1},
+                {'autozero': 'SOMETIMES'}, {'nplcs': 1}):
+        with pytest.raises(ValueError):
+            parse_measurement(bad)
+
+def test_set_measurements_names_the_channel(daq):
+    with pytest.raises(ValueError, match="Channel 303"):
+        daq.set_measurements({'303': {'measurement': {'function': 'TEMP', 'range': 10}}})
+
+def test_scan_setup_groups_channels(daq):
+    daq.set_measurements(MEASUREMENTS)
+    daq.instrument.write.reset_mock()
+
+    assert daq.configure_scan(['304', '303', '302', '301']) is True
+
+    writes = [c.args[0] for c in daq.instrument.write.call_args_list if not c.args[0].startswith(':FORM:')]
+    assert writes[:5] == [
+        ':CONF:VOLT:DC 10,(@301:302)',
+        ':CONF:TEMP TC,J,(@303)',
+        ':CONF:VOLT:DC (@304)',
+        ':SENS:VOLT:DC:NPLC 0.02,(@301:302)',
+        ':SENS:VOLT:DC:ZERO:AUTO OFF,(@302)',
+    ]
+    assert writes[5] == ':SENS:TEMP:NPLC 1,(@303)'
+    assert writes[-1] == ':ROUT:SCAN (@301:304)'
+
+def test_scan_setup_is_cached(daq):
+    daq.set_measurements(MEASUREMENTS)
+    daq.configure_scan(['301', '302', '303'])
+    daq.instrument.write.reset_mock()
+
+    assert daq.configure_scan(['303', '302', '301']) is True  # Same setup, other order
+    daq.instrument.write.assert_not_called()
+
+    changed = dict(MEASUREMENTS, **{'303': {'measurement': {'function': 'TEMP', 'nplc': 10}}})
+    daq.set_measurements(changed)
+    daq.configure_scan(['301', '302', '303'])
+    writes = [c.args[0] for c in daq.instrument.write.call_args_list]
+    assert ':SENS:TEMP:NPLC 10,(@303)' in writes
+
+def test_scan_setup_sent_again_after_reconnect(daq):
+    daq.configure_scan(['301', '302'])
+    daq.connected = False
+    daq.instrument.write.reset_mock()
+
+    daq._reconnect_attempt()
+
+    writes = [c.args[0] for c in daq.instrument.write.call_args_list]
+    assert ':ROUT:SCAN (@301:302)' in writes
+
+def test_stop_stream_only_resets_trigger(daq):
+    daq.configure_scan(['301', '302'])
+    daq.start_stream(['301', '302'], 0.01)
+    daq.instrument.write.reset_mock()
+
+    daq.stop_stream()
+
+    writes = [c.args[0] for c in daq.instrument.write.call_args_list]
+    assert writes == [':ABOR', ':TRIG:SOUR IMM', ':TRIG:COUN 1']
+    daq.instrument.write.reset_mock()
+    daq.configure_scan(['301', '302'])
+    daq.instrument.write.assert_not_called()
+
+def test_read_channels_groups_meas_by_function(daq):
+    daq.set_measurements(MEASUREMENTS)
+    daq.instrument.query.reset_mock()
+    daq.instrument.query.side_effect = lambda q: "21.5" if 'TEMP' in q else "1.0,2.0"
+
+    result = daq.read_channels(['303', '302', '301'])
+
+    assert result == {'303': 21.5, '302': 2.0, '301': 1.0}
+    queries = [c.args[0] for c in daq.instrument.query.call_args_list]
+    assert queries == [':MEAS:VOLT:DC? 10,(@301:302)', ':MEAS:TEMP? TC,J,(@303)']
 
 def test_destructor():
-    with patch('pyvisa.ResourceManager') as mock_rm:
+    with one_instrument() as mock_rm:
         mock_instrument = MagicMock()
         mock_rm.return_value.open_resource.return_value = mock_instrument
         daq = DAQInterface()
@@ -5,11 +5,26 @@ import time
 import csv
 import sys
 import io
+import types
+import queue
+import threading
+import gzip
+import json
+import numpy as np
 
 # Add the src directory to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 
-from data_logger import DataLogger  # Adjust import based on actual module location
+from data_logger import DataLogger, BinaryLog  # Adjust import based on actual module location
+
+def make_block(values, raw, timestamps_ns=None, instrument_times=None):
+    """Build a stand-in for a pipeline SampleBlock."""
+    values = np.asarray(values, dtype=float)
+    if timestamps_ns is None:
+        timestamps_ns = time.perf_counter_ns() + np.arange(values.shape[1]) * 1_000_000
+    return types.SimpleNamespace(values=values, raw=np.asarray(raw, dtype=float),
+                                 timestamps_ns=np.asarray(timestamps_ns, dtype=np.int64),
+                                 instrument_times=instrument_times)
 
 class TestDataLogger(unittest.TestCase):
     def setUp(self):
@@ -135,6 +150,348 @@ class TestDataLogger(unittest.TestCase):
             # Check the data values (excluding timestamp)
             self.assertEqual(reader[1][1:], ['10', '20', '30'])
 
+    def test_log_data_with_raw(self):
+        """Test logging calibrated and raw values side by side."""
+        logger = DataLogger(log_dir=self.temp_dir)
+        logger.start_logging([1, 2], include_raw=True)
+        logger.log_data({1: 10, 2: 20}, raw={1: 0.5, 2: 0.25})
+        logger.stop_logging()
+
+        with open(logger.filename, 'r') as f:
+            reader = list(csv.reader(f))
+            self.assertEqual(reader[0], ['Timestamp', 'Channel 1', 'Channel 2',
+                                         'Channel 1 raw', 'Channel 2 raw'])
+            self.assertEqual(reader[1][1:], ['10', '20', '0.5', '0.25'])
+
+    def test_log_block(self):
+        """Test logging a calibrated block from the sample pipeline."""
+        logger = DataLogger(log_dir=self.temp_dir)
+        logger.start_logging([1, 2], include_raw=True)
+        block = make_block([[5.0, 7.0], [6.0, 8.0]], [[1.0, 2.0], [1.0, 1.5]])
+        logger.log_block(block)
+        logger.stop_logging()
+
+        with open(logger.filename, 'r') as f:
+            reader = list(csv.reader(f))
+            self.assertEqual(len(reader), 3)  # Header + one row per sample
+            self.assertEqual(reader[1][1:], ['5.0', '6.0', '1.0', '1.0'])
+            self.assertEqual(reader[2][1:], ['7.0', '8.0', '2.0', '1.5'])
+
+    def test_threaded_logging(self):
+        """Test that the writer thread writes every queued row by stop_logging."""
+        logger = DataLogger(log_dir=self.temp_dir, threaded=True, flush_interval=10, flush_rows=10**6)
+        logger.start_logging([1, 2], include_raw=True)
+        for i in range(100):
+            logger.log_data({1: i, 2: -i}, raw={1: 0, 2: 1})
+        block = make_block([[1.5], [2.5]], [[0.0], [0.5]])
+        logger.log_block(block)
+        logger.stop_logging()
+
+        self.assertIsNone(logger._writer_thread)
+        with open(logger.filename, 'r') as f:
+            reader = list(csv.reader(f))
+            self.assertEqual(len(reader), 102)  # Header + 100 rows + 1 block row
+            self.assertEqual(reader[100][1:], ['99', '-99', '0', '1'])
+            self.assertEqual(reader[101][1:], ['1.5', '2.5', '0.0', '0.5'])
+
+    def test_threaded_logging_flushes_on_time_budget(self):
+        """Test that rows reach the file within flush_interval, before stop_logging."""
+        logger = DataLogger(log_dir=self.temp_dir, threaded=True, flush_interval=0.05, flush_rows=10**6)
+        logger.start_logging([1])
+        logger.log_data({1: 42})
+
+        deadline = time.monotonic() + 2.0
+        lines = []
+        while time.monotonic() < deadline:
+            with open(logger.filename, 'r') as f:
+                lines = f.read().splitlines()
+            if len(lines) == 2:
+                break
+            time.sleep(0.01)
+        logger.stop_logging()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].endswith(',42'))
+
+    def test_threaded_logging_survives_failed_flush(self):
+        """A failing flush is counted and reported, and the writer thread keeps going."""
+        logger = DataLogger(log_dir=self.temp_dir, threaded=True, flush_rows=1, max_queue=4)
+        logger.start_logging([1])
+        logger.writer.flush = lambda: (_ for _ in ()).throw(OSError("drive gone"))
+        for i in range(50):
+            logger.log_block(make_block([[i]], [[0]]))
+            time.sleep(0.001)
+        stopper = threading.Thread(target=logger.stop_logging, daemon=True)
+        stopper.start()
+        stopper.join(timeout=5)
+        self.assertFalse(stopper.is_alive())  # Stop never waits on a dead writer
+        self.assertGreater(logger.write_errors, 0)
+        self.assertEqual(logger.last_error, "drive gone")
+        self.assertFalse(logger.is_logging)
+
+    def test_stop_logging_with_dead_writer_thread(self):
+        """stop_logging() returns even if the writer thread is gone and its queue is full."""
+        logger = DataLogger(log_dir=self.temp_dir, threaded=True, max_queue=2)
+        logger.start_logging([1])
+        logger._queue.put(None)  # Ends the thread
+        logger._writer_thread.join()
+        for i in range(5):
+            logger.log_block(make_block([[i]], [[0]]))
+        stopper = threading.Thread(target=logger.stop_logging, daemon=True)
+        stopper.start()
+        stopper.join(timeout=5)
+        self.assertFalse(stopper.is_alive())
+        self.assertEqual(logger.dropped_rows, 3)
+
+    def test_threaded_logging_drops_when_queue_full(self):
+        """Test that a full writer queue drops rows instead of blocking the caller."""
+        logger = DataLogger(log_dir=self.temp_dir, threaded=True)
+        logger.start_logging([1])
+        writer_queue = logger._queue
+        logger._queue = queue.Queue(maxsize=1)
+        logger._queue.put((time.time(), [[0]]))
+        logger.log_data({1: 1})
+        logger.log_block(make_block(np.zeros((1, 3)), np.zeros((1, 3))))
+        self.assertEqual(logger.dropped_rows, 4)
+        logger._queue = writer_queue
+        logger.stop_logging()
+
+    def test_binary_log_round_trip(self):
+        """Test that a binary log memory-maps back with its channel metadata."""
+        logger = DataLogger(log_dir=self.temp_dir, log_format='binary')
+        self.assertTrue(str(logger.filename).endswith('.wvlog'))
+        channels = {'301': {'name': 'Pressure_1', 'unit': 'Pa', 'coefficient': '2', 'offset': '3'},
+                    '302': {'name': 'Pressure_2', 'unit': 'Pa', 'coefficient': '4', 'offset': '2'}}
+        logger.start_logging(channels.keys(), include_raw=True, channels=channels)
+        start = logger.writer.start_ns
+        block = make_block([[5.0, 7.0], [6.0, 8.0]], [[1.0, 2.0], [1.0, 1.5]],
+                           timestamps_ns=[start + 100_000_000, start + 200_000_000])
+        logger.log_block(block)
+        logger.log_data({'301': 9.0, '302': 10.0})
+        logger.stop_logging()
+
+        log = BinaryLog(logger.filename)
+        self.assertEqual(log.columns, ['time', '301', '302', '301 raw', '302 raw'])
+        self.assertEqual(log.metadata['channels']['301']['unit'], 'Pa')
+        self.assertEqual(log.metadata['time']['start_ns'], start)
+        self.assertEqual(log.metadata['channels']['302']['calibration'],
+                         {'type': 'linear', 'coefficient': '4', 'offset': '2'})
+        self.assertEqual(len(log), 3)
+        self.assertIsInstance(log.data, np.memmap)
+        np.testing.assert_array_equal(log.times[:2], [0.1, 0.2])
+        np.testing.assert_array_equal(log.column('302'), [6.0, 8.0, 10.0])
+        np.testing.assert_array_equal(log.column('301 raw')[:2], [1.0, 2.0])
+        # log_data without raw values leaves the raw columns empty
+        self.assertTrue(np.isnan(log.column('301 raw')[2]))
+
+        csv_path = os.path.join(self.temp_dir, 'export.csv')
+        log.export_csv(csv_path)
+        del log
+        with open(csv_path, 'r') as f:
+            reader = list(csv.reader(f))
+            self.assertEqual(reader[0], ['Time (s)', 'Channel 301', 'Channel 302',
+                                         'Channel 301 raw', 'Channel 302 raw'])
+            self.assertEqual(reader[1], ['0.1', '5.0', '6.0', '1.0', '1.0'])
+
+    def test_binary_log_truncated_record(self):
+        """Test that a partly written last record is ignored on reload."""
+        logger = DataLogger(log_dir=self.temp_dir, log_format='binary')
+        logger.start_logging([1])
+        logger.log_data({1: 1.0})
+        logger.log_data({1: 2.0})
+        logger.stop_logging()
+        with open(logger.filename, 'ab') as f:
+            f.write(b'\x00' * 5)
+
+        log = BinaryLog(logger.filename)
+        np.testing.assert_array_equal(log.column(1), [1.0, 2.0])
+        del log
+
+    def test_sub_second_timestamps(self):
+        """Test that rows in the same second get distinct, sample-derived timestamps."""
+        logger = DataLogger(log_dir=self.temp_dir)
+        logger.start_logging([1], instrument_time=True)
+        start = logger.writer.start_ns
+        logger.log_block(make_block([[1.0, 2.0]], [[0.0, 0.0]],
+                                    timestamps_ns=[start + 1_000, start + 251_000],
+                                    instrument_times=np.array([0.5, 0.75])))
+        logger.log_data({1: 3.0}, timestamp_ns=start + 2_000_000_000, instrument_time=2.5)
+        logger.stop_logging()
+
+        with open(logger.filename, 'r') as f:
+            reader = list(csv.reader(f))
+        self.assertEqual(reader[0], ['Timestamp', 'Channel 1', 'Instrument Time'])
+        stamps = [row[0] for row in reader[1:]]
+        fractions = [int(stamp.rsplit('.', 1)[1]) for stamp in stamps]
+        self.assertEqual((fractions[1] - fractions[0]) % 1_000_000, 250)
+        self.assertEqual(len(set(stamps)), 3)
+        self.assertEqual([row[1:] for row in reader[1:]], [['1.0', '0.5'], ['2.0', '0.75'], ['3.0', '2.5']])
+
+    def test_binary_instrument_time(self):
+        """Test the optional instrument time column of the binary log."""
+        logger = DataLogger(log_dir=self.temp_dir, log_format='binary')
+        logger.start_logging([1], instrument_time=True)
+        logger.log_block(make_block([[1.0]], [[0.0]], instrument_times=np.array([12.5])))
+        logger.log_data({1: 2.0})
+        logger.stop_logging()
+
+        log = BinaryLog(logger.filename)
+        self.assertEqual(log.columns, ['time', '1', 'instrument_time'])
+        self.assertEqual(log.column('instrument_time')[0], 12.5)
+        self.assertTrue(np.isnan(log.column('instrument_time')[1]))
+        self.assertTrue(np.all(np.diff(log.times) > 0))
+        del log
+
+    def test_derived_columns(self):
+        """Test that derived channels are logged after the calibrated ones, without raw columns."""
+        derived = {'q': {'name': 'Dynamic_Pressure', 'type': 'difference', 'inputs': ['1', '2']}}
+        block = make_block([[5.0, 7.0], [1.0, 2.0], [4.0, 5.0]], [[1.0, 2.0], [0.5, 1.0]])
+        for log_format in ('csv', 'binary'):
+            logger = DataLogger(log_dir=self.temp_dir, filename_prefix=log_format, log_format=log_format)
+            logger.start_logging(['1', '2'], include_raw=True, derived=derived)
+            logger.log_block(block)
+            logger.log_data({'1': 9.0, '2': 8.0}, raw={'1': 3.0, '2': 4.0})
+            logger.stop_logging()
+            if log_format == 'csv':
+                with open(logger.filename, 'r') as f:
+                    reader = list(csv.reader(f))
+                self.assertEqual(reader[0], ['Timestamp', 'Channel 1', 'Channel 2', 'Derived q',
+                                             'Channel 1 raw', 'Channel 2 raw'])
+                self.assertEqual(reader[1][1:], ['5.0', '1.0', '4.0', '1.0', '0.5'])
+                self.assertEqual(reader[3][1:], ['9.0', '8.0', '', '3.0', '4.0'])
+            else:
+                log = BinaryLog(logger.filename)
+                self.assertEqual(log.columns, ['time', '1', '2', 'q', '1 raw', '2 raw'])
+                self.assertEqual(log.derived_ids, ['q'])
+                self.assertEqual(log.metadata['derived']['q']['name'], 'Dynamic_Pressure')
+                np.testing.assert_array_equal(log.column('q')[:2], [4.0, 5.0])
+                np.testing.assert_array_equal(log.column('2 raw'), [0.5, 1.0, 4.0])
+                self.assertTrue(np.isnan(log.column('q')[2]))
+                del log
+
+    def test_new_file_per_session(self):
+        """Each start_logging() writes a new file instead of overwriting the last one."""
+        logger = DataLogger(log_dir=self.temp_dir)
+        filenames = []
+        for value in (1.0, 2.0):
+            logger.start_logging([1])
+            logger.log_data({1: value})
+            logger.stop_logging()
+            filenames.append(logger.filename)
+        self.assertNotEqual(filenames[0], filenames[1])
+        for filename, value in zip(filenames, ('1.0', '2.0')):
+            with open(filename, 'r') as f:
+                rows = list(csv.reader(f))
+            self.assertEqual(rows[1][1], value)
+
+    def read_manifest(self, logger):
+        with open(logger.manifest_path, 'r') as f:
+            return json.load(f)
+
+    def test_segments_rotate_by_size(self):
+        """A segment past max_segment_bytes is closed and the next one has its own header."""
+        logger = DataLogger(log_dir=self.temp_dir, max_segment_bytes=500)
+        logger.start_logging([1, 2])
+        start = time.perf_counter_ns()
+        for i in range(10):
+            stamps = start + (np.arange(5) + 5 * i) * 1_000_000
+            logger.log_block(make_block([[i] * 5, [-i] * 5], [[0] * 5, [0] * 5], stamps))
+        logger.stop_logging()
+
+        manifest = self.read_manifest(logger)
+        segments = manifest['segments']
+        self.assertGreater(len(segments), 1)
+        self.assertEqual(sum(segment['rows'] for segment in segments), 50)
+        self.assertEqual(manifest['channels'], ['1', '2'])
+        self.assertIsNotNone(manifest['stopped'])
+        for segment in segments:
+            self.assertTrue(segment['file'].endswith('.csv'))
+            self.assertLessEqual(segment['start'], segment['end'])
+            with open(os.path.join(self.temp_dir, segment['file']), 'r') as f:
+                rows = list(csv.reader(f))
+            self.assertEqual(rows[0], ['Timestamp', 'Channel 1', 'Channel 2'])
+            self.assertEqual(len(rows) - 1, segment['rows'])
+            self.assertEqual(os.path.getsize(os.path.join(self.temp_dir, segment['file'])), segment['bytes'])
+        self.assertLessEqual(segments[0]['end'], segments[1]['start'])
+
+    def test_segments_rotate_by_duration(self):
+        """A segment older than max_segment_seconds is closed at the next flush."""
+        logger = DataLogger(log_dir=self.temp_dir, max_segment_seconds=0.05)
+        logger.start_logging([1])
+        logger.log_data({1: 1.0})
+        time.sleep(0.1)
+        logger.log_data({1: 2.0})
+        logger.log_data({1: 3.0})
+        logger.stop_logging()
+        self.assertEqual([segment['rows'] for segment in self.read_manifest(logger)['segments']], [2, 1])
+
+    def test_segments_compressed(self):
+        """Closed segments are gzipped in the background and the manifest records it."""
+        logger = DataLogger(log_dir=self.temp_dir, threaded=True, flush_rows=5,
+                            max_segment_bytes=300, compress='gzip')
+        logger.start_logging([1])
+        for i in range(6):
+            logger.log_block(make_block([[i] * 5], [[0] * 5]))
+        logger.stop_logging()
+        self.assertTrue(logger.wait_compressed(timeout=5))
+
+        segments = self.read_manifest(logger)['segments']
+        self.assertGreater(len(segments), 1)
+        rows = 0
+        for segment in segments:
+            self.assertEqual(segment['compressed'], segment['file'] + '.gz')
+            self.assertFalse(os.path.exists(os.path.join(self.temp_dir, segment['file'])))
+            path = os.path.join(self.temp_dir, segment['compressed'])
+            self.assertEqual(os.path.getsize(path), segment['compressed_bytes'])
+            with gzip.open(path, 'rt', newline='') as f:
+                lines = list(csv.reader(f))
+            self.assertEqual(lines[0], ['Timestamp', 'Channel 1'])
+            rows += len(lines) - 1
+        self.assertEqual(rows, 30)
+        self.assertFalse(any(name.endswith('.tmp') for name in os.listdir(self.temp_dir)))
+
+    def test_unknown_compression(self):
+        """An unknown compression method is rejected."""
+        with self.assertRaises(ValueError):
+            DataLogger(log_dir=self.temp_dir, compress='rar')
+
+    def test_invalid_segment_limits(self):
+        """Segment limits must be positive numbers."""
+        for limits in ({'max_segment_bytes': "100MB"}, {'max_segment_bytes': 0},
+                       {'max_segment_seconds': -1}, {'max_segment_seconds': True}):
+            with self.assertRaises(ValueError):
+                DataLogger(log_dir=self.temp_dir, **limits)
+
+    def test_no_empty_trailing_segment(self):
+        """A segment opened by the last flush before Stop is removed rather than listed."""
+        logger = DataLogger(log_dir=self.temp_dir, max_segment_bytes=1)
+        logger.start_logging([1])
+        for i in range(3):
+            logger.log_data({1: float(i)})
+        logger.stop_logging()
+        segments = self.read_manifest(logger)['segments']
+        self.assertEqual([segment['rows'] for segment in segments], [1, 1, 1])
+        self.assertEqual(sorted(os.listdir(self.temp_dir)),
+                         sorted([segment['file'] for segment in segments] + [logger.manifest_path.name]))
+
+    def test_failed_rotation_is_reported(self):
+        """An error starting the next segment is counted instead of raised."""
+        logger = DataLogger(log_dir=self.temp_dir, max_segment_bytes=1)
+        logger.start_logging([1])
+        def fail(*args):
+            raise OSError("disk full")
+        logger._open_segment = fail
+        logger.log_data({1: 1.0})
+        self.assertEqual(logger.write_errors, 1)
+        self.assertEqual(logger.last_error, "disk full")
+        logger.stop_logging()
+        self.assertFalse(logger.is_logging)
+        self.assertEqual(len(self.read_manifest(logger)['segments']), 1)
+
+    def test_unknown_format(self):
+        """Test that an unknown log format is rejected."""
+        with self.assertRaises(ValueError):
+            DataLogger(log_dir=self.temp_dir, log_format='xlsx')
+
     def test_log_data_without_logging(self):
         """Test logging data when not in logging mode."""
         logger = DataLogger(log_dir=self.temp_dir)
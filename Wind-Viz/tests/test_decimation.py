@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from src.decimation import MinMaxPyramid
+
+def make_signal(n, spike_at=None):
+    times = np.arange(n) * 0.01
+    values = np.vstack([np.sin(times), np.cos(times)])
+    if spike_at is not None:
+        values[0, spike_at] = 100.0
+    return times, values
+
+def test_levels_summarise_raw_buckets():
+    pyramid = MinMaxPyramid(2, 1000, factor=4)
+    times, values = make_signal(1000)
+    pyramid.extend(times, values)
+
+    level_min, level_max = pyramid.levels[0]
+    assert len(level_min) == 250
+    np.testing.assert_array_equal(level_min.times(), times[::4])
+    np.testing.assert_array_equal(level_min.values(), values.reshape(2, -1, 4).min(axis=2))
+    level_min, level_max = pyramid.levels[1]
+    np.testing.assert_array_equal(level_max.values(), values[:, :992].reshape(2, -1, 16).max(axis=2))
+
+def test_append_matches_extend():
+    appended = MinMaxPyramid(2, 500, factor=4)
+    extended = MinMaxPyramid(2, 500, factor=4)
+    times, values = make_signal(700)
+    for i in range(700):
+        appended.append(times[i], values[:, i])
+    for chunk in np.array_split(np.arange(700), 9):
+        extended.extend(times[chunk], values[:, chunk])
+
+    np.testing.assert_array_equal(appended.times(), extended.times())
+    for (a_min, a_max), (e_min, e_max) in zip(appended.levels, extended.levels):
+        np.testing.assert_array_equal(a_min.values(), e_min.values())
+        np.testing.assert_array_equal(a_max.values(), e_max.values())
+
+def test_short_window_returns_raw_samples():
+    pyramid = MinMaxPyramid(2, 10000)
+    times, values = make_signal(10000)
+    pyramid.extend(times, values)
+    t, v = pyramid.envelope(99.0, times[-1], pixels=500)
+    assert np.shares_memory(v, pyramid.raw._values)
+    assert t[-1] == times[-1]
+    assert len(t) <= 102
+
+def test_long_window_is_decimated_and_keeps_spikes():
+    pyramid = MinMaxPyramid(2, 100000)
+    times, values = make_signal(100000, spike_at=31337)
+    pyramid.extend(times, values)
+    t, v = pyramid.envelope(0.0, times[-1], pixels=800)
+
+    assert len(t) <= 2 * 800 + 2
+    assert v[0].max() == 100.0  # A single-sample spike survives decimation
+    assert v[1].min() == pytest.approx(values[1].min())
+    assert t[0] == 0.0
+    # The newest, not yet summarised samples are drawn too
+    assert t[-1] >= times[-1] - 8 ** 3 * 0.01
+
+def test_window_in_the_past_excludes_newer_data():
+    pyramid = MinMaxPyramid(1, 100000)
+    times = np.arange(100000) * 0.01
+    pyramid.extend(times, times[None, :])
+    t, v = pyramid.envelope(100.0, 500.0, pixels=100)
+    # Only the bucket straddling the end of the window reaches past it
+    assert v.max() < 510.0
+    assert t.min() <= 100.0 and t.max() <= 500.0
+
+def test_clear():
+    pyramid = MinMaxPyramid(1, 100)
+    pyramid.extend(np.arange(50.0), np.ones((1, 50)))
+    pyramid.clear()
+    assert len(pyramid) == 0
+    assert all(len(level_min) == 0 for level_min, _ in pyramid.levels)
+    t, v = pyramid.envelope(0, 0, 100)
+    assert t.shape == (0,) and v.shape == (1, 0)
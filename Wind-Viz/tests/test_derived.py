@@ -0,0 +1,83 @@
+import time
+import numpy as np
+import pytest
+from src.derived import DerivedChannels, SlidingStats
+
+def windowed(x, window, func):
+    return np.array([func(x[max(0, k - window + 1):k + 1]) for k in range(len(x))])
+
+@pytest.mark.parametrize('window', [1, 5, 64, 1000])
+def test_sliding_stats_match_direct_computation(window):
+    rng = np.random.default_rng(window)
+    x = rng.normal(101325.0, 3.0, 3000)  # Large offset, small spread: the hard case for rounding
+    stats = SlidingStats(window)
+    means, m2s, counts, start = [], [], [], 0
+    for n in [1, 2, 700, 3, 1200, 1, 94, 999]:  # Blocks shorter and longer than the window
+        mean, m2, count = stats.update(x[start:start + n])
+        means.append(mean)
+        m2s.append(m2)
+        counts.append(count)
+        start += n
+    np.testing.assert_allclose(np.concatenate(means), windowed(x, window, np.mean), rtol=1e-12)
+    expected = windowed(x, window, lambda v: ((v - v.mean()) ** 2).sum())
+    np.testing.assert_allclose(np.concatenate(m2s), expected, rtol=1e-6, atol=1e-6)
+    np.testing.assert_array_equal(np.concatenate(counts), np.minimum(np.arange(1, 3001), window))
+
+def test_statistics_channels():
+    derived = DerivedChannels({
+        'mean': {'type': 'mean', 'input': '1', 'window': 4},
+        'rms': {'type': 'rms', 'input': '1', 'window': 4},
+        'std': {'type': 'std', 'input': '1', 'window': 4},
+    }, ['1'])
+    assert len(derived._windows) == 1  # Shared by the three statistics
+    x = np.array([[3.0, -3.0, 4.0, 0.0, 1.0, 2.0]])
+    out = derived.apply(x)
+    np.testing.assert_allclose(out[1], windowed(x[0], 4, np.mean))
+    np.testing.assert_allclose(out[2], windowed(x[0], 4, lambda v: np.sqrt((v * v).mean())))
+    np.testing.assert_allclose(out[3], windowed(x[0], 4, lambda v: v.std(ddof=1) if len(v) > 1 else 0.0))
+
+def test_pitot_airspeed_and_sting_force():
+    derived = DerivedChannels({
+        'q': {'type': 'difference', 'inputs': ['total', 'static']},
+        'V': {'type': 'airspeed', 'input': 'q'},
+        'V_ideal_gas': {'type': 'airspeed', 'input': 'q', 'static_pressure': 'static', 'temperature': 'T'},
+        'N': {'type': 'linear', 'inputs': ['s1', 's2'], 'weights': [2.0, -1.0], 'offset': 0.5},
+    }, ['total', 'static', 'T', 's1', 's2'])
+    assert derived.ids[-4:] == ['q', 'V', 'V_ideal_gas', 'N']
+    values = np.array([[101937.5, 101325.0], [101325.0, 101325.0], [15.0, 15.0], [1.0, 2.0], [3.0, 1.0]])
+    out = derived.apply(values)
+    np.testing.assert_allclose(out[:5], values)
+    np.testing.assert_allclose(out[5], [612.5, 0.0])
+    np.testing.assert_allclose(out[6], [np.sqrt(2 * 612.5 / 1.225), 0.0])
+    rho = 101325.0 / (287.05 * 288.15)
+    np.testing.assert_allclose(out[7], [np.sqrt(2 * 612.5 / rho), 0.0])
+    np.testing.assert_allclose(out[8], [-0.5, 3.5])
+    assert derived.info()['q'] == {'type': 'difference', 'inputs': ['total', 'static'], 'name': 'q', 'unit': ''}
+
+@pytest.mark.parametrize('spec, message', [
+    ({'x': {'type': 'mean', 'input': 'nope', 'window': 3}}, "unknown input 'nope'"),
+    ({'x': {'type': 'mean', 'input': 'y', 'window': 3}, 'y': {'type': 'mean', 'input': '1', 'window': 3}},
+     "unknown input 'y'"),
+    ({'x': {'type': 'rms', 'input': '1'}}, "window"),
+    ({'x': {'type': 'linear', 'inputs': ['1'], 'weights': [1, 2]}}, "one weight per input"),
+    ({'x': {'type': 'cubic'}}, "unknown type"),
+    ({'1': {'type': 'mean', 'input': '1', 'window': 3}}, "already in use"),
+])
+def test_config_errors(spec, message):
+    with pytest.raises(ValueError, match=message):
+        DerivedChannels(spec, ['1'])
+
+def test_block_cost_does_not_grow_with_window():
+    x = np.random.default_rng(0).normal(size=(1, 10))
+
+    def per_block(window):
+        derived = DerivedChannels({'s': {'type': 'std', 'input': '1', 'window': window}}, ['1'])
+        for _ in range(2 * window // 10 + 1):
+            derived.apply(x)  # Fill the window first
+        start = time.perf_counter()
+        for _ in range(200):
+            derived.apply(x)
+        return time.perf_counter() - start
+
+    small, large = min(per_block(10) for _ in range(3)), min(per_block(20000) for _ in range(3))
+    assert large < 5 * small
@@ -0,0 +1,78 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from src.headless import main, run
+from src.config_manager import ConfigManager
+from src.data_logger import BinaryLog
+
+WIND_VIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({
+        'channels': {'301': {'name': 'Pressure_1', 'unit': 'Pa', 'coefficient': '2', 'offset': '3'},
+                     '302': {'name': 'Temp_1', 'unit': 'C', 'coefficient': '1', 'offset': '0'}},
+        'graphs': {'Pressure': ['301'], 'Temperature': ['302']},
+        'daq': {'backend': 'sim'},
+    }))
+    return path
+
+def test_run_logs_for_duration(config_path, tmp_path):
+    summary = run(ConfigManager(config_path), duration=0.3, rate=100, log_format='binary',
+                  log_dir=tmp_path / "logs", status_interval=0)
+    assert 15 <= summary['samples'] <= 40
+    assert summary['failed'] == 0
+    log = BinaryLog(summary['log_file'])
+    assert len(log) == summary['samples']
+    assert log.channel_ids == ['301', '302']
+
+def test_run_streaming(config_path, tmp_path):
+    summary = run(ConfigManager(config_path), duration=0.3, rate=1000, log_dir=tmp_path / "logs",
+                  stream=True, status_interval=0, poll_interval=0.05)
+    assert summary['samples'] >= 200
+    assert summary['dropped'] == 0
+
+def test_main_exit_status(config_path, tmp_path, capsys):
+    assert main([str(config_path), '--duration', '0.2', '--log-dir', str(tmp_path)]) == 0
+    assert "Logged" in capsys.readouterr().out
+
+def test_main_without_channels(tmp_path):
+    empty = tmp_path / "empty.json"
+    empty.write_text("{}")
+    assert main([str(empty)]) == 1
+
+@pytest.mark.parametrize('path, entry, error', [
+    (('channels', '302'), {'measurement': {'function': 'VOLT:XX'}}, "Channel 302"),
+    (('channels', '302'), {'calibration': {'type': 'spline'}}, "Channel 302"),
+    (('display',), {'fps': 0}, "fps must be a positive number"),
+    (('display',), {'fps': 'fast'}, "fps must be a positive number"),
+])
+def test_invalid_config_starts_nothing(config_path, tmp_path, capsys, path, entry, error):
+    config = json.loads(config_path.read_text())
+    section = config
+    for key in path:
+        section = section.setdefault(key, {})
+    section.update(entry)
+    config_path.write_text(json.dumps(config))
+    with pytest.raises(ValueError, match=error):
+        run(ConfigManager(config_path), duration=0.1, log_dir=tmp_path / "logs", status_interval=0)
+    assert not (tmp_path / "logs").exists()
+    assert main([str(config_path), '--duration', '0.1', '--log-dir', str(tmp_path / "logs")]) == 1
+    assert error in capsys.readouterr().out
+    assert not (tmp_path / "logs").exists()
+
+def test_never_imports_qt():
+    code = "import sys, src.headless; print(sorted(m for m in sys.modules if m.startswith(('PyQt5', 'pyqtgraph'))))"
+    result = subprocess.run([sys.executable, '-c', code], cwd=WIND_VIZ, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+def test_run_pipelined(config_path, tmp_path):
+    config = ConfigManager(config_path)
+    config.daq['pipelined'] = True
+    summary = run(config, duration=0.3, rate=100, log_format='binary', log_dir=tmp_path / "logs",
+                  status_interval=0)
+    assert 15 <= summary['samples'] <= 40
+    assert summary['failed'] == 0
@@ -0,0 +1,56 @@
+import json
+import time
+from src.instrumentation import Instrumentation, StageTimer
+
+def test_stage_histogram_summary():
+    timer = StageTimer()
+    for ns in [1000] * 98 + [5_000_000, 9_000_000]:
+        timer.record(ns)
+    summary = timer.summary()
+    assert summary['count'] == 100
+    assert summary['p50_ms'] == 1024 / 1e6  # Upper edge of the 512..1023 ns bucket
+    assert 5.0 <= summary['p99_ms'] <= 9.0
+    assert summary['max_ms'] == 9.0
+    assert summary['mean_ms'] == (98 * 1000 + 14_000_000) / 100 / 1e6
+
+def test_record_and_time_context():
+    metrics = Instrumentation()
+    metrics.record('daq_read', 2_000_000)
+    with metrics.time('render'):
+        time.sleep(0.002)
+    assert metrics.stage('daq_read')['count'] == 1
+    assert metrics.stage('render')['max_ms'] >= 2.0
+    assert metrics.stage('missing') is None
+
+def test_counters_and_watches_in_snapshot():
+    metrics = Instrumentation()
+    state = {'dropped': 0}
+    metrics.watch('samples_dropped', lambda: state['dropped'])
+    metrics.count('reconnects')
+    metrics.count('reconnects', 2)
+    state['dropped'] = 7
+    snapshot = metrics.snapshot()
+    assert snapshot['counters'] == {'reconnects': 3, 'samples_dropped': 7}
+
+def test_disabled_records_nothing():
+    metrics = Instrumentation(enabled=False)
+    metrics.record('daq_read', 1000)
+    metrics.count('errors')
+    assert metrics.snapshot()['stages'] == {}
+    assert metrics.snapshot()['counters'] == {}
+
+def test_dump_appends_json_lines(tmp_path):
+    metrics = Instrumentation()
+    metrics.record('log_write', 50_000)
+    path = tmp_path / "metrics.jsonl"
+    metrics.dump(path)
+    metrics.dump(path)
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(lines) == 2
+    assert lines[1]['stages']['log_write']['count'] == 1
+
+def test_reset():
+    metrics = Instrumentation()
+    metrics.record('x', 1)
+    metrics.reset()
+    assert metrics.snapshot()['stages'] == {}
@@ -0,0 +1,92 @@
+import os
+import time
+import numpy as np
+import pytest
+from src.data_logger import BinaryLog, DataLogger
+from src.log_index import LogIndex
+from src.pipeline import SamplePipeline
+
+CHANNELS = {
+    '301': {'name': 'Pressure_1', 'coefficient': '1', 'offset': '0'},
+    '302': {'name': 'Temp_1', 'coefficient': '2', 'offset': '1'},
+}
+
+def write_log(tmp_path, log_format, rows, spike_at=None, derived=None):
+    logger = DataLogger(log_dir=tmp_path, filename_prefix='run', log_format=log_format)
+    logger.start_logging(CHANNELS.keys(), include_raw=True, channels=CHANNELS, derived=derived)
+    pipeline = SamplePipeline(CHANNELS, derived=derived)
+    pipeline.subscribe(logger.log_block)
+    times = np.arange(rows) * 0.001
+    raw = np.vstack([np.sin(times), np.cos(times)])
+    if spike_at is not None:
+        raw[0, spike_at] = 100.0
+    start_ns = time.perf_counter_ns()
+    for chunk in np.array_split(np.arange(rows), 7):
+        pipeline.publish_block(start_ns + (times[chunk] * 1e9).astype(np.int64), raw[:, chunk], start_ns)
+    logger.stop_logging()
+    return logger.filename
+
+def test_levels_summarise_buckets(tmp_path):
+    path = write_log(tmp_path, 'binary', 10000)
+    index = LogIndex(path, factor=4, chunk_rows=1000)
+    values = BinaryLog(path).data[:, 1:3]
+    times, mins, maxs = index.levels[0]
+    assert len(times) == 2500
+    np.testing.assert_array_equal(times, BinaryLog(path).times[::4])
+    np.testing.assert_array_equal(mins, values.reshape(-1, 4, 2).min(axis=1))
+    times, mins, maxs = index.levels[2]  # 64 rows per bucket, the last one partial
+    assert len(times) == 157
+    np.testing.assert_array_equal(maxs[-1], values[156 * 64:].max(axis=0))
+    assert len(index.levels[-1][0]) <= 2
+
+def test_sidecar_is_reused_until_the_log_changes(tmp_path, capsys):
+    path = write_log(tmp_path, 'binary', 5000)
+    LogIndex(path)
+    assert os.path.exists(f"{path}.wvidx")
+    assert "Indexing" in capsys.readouterr().out
+    LogIndex(path)
+    assert "Indexing" not in capsys.readouterr().out
+
+    with open(path, 'ab') as f:
+        f.write(np.zeros(5).tobytes())  # One more row (time + 2 channels + 2 raw)
+    index = LogIndex(path)
+    assert "Indexing" in capsys.readouterr().out
+    assert len(index) == 5001
+
+def test_envelope_reads_raw_rows_when_zoomed_in(tmp_path):
+    path = write_log(tmp_path, 'binary', 100000)
+    index = LogIndex(path)
+    start = index.start + 10.0
+    times, values = index.envelope(start, start + 0.1, 500)
+    assert times[0] <= start and times[-1] <= start + 0.1
+    assert 100 <= len(times) <= 102
+    np.testing.assert_allclose(values[1], 2 * np.cos(times - index.start) + 1, atol=1e-6)
+
+def test_envelope_keeps_spikes_at_any_zoom(tmp_path):
+    path = write_log(tmp_path, 'binary', 200000, spike_at=123457)
+    index = LogIndex(path)
+    times, values = index.envelope(index.start, index.end, 400)
+    assert len(times) <= 2 * 400
+    assert values[0].max() == 100.0
+    assert values[0].min() == pytest.approx(-1.0, abs=1e-3)
+
+def test_csv_log_is_converted_once(tmp_path, capsys):
+    path = write_log(tmp_path, 'csv', 3000)
+    index = LogIndex(path)
+    assert "Converting" in capsys.readouterr().out
+    assert index.channel_ids == ['301', '302']
+    assert len(index) == 3000
+    assert index.end - index.start == pytest.approx(2.999, abs=1e-5)
+    _, values = index.envelope(index.start + 0.5, index.start + 0.6, 1000)
+    assert values.shape[0] == 2
+    LogIndex(path)
+    assert "Converting" not in capsys.readouterr().out
+
+@pytest.mark.parametrize('log_format', ['csv', 'binary'])
+def test_derived_channels_are_indexed(tmp_path, log_format):
+    derived = {'q': {'name': 'Dynamic_Pressure', 'type': 'difference', 'inputs': ['302', '301']}}
+    index = LogIndex(write_log(tmp_path, log_format, 1000, derived=derived))
+    assert index.channel_ids == ['301', '302', 'q']
+    times, values = index.envelope(index.start, index.end, 100)
+    assert values.shape[0] == 3
+    assert values[2].max() == pytest.approx(3.0, abs=1e-3)  # 2 cos(t) + 1 - sin(t) at t = 0
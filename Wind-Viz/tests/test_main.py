@@ -1,19 +1,29 @@
+import json
 import sys
 import pytest
 from PyQt5 import QtWidgets, QtCore
 from unittest.mock import Mock, patch, MagicMock
 from src.main import DAQReaderApp
+import numpy as np
+from src.daq_interface import Sample, StreamBlock
 
 @pytest.fixture
 def app(qtbot):
     with patch('src.main.ConfigManager') as MockConfigManager, \
          patch('src.main.DAQInterface') as MockDAQInterface, \
          patch('src.main.DataLogger') as MockDataLogger, \
-         patch('src.main.PlotWidget') as MockPlotWidget:
+         patch('src.main.PlotWidget') as MockPlotWidget, \
+         patch('src.main.AcquisitionWorker') as MockAcquisitionWorker, \
+         patch('src.main.SamplePipeline') as MockSamplePipeline:
         
         config = MockConfigManager.return_value
         config.channels = {}
         config.graphs = {}
+        config.derived = {}
+        config.daq = {}
+        config.display = {}
+        config.instrumentation = {}
+        config.logging = {}
         config.load_config = Mock()
 
         daq = MockDAQInterface.return_value
@@ -23,6 +33,12 @@ def app(qtbot):
         logger.start_logging = Mock()
         logger.stop_logging = Mock()
         logger.log_data = Mock()
+        logger.write_errors = 0
+
+        worker = MockAcquisitionWorker.return_value
+        worker.drain.return_value = []
+        worker.start_ns = 0
+        worker.stats.return_value = {'samples': 0, 'dropped': 0, 'late': 0, 'failed': 0, 'queued': 0}
 
         test_app = DAQReaderApp()
         qtbot.addWidget(test_app)
@@ -61,12 +77,18 @@ def test_start_measuring_no_config(app, qtbot, capsys):
         assert test_app.timer.isActive() is False
 
 def test_start_measuring_with_config(app, qtbot, capsys):
-    test_app, config, _, logger, _ = app
+    test_app, config, daq, logger, _ = app
     config.channels = {"CH1": "Pressure"}
     
     test_app.start_measuring()
     assert test_app.measuring is True
-    logger.start_logging.assert_called_once_with(config.channels.keys())  # Match dict_keys
+    daq.configure_scan.assert_called_once_with(config.channels.keys())
+    assert test_app.acquisition is not None
+    test_app.acquisition.start.assert_called_once()
+    logger.start_logging.assert_called_once_with(config.channels.keys(), include_raw=True,
+                                                 channels=config.channels,
+                                                 derived=config.derived)  # Match dict_keys
+    test_app.pipeline.reset.assert_called_once()
     assert test_app.timer.isActive()
     assert not test_app.start_button.isEnabled()
     assert test_app.stop_button.isEnabled()
@@ -95,8 +117,53 @@ def test_load_config_file_selected(app, qtbot):
         with patch.object(test_app, 'update_plot_layout') as mock_update:
             test_app.load_config()
             config.load_config.assert_called_once_with("../config.json")
+            test_app.pipeline.configure.assert_called_once_with(config.channels, config.derived)
             mock_update.assert_called_once()
 
+def test_load_config_selects_daq_backend(app, qtbot):
+    test_app, config, _, _, _ = app
+    config.daq = {"backend": "sim"}
+    with patch.object(QtWidgets.QFileDialog, 'getOpenFileName', return_value=("../config.json", "*.json")), \
+         patch('src.main.open_daq') as mock_open_daq, \
+         patch.object(test_app, 'update_plot_layout'):
+        test_app.load_config()
+        mock_open_daq.assert_called_once_with({"backend": "sim"})
+        assert test_app.daq is mock_open_daq.return_value
+        test_app.daq.set_measurements.assert_called_once_with(config.channels)
+
+def test_load_config_invalid(app, qtbot):
+    test_app, config, daq, _, _ = app
+    config.validate.side_effect = ValueError("Channel 301: unknown measurement function 'VOLT:XX'")
+    with patch.object(QtWidgets.QFileDialog, 'getOpenFileName', return_value=("../config.json", "*.json")), \
+         patch.object(QtWidgets.QMessageBox, 'warning') as mock_warning, \
+         patch('src.main.open_daq') as mock_open_daq, \
+         patch.object(test_app, 'update_plot_layout') as mock_update:
+        test_app.load_config()
+    mock_warning.assert_called_once()
+    assert "Channel 301" in mock_warning.call_args.args[2]
+    mock_open_daq.assert_not_called()
+    test_app.daq.set_measurements.assert_not_called()
+    test_app.pipeline.configure.assert_not_called()
+    mock_update.assert_not_called()
+
+def test_load_config_while_measuring(app, qtbot):
+    test_app, config, daq, _, _ = app
+    config.channels = {"CH1": "Pressure"}
+    test_app.start_measuring()
+    test_app.pipeline.configure.reset_mock()
+    with patch.object(QtWidgets.QFileDialog, 'getOpenFileName', return_value=("../config.json", "*.json")), \
+         patch.object(QtWidgets.QMessageBox, 'warning') as mock_warning, \
+         patch.object(test_app, 'update_plot_layout') as mock_update:
+        test_app.load_config()
+    mock_warning.assert_called_once()
+    config.load_config.assert_not_called()
+    test_app.pipeline.configure.assert_not_called()
+    mock_update.assert_not_called()
+    test_app.acquisition.drain.return_value = [Sample(1, {"CH1": 1.0})]
+    test_app.update_plots()  # The run goes on with the config it started with
+    test_app.pipeline.publish.assert_called_once()
+    test_app.stop_measuring()
+
 def test_load_config_no_file(app, qtbot):
     test_app, config, _, _, _ = app
     with patch.object(QtWidgets.QFileDialog, 'getOpenFileName', return_value=("", "*.json")):
@@ -122,6 +189,19 @@ def test_update_plot_layout(app, qtbot):
         MockPlotWidget.assert_any_call("Temperature", {"CH2": "Temperature"})
         mock_widget.show.assert_called()
         assert mock_add_widget.call_count == 2
+        test_app.pipeline.subscribe.assert_any_call(mock_widget.add_block)
+
+def test_stop_measuring_stops_worker(app, qtbot):
+    test_app, config, _, logger, _ = app
+    config.channels = {"CH1": "Pressure"}
+    test_app.start_measuring()
+    worker = test_app.acquisition
+    worker.drain.return_value = [Sample(1_000_000_000, {"CH1": 1.0})]
+
+    test_app.stop_measuring()
+    worker.stop.assert_called_once()
+    # Samples still queued when the worker stops are published, not lost
+    test_app.pipeline.publish.assert_called_once_with(worker.drain.return_value, worker.start_ns)
 
 def test_update_plots_not_measuring(app, qtbot):
     test_app, _, daq, logger, _ = app
@@ -142,26 +222,166 @@ def test_update_plots_with_data(app, qtbot):
     test_app, config, daq, logger, _ = app
     config.channels = {"CH1": "Pressure"}
     config.graphs = {"Pressure": ["CH1"]}
-    test_app.measuring = True
-    daq.read_channels.return_value = {"CH1": 10.0}
+    test_app.start_measuring()
+    samples = [Sample(500_000_000, {"CH1": 10.0}), Sample(600_000_000, {"CH1": 11.0})]
+    test_app.acquisition.drain.return_value = samples
     
     mock_widget = Mock()
     test_app.plot_widgets["Pressure"] = mock_widget
     
     test_app.update_plots()
-    daq.read_channels.assert_called_once_with(config.channels.keys())  # Match dict_keys
-    logger.log_data.assert_called_once_with({"CH1": 10.0})
-    mock_widget.update_plot.assert_called_once_with({"CH1": 10.0})
+    # The GUI never reads the instrument itself
+    daq.read_channels.assert_not_called()
+    # Both samples go through the shared pipeline as one block
+    test_app.pipeline.publish.assert_called_once_with(samples, test_app.acquisition.start_ns)
+    # Redrawing waits for the next display frame, and happens once however many samples arrived
+    mock_widget.refresh.assert_not_called()
+    test_app.update_plots()
+    test_app.renderer.render_frame()
+    mock_widget.refresh.assert_called_once()
+
+def test_load_config_stream_options(app, qtbot):
+    test_app, config, _, _, _ = app
+    config.daq = {"backend": "sim", "stream": True, "sample_interval": 0.001}
+    with patch.object(QtWidgets.QFileDialog, 'getOpenFileName', return_value=("../config.json", "*.json")), \
+         patch('src.main.open_daq') as mock_open_daq, \
+         patch.object(test_app, 'update_plot_layout'):
+        test_app.load_config()
+        mock_open_daq.assert_called_once_with({"backend": "sim"})
+    assert test_app.stream is True
+    assert test_app.sample_interval == 0.001
+
+def test_update_plots_stream_blocks(app, qtbot):
+    test_app, config, _, _, _ = app
+    config.channels = {"CH1": "Pressure"}
+    test_app.stream = True
+    test_app.start_measuring()
+    blocks = [StreamBlock(["CH1"], np.array([1, 2]), np.array([[1.0, 2.0]]), None),
+              StreamBlock(["CH1"], np.array([3]), np.array([[3.0]]), None)]
+    test_app.acquisition.drain.return_value = blocks
+    test_app.update_plots()
+
+    # The drained blocks are published as one, without going through Samples
+    test_app.pipeline.publish.assert_not_called()
+    timestamps_ns, raw, start_ns, instrument_times = test_app.pipeline.publish_block.call_args[0]
+    assert timestamps_ns.tolist() == [1, 2, 3]
+    assert raw.tolist() == [[1.0, 2.0, 3.0]]
+    assert instrument_times is None
+
+def test_load_config_sets_fps(app, qtbot):
+    test_app, config, _, _, _ = app
+    config.display = {"fps": 10}
+    with patch.object(QtWidgets.QFileDialog, 'getOpenFileName', return_value=("../config.json", "*.json")), \
+         patch.object(test_app, 'update_plot_layout'):
+        test_app.load_config()
+    assert test_app.renderer.fps == 10
+
+def test_update_plots_dumps_metrics(app, qtbot, tmp_path):
+    test_app, config, daq, logger, _ = app
+    config.channels = {"CH1": "Pressure"}
+    daq.reconnects = 2
+    daq.errors = 1
+    logger.dropped_rows = 0
+    test_app.metrics_path = tmp_path / "metrics.jsonl"
+    test_app.start_measuring()
+    test_app.acquisition.dropped = 4
+    test_app.acquisition.late = test_app.acquisition.failed = 0
+    test_app.update_plots()
+
+    snapshot = json.loads(test_app.metrics_path.read_text().splitlines()[-1])
+    assert snapshot['stages']['frame']['count'] == 1
+    assert snapshot['counters']['reconnects'] == 2
+    assert snapshot['counters']['visa_errors'] == 1
+    assert snapshot['counters']['samples_dropped'] == 4
+    assert "Reconnects: 2" in test_app.statusBar().currentMessage()
+
+def test_pipeline_feeds_logger(app, qtbot):
+    test_app, _, _, logger, _ = app
+    test_app.pipeline.subscribe.assert_any_call(logger.log_block)
 
 def test_update_plots_no_data(app, qtbot):
     test_app, config, daq, logger, _ = app
     config.channels = {"CH1": "Pressure"}
-    test_app.measuring = True
-    daq.read_channels.return_value = None
+    test_app.start_measuring()
+    test_app.acquisition.drain.return_value = []
     
     test_app.update_plots()
-    daq.read_channels.assert_called_once_with(config.channels.keys())  # Match dict_keys
-    logger.log_data.assert_not_called()
+    test_app.pipeline.publish.assert_not_called()
+
+def test_update_plot_layout_includes_derived_channels(app, qtbot):
+    test_app, config, _, _, MockPlotWidget = app
+    config.channels = {"301": {"name": "P1"}, "302": {"name": "P2"}}
+    config.derived = {"q": {"type": "difference", "inputs": ["301", "302"]}}
+    config.graphs = {"Pressure": ["301", "q"]}
+    with patch.object(test_app.plot_layout, 'addWidget'):
+        test_app.update_plot_layout()
+    channels = MockPlotWidget.call_args[0][1]
+    assert channels["301"] == {"name": "P1"}
+    assert channels["q"]["name"] == "q"
+
+def test_update_plot_layout_spectrum_graph(app, qtbot):
+    test_app, config, _, _, MockPlotWidget = app
+    config.channels = {"305": {"name": "Sting_1"}, "306": {"name": "Sting_2"}}
+    config.graphs = {"STING": ["305", "306"],
+                     "STING PSD": {"type": "spectrum", "channels": ["305"], "segment": 256},
+                     "Other": {"type": "waterfall", "channels": ["306"]}}
+    with patch('src.main.SpectrumWidget') as MockSpectrumWidget, \
+         patch.object(test_app.plot_layout, 'addWidget') as mock_add_widget:
+        test_app.update_plot_layout()
+    MockSpectrumWidget.assert_called_once_with("STING PSD", {"305": {"name": "Sting_1"}}, segment=256)
+    assert test_app.plot_widgets["STING PSD"] is MockSpectrumWidget.return_value
+    assert "Other" not in test_app.plot_widgets  # Unknown type is skipped
+    test_app.pipeline.subscribe.assert_any_call(MockSpectrumWidget.return_value.add_block)
+    assert mock_add_widget.call_args_list[1][0][1:] == (0, 1)
+
+def test_update_plot_layout_graph_window(app, qtbot):
+    test_app, config, _, _, MockPlotWidget = app
+    config.channels = {"301": {"name": "Pressure_1"}}
+    config.graphs = {"Pressure (30 min)": {"channels": ["301"], "window": 1800}}
+    with patch.object(test_app.plot_layout, 'addWidget'):
+        test_app.update_plot_layout()
+    MockPlotWidget.assert_called_once_with("Pressure (30 min)", {"301": {"name": "Pressure_1"}}, window=1800)
+
+def test_replay_lasts_one_run(app, qtbot):
+    test_app, config, daq, _, _ = app
+    config.channels = {"CH1": "Pressure"}
+    with patch.object(QtWidgets.QFileDialog, 'getOpenFileName', return_value=("run.wvlog", "")), \
+         patch.object(QtWidgets.QInputDialog, 'getDouble', return_value=(0.0, True)), \
+         patch('src.main.ReplaySource') as MockReplaySource, \
+         patch('src.main.AcquisitionWorker') as MockWorker:
+        replay = MockReplaySource.return_value
+        replay.channel_ids = ["CH1"]
+        replay.calibrated = False
+        replay.finished = False
+        MockWorker.return_value.drain.return_value = []
+        test_app.open_replay()
+        assert test_app.daq is daq  # The instrument is kept
+
+        test_app.start_measuring()
+        assert MockWorker.call_args.args[0] is replay
+        assert MockWorker.call_args.kwargs['stream'] is True
+        replay.finished = True
+        test_app.update_plots()  # End of the recording stops the run
+        assert not test_app.measuring
+        replay.close.assert_called_once()
+        assert test_app.replay is None
+
+        test_app.start_measuring()
+        assert MockWorker.call_args.args[0] is daq
+        assert MockWorker.call_args.kwargs['stream'] is False
+        test_app.stop_measuring()
+
+def test_open_viewer_uses_config_layout(app, qtbot):
+    test_app, config, _, _, _ = app
+    config.graphs = {"Pressure": ["301"]}
+    config.channels = {"301": {"name": "P1"}}
+    with patch.object(QtWidgets.QFileDialog, 'getOpenFileName', return_value=("run.wvlog", "")), \
+         patch('src.main.LogViewer') as MockLogViewer:
+        test_app.open_viewer()
+    MockLogViewer.assert_called_once_with("run.wvlog", graphs=config.graphs, channels=config.channels,
+                                          fps=test_app.renderer.fps)
+    MockLogViewer.return_value.show.assert_called_once()
+    assert MockLogViewer.return_value in test_app.viewers
 
 def test_main_execution(qtbot, monkeypatch):
     monkeypatch.setattr(sys, 'argv', ['main.py'])
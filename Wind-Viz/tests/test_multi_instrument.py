@@ -0,0 +1,135 @@
+import time
+import numpy as np
+import pytest
+from unittest.mock import Mock
+from src.daq_interface import DAQInterface, StreamBlock
+from src.multi_instrument import MultiDAQ, open_daq
+
+CHANNELS = {
+    '301': {'name': 'Pressure_1'},
+    '302': {'name': 'Pressure_2'},
+    'B101': {'name': 'Balance_1', 'instrument': 'balance', 'channel': '101'},
+    'B301': {'name': 'Balance_2', 'instrument': 'balance', 'channel': '301'},
+}
+
+def sim_instruments(latency=None):
+    """Two simulated mainframes; the balance one reads offset 7 on every channel."""
+    return {
+        'main': {'idn_match': 'SIM00001', 'simulator': {'serial': 'SIM00001', 'latency': latency or {}}},
+        'balance': {'idn_match': 'SIM00002',
+                    'simulator': {'serial': 'SIM00002', 'latency': latency or {},
+                                  'signals': {'default': {'offset': 7.0, 'amplitude': 0.0, 'noise': 0.0}}}},
+    }
+
+@pytest.fixture
+def multi():
+    daq = MultiDAQ(sim_instruments(), backend='sim')
+    daq.set_measurements(CHANNELS)
+    yield daq
+    daq.close()
+
+def test_open_daq():
+    assert isinstance(open_daq({'backend': 'sim'}), DAQInterface)
+    multi = open_daq({'backend': 'sim', 'instruments': sim_instruments()})
+    assert isinstance(multi, MultiDAQ)
+    assert multi.devices['balance'].idn.split(',')[2] == 'SIM00002'
+    multi.close()
+
+def test_instruments_need_idn_match():
+    with pytest.raises(ValueError):
+        MultiDAQ({'a': {}, 'b': {'idn_match': 'X'}}, backend='sim')
+
+def test_routing(multi):
+    assert multi.route('B101') == ('balance', '101')
+    assert multi.route('301') == ('main', '301')
+    with pytest.raises(ValueError):
+        multi.set_measurements({'X': {'instrument': 'nowhere'}})
+    with pytest.raises(ValueError):
+        multi.set_measurements({'B1': {'instrument': 'balance', 'channel': '101'},
+                                'B2': {'instrument': 'balance', 'channel': '101'}})
+
+def test_read_sample_combines_instruments(multi):
+    channel_ids = ['B301', '301', 'B101', '302']
+    assert multi.configure_scan(channel_ids)
+    assert multi.devices['main'].instrument.scan == [301, 302]
+    assert multi.devices['balance'].instrument.scan == [101, 301]
+
+    sample = multi.read_sample(channel_ids)
+    assert list(sample.values) == channel_ids
+    assert sample.values['B301'] == 7.0
+    assert sample.values['B101'] == 7.0
+    assert abs(sample.values['301']) < 2.0  # The main mainframe's default signal
+    assert multi.connected
+
+def test_instruments_are_read_in_parallel():
+    multi = MultiDAQ(sim_instruments(latency={'READ': 0.05}), backend='sim')
+    multi.set_measurements(CHANNELS)
+    multi.configure_scan(list(CHANNELS))
+    start = time.perf_counter()
+    assert multi.read_sample(list(CHANNELS)) is not None
+    assert time.perf_counter() - start < 0.09  # Not the 0.1 s of two reads in turn
+    multi.close()
+
+def test_failed_instrument_fails_the_frame(multi):
+    multi.configure_scan(list(CHANNELS))
+    multi.devices['balance'].rm.unplug()
+    assert multi.read_sample(list(CHANNELS)) is None
+
+def test_stream_joins_sweeps(multi):
+    channel_ids = ['301', 'B101']
+    assert multi.start_stream(channel_ids, 0.005)
+    time.sleep(0.1)
+    blocks = [multi.read_stream()]
+    time.sleep(0.05)
+    blocks.append(multi.read_stream())
+    multi.stop_stream()
+
+    assert all(block.channel_ids == channel_ids for block in blocks)
+    times = np.concatenate([block.timestamps_ns for block in blocks])
+    raw = np.concatenate([block.raw for block in blocks], axis=1)
+    assert raw.shape == (2, len(times))
+    assert len(times) >= 20
+    assert np.all(np.diff(times) > 0)
+    assert np.all(raw[1] == 7.0)
+    assert not multi.devices['main'].streaming
+
+def stream_block(times_ms, value):
+    times = np.array(times_ms, dtype=np.int64) * 1_000_000
+    return StreamBlock(['301'], times, np.full((1, len(times)), value), None)
+
+def test_join_matches_nearest_sweep():
+    multi = MultiDAQ.__new__(MultiDAQ)
+    multi.names = ['a', 'b']
+    multi.routes = {'A': ('a', '301'), 'B': ('b', '301')}
+    multi.devices = {'a': Mock(), 'b': Mock()}
+    multi.executor = Mock()
+    multi.executor.map.side_effect = lambda fn, names: [fn(name) for name in names]
+    multi.unmatched = 0
+    for device in multi.devices.values():
+        device.start_stream.return_value = True
+    assert multi.start_stream(['B', 'A'], 0.010)
+
+    # b runs 3 ms behind a and has lost its sweep at 20 ms
+    multi.devices['a'].read_stream.return_value = stream_block([0, 10, 20, 30, 40], 1.0)
+    multi.devices['b'].read_stream.return_value = stream_block([3, 13, 33], 2.0)
+    block = multi.read_stream()
+    np.testing.assert_array_equal(block.timestamps_ns, np.array([0, 10, 30]) * 1_000_000)
+    np.testing.assert_array_equal(block.raw, [[2.0, 2.0, 2.0], [1.0, 1.0, 1.0]])
+    assert multi.unmatched == 1
+
+    # The 40 ms sweep waited for b's next poll
+    multi.devices['a'].read_stream.return_value = stream_block([50], 1.0)
+    multi.devices['b'].read_stream.return_value = stream_block([43, 53], 2.0)
+    block = multi.read_stream()
+    np.testing.assert_array_equal(block.timestamps_ns, np.array([40, 50]) * 1_000_000)
+    assert multi.unmatched == 1
+
+def test_stream_poll_before_next_sweep(multi):
+    channel_ids = ['301', 'B101']
+    assert multi.start_stream(channel_ids, 1.0)
+    time.sleep(0.05)
+    blocks = [multi.read_stream(), multi.read_stream()]  # Both within the first interval
+    multi.stop_stream()
+    assert all(block.channel_ids == channel_ids for block in blocks)
+    assert sum(len(block.timestamps_ns) for block in blocks) <= 1
+    assert blocks[1].raw.shape == (2, 0)
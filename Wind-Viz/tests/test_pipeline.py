@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from src.daq_interface import Sample
+from src.pipeline import SamplePipeline
+
+CHANNELS = {
+    '301': {'name': 'Pressure_1', 'coefficient': '2', 'offset': '3'},
+    '302': {'name': 'Pressure_2', 'coefficient': '4', 'offset': '2'},
+}
+
+@pytest.fixture
+def samples():
+    return [Sample(2_000_000_000, {'301': 1.0, '302': 0.0}),
+            Sample(2_500_000_000, {'301': 2.0, '302': 1.0})]
+
+def test_publish_calibrates_once_for_all_subscribers(samples):
+    pipeline = SamplePipeline(CHANNELS)
+    received = []
+    pipeline.subscribe(received.append)
+    pipeline.subscribe(received.append)  # Duplicate subscription is ignored
+    other = pipeline.subscribe(lambda block: received.append(block))
+
+    block = pipeline.publish(samples, start_ns=1_000_000_000)
+
+    assert len(received) == 2
+    assert all(b is block for b in received)
+    assert block.channel_ids == ['301', '302']
+    np.testing.assert_array_equal(block.timestamps_ns, [2_000_000_000, 2_500_000_000])
+    np.testing.assert_allclose(block.times, [1.0, 1.5])
+    np.testing.assert_array_equal(block.raw, [[1.0, 2.0], [0.0, 1.0]])
+    np.testing.assert_array_equal(block.values, [[5.0, 7.0], [2.0, 6.0]])
+
+    pipeline.unsubscribe(other)
+    assert len(pipeline.subscribers) == 1
+
+def test_block_is_read_only(samples):
+    block = SamplePipeline(CHANNELS).publish(samples)
+    with pytest.raises(ValueError):
+        block.values[0, 0] = 0.0
+    with pytest.raises(ValueError):
+        block.raw[0, 0] = 0.0
+
+def test_configure_recompiles_calibration(samples):
+    pipeline = SamplePipeline(CHANNELS)
+    pipeline.configure({'302': {'coefficient': '1', 'offset': '0'}})
+    block = pipeline.publish(samples)
+    assert block.channel_ids == ['302']
+    np.testing.assert_array_equal(block.values, [[0.0, 1.0]])
+
+def test_publish_nothing():
+    pipeline = SamplePipeline(CHANNELS)
+    pipeline.subscribe(lambda block: pytest.fail("no block expected"))
+    assert pipeline.publish([]) is None
+
+def test_instrumentation_times_calibration_and_subscribers():
+    from src.instrumentation import Instrumentation
+    metrics = Instrumentation()
+    pipeline = SamplePipeline(CHANNELS, instrumentation=metrics)
+    seen = []
+    pipeline.subscribe(seen.append)
+    pipeline.publish_block(np.array([1, 2]), np.ones((len(CHANNELS), 2)))
+    stages = metrics.snapshot()['stages']
+    assert stages['calibrate']['count'] == 1
+    assert stages['deliver:list.append']['count'] == 1
+
+def test_derived_channels_follow_calibrated_values(samples):
+    derived = {'q': {'type': 'difference', 'inputs': ['301', '302']},
+               'q_mean': {'type': 'mean', 'input': 'q', 'window': 2}}
+    pipeline = SamplePipeline(CHANNELS, derived=derived)
+    received = []
+    pipeline.subscribe(received.append)
+    block = pipeline.publish(samples)
+    assert block.channel_ids == ['301', '302', 'q', 'q_mean']
+    assert block.raw.shape == (2, 2)  # Raw rows are the measured channels only
+    np.testing.assert_allclose(block.values[2], [3.0, 1.0])  # [5, 7] - [2, 6]
+    np.testing.assert_allclose(block.values[3], [3.0, 2.0])
+
+    block = pipeline.publish(samples)
+    np.testing.assert_allclose(block.values[3], [2.0, 2.0])  # The window spans both blocks
+    pipeline.reset()
+    block = pipeline.publish(samples)
+    np.testing.assert_allclose(block.values[3], [3.0, 2.0])
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from src.plot_widget import PlotWidget
+
+CHANNELS = {'301': {'name': 'Pressure_1'}}
+
+def block(start, n, rate=10.0):
+    times = start + np.arange(n) / rate
+    return SimpleNamespace(channel_ids=['301'], times=times, values=np.sin(times)[np.newaxis])
+
+def test_default_window_follows_newest_sample(qtbot):
+    widget = PlotWidget("Pressure", CHANNELS)
+    qtbot.addWidget(widget)
+    widget.add_block(block(0.0, 200))
+    widget.refresh()
+    assert widget.plot_widget.viewRange()[0] == pytest.approx([14.9, 19.9])
+
+def test_long_window_draws_decimated_history(qtbot):
+    widget = PlotWidget("Pressure", CHANNELS, window=1800)
+    qtbot.addWidget(widget)
+    widget.add_block(block(0.0, 36000))  # One hour at 10 Hz
+    widget.refresh()
+    start, end = widget.plot_widget.viewRange()[0]
+    assert (start, end) == pytest.approx((1799.9, 3599.9))
+    times, values = widget.curves['301'].getData()
+    assert times[0] <= start + 10 and times[-1] >= end - 10  # Bucket times
+    assert len(times) < 18000 / 4  # Min/max buckets, not every sample
+
+def test_pan_stops_following(qtbot):
+    widget = PlotWidget("Pressure", CHANNELS, window=60)
+    qtbot.addWidget(widget)
+    widget.add_block(block(0.0, 3000))
+    widget.refresh()
+    widget.plot_widget.setXRange(100, 200, padding=0)
+    widget.plot_widget.getViewBox().sigRangeChangedManually.emit([True, False])
+    widget.add_block(block(300.0, 100))
+    widget.refresh()
+    assert widget.plot_widget.viewRange()[0] == pytest.approx([100, 200])
+    times, _ = widget.curves['301'].getData()
+    assert times[0] <= 100 and 199.9 <= times[-1] <= 200
+
+    widget.set_window(60)  # Follows again
+    widget.refresh()
+    assert widget.plot_widget.viewRange()[0][1] == pytest.approx(309.9)
@@ -0,0 +1,55 @@
+import time
+import pytest
+from unittest.mock import Mock
+from src.render_scheduler import RenderScheduler
+
+def test_marks_coalesce_into_one_frame(qtbot):
+    scheduler = RenderScheduler(fps=50)
+    widget = Mock()
+    for _ in range(10):
+        scheduler.mark_dirty(widget)
+    widget.refresh.assert_not_called()
+
+    qtbot.waitUntil(lambda: widget.refresh.called, timeout=1000)
+    qtbot.wait(50)
+    widget.refresh.assert_called_once()
+    assert scheduler.stats()['frames'] == 1
+
+def test_frames_are_rate_limited(qtbot):
+    scheduler = RenderScheduler(fps=20)
+    widget = Mock()
+    scheduler.mark_dirty(widget)
+    scheduler.render_frame()
+    start = time.perf_counter()
+    scheduler.mark_dirty(widget)
+    qtbot.waitUntil(lambda: widget.refresh.call_count == 2, timeout=1000)
+    assert time.perf_counter() - start >= 0.03
+
+def test_slow_frame_drops_frames_instead_of_queueing(qtbot):
+    scheduler = RenderScheduler(fps=100)
+    widget = Mock()
+    widget.refresh.side_effect = lambda: time.sleep(0.035)
+    scheduler.mark_dirty(widget)
+    scheduler.render_frame()
+
+    stats = scheduler.stats()
+    assert stats['dropped'] == 3
+    assert stats['render_ms'] >= 35
+    assert stats['render_ms_max'] == stats['render_ms']
+
+def test_render_without_dirty_widgets_is_a_no_op(qtbot):
+    scheduler = RenderScheduler()
+    scheduler.render_frame()
+    assert scheduler.stats()['frames'] == 0
+
+def test_discard(qtbot):
+    scheduler = RenderScheduler()
+    widget = Mock()
+    scheduler.mark_dirty(widget)
+    scheduler.discard(widget)
+    scheduler.render_frame()
+    widget.refresh.assert_not_called()
+
+def test_invalid_fps(qtbot):
+    with pytest.raises(ValueError):
+        RenderScheduler(fps=0)
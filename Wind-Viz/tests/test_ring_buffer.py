@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from ring_buffer import RingBuffer
+
+def test_append_before_full():
+    buf = RingBuffer(2, 4)
+    buf.append(0.0, [1.0, 10.0])
+    buf.append(0.1, [2.0, 20.0])
+
+    assert len(buf) == 2
+    np.testing.assert_array_equal(buf.times(), [0.0, 0.1])
+    np.testing.assert_array_equal(buf.values(), [[1.0, 2.0], [10.0, 20.0]])
+
+def test_append_wraps_keeping_newest():
+    buf = RingBuffer(1, 3)
+    for i in range(5):
+        buf.append(float(i), [i * 2.0])
+
+    assert len(buf) == 3
+    np.testing.assert_array_equal(buf.times(), [2.0, 3.0, 4.0])
+    np.testing.assert_array_equal(buf.values(0), [4.0, 6.0, 8.0])
+
+def test_views_are_zero_copy_and_read_only():
+    buf = RingBuffer(2, 3)
+    for i in range(4):
+        buf.append(float(i), [i, -i])
+
+    values = buf.values()
+    assert np.shares_memory(values, buf._values)
+    assert np.shares_memory(buf.times(), buf._times)
+    with pytest.raises(ValueError):
+        values[0, 0] = 99.0
+
+def test_extend_matches_repeated_append():
+    appended = RingBuffer(2, 5)
+    extended = RingBuffer(2, 5)
+    times = np.arange(7, dtype=float)
+    block = np.vstack([times * 3, times * -1])
+    for i in range(7):
+        appended.append(times[i], block[:, i])
+    extended.extend(times[:3], block[:, :3])
+    extended.extend(times[3:], block[:, 3:])
+
+    np.testing.assert_array_equal(extended.times(), appended.times())
+    np.testing.assert_array_equal(extended.values(), appended.values())
+
+def test_extend_larger_than_capacity():
+    buf = RingBuffer(1, 3)
+    buf.append(-1.0, [0.0])
+    buf.extend(np.arange(10.0), np.arange(10.0)[None, :])
+
+    np.testing.assert_array_equal(buf.times(), [7.0, 8.0, 9.0])
+    np.testing.assert_array_equal(buf.values(0), [7.0, 8.0, 9.0])
+
+def test_clear():
+    buf = RingBuffer(1, 3)
+    buf.append(0.0, [1.0])
+    buf.clear()
+    assert len(buf) == 0
+    assert buf.times().shape == (0,)
+    assert buf.values().shape == (1, 0)
+
+def test_invalid_capacity():
+    with pytest.raises(ValueError):
+        RingBuffer(1, 0)
@@ -0,0 +1,221 @@
+import time
+import numpy as np
+import pytest
+from src.daq_interface import DAQInterface, BACKEND_ENV
+from src.simulator import SimulatedDAQ970A, SimulatedResourceManager
+
+@pytest.fixture
+def sim_daq():
+    return DAQInterface(backend='sim', simulator={'signals': {'301': {'offset': 5.0, 'amplitude': 0.0, 'noise': 0.0}}})
+
+def test_connects_to_simulator(sim_daq):
+    assert sim_daq.connected is True
+    assert isinstance(sim_daq.rm, SimulatedResourceManager)
+    assert isinstance(sim_daq.instrument, SimulatedDAQ970A)
+
+def test_backend_from_environment(monkeypatch):
+    monkeypatch.setenv(BACKEND_ENV, 'sim')
+    daq = DAQInterface()
+    assert daq.backend == 'sim'
+    assert isinstance(daq.instrument, SimulatedDAQ970A)
+
+def test_per_channel_read(sim_daq):
+    data = sim_daq.read_channels(['301', '302'])
+    assert data['301'] == 5.0
+    assert set(data) == {'301', '302'}
+
+def test_scan_read(sim_daq):
+    sim_daq.configure_scan(['301', '302', '303'])
+    assert sim_daq.instrument.scan == [301, 302, 303]
+    sample = sim_daq.read_sample(['301', '302', '303'])
+    assert sample.values['301'] == 5.0
+    assert len(sample.values) == 3
+
+def test_scan_relative_time_stamps():
+    daq = DAQInterface(backend='sim', instrument_time='relative')
+    daq.configure_scan(['301', '302'])
+    sample = daq.read_sample(['301', '302'])
+    assert sample.instrument_time == 0.0
+
+def test_scan_absolute_time_stamps():
+    daq = DAQInterface(backend='sim', instrument_time='absolute')
+    daq.configure_scan(['301'])
+    sample = daq.read_sample(['301'])
+    assert sample.instrument_time == pytest.approx(time.time(), abs=2.0)
+
+def test_latency_model():
+    instrument = SimulatedDAQ970A(latency={'READ': 0.02, 'default': 0.0})
+    instrument.write(':ROUT:SCAN (@301:302)')
+    start = time.perf_counter()
+    instrument.query('READ?')
+    assert time.perf_counter() - start >= 0.02
+    start = time.perf_counter()
+    instrument.write(':TRIG:COUN 1')
+    assert time.perf_counter() - start < 0.02
+
+def test_noise_model_is_seeded():
+    signals = {'default': {'offset': 1.0, 'amplitude': 0.0, 'noise': 0.5}}
+    a = SimulatedDAQ970A(signals=signals, seed=3)
+    b = SimulatedDAQ970A(signals=signals, seed=3)
+    assert a.query('MEAS:VOLT:DC? (@301:305)') == b.query('MEAS:VOLT:DC? (@301:305)')
+    readings = [float(v) for v in a.query('MEAS:VOLT:DC? (@301:399)').split(',')]
+    assert 0.8 < sum(readings) / len(readings) < 1.2
+
+def test_measurement_setup():
+    channels = {'301': {'measurement': {'function': 'TEMP', 'type': 'K', 'nplc': 10, 'autozero': 'ONCE'}},
+                '302': {'measurement': {'range': 10, 'nplc': 0.02}}}
+    daq = DAQInterface(backend='sim')
+    daq.set_measurements(channels)
+    daq.configure_scan(['301', '302'])
+    instrument = daq.instrument
+    assert instrument.functions == {301: 'TEMP', 302: 'VOLT:DC'}
+    assert instrument.settings == {301: {'NPLC': 10.0, 'ZERO:AUTO': 'ONCE'}, 302: {'NPLC': 0.02}}
+    assert instrument.query('SYST:ERR?').startswith('+0')
+    assert daq.read_sample(['301', '302']) is not None
+
+def test_meas_read_undoes_the_scan_setup():
+    daq = DAQInterface(backend='sim')
+    daq.set_measurements({'301': {'measurement': {'nplc': 0.02}}})
+    daq.configure_scan(['301', '302'])
+    assert daq.read_channels(['301']) is not None  # MEAS? resets 301 and the scan list
+    assert daq.instrument.scan == [301]
+    assert daq.configure_scan(['301', '302'])
+    assert daq.instrument.settings == {301: {'NPLC': 0.02}}
+    daq.read_channels(['302'])
+    assert daq.read_sample(['301', '302']) is not None  # Sends the setup again by itself
+    assert daq.instrument.scan == [301, 302]
+    assert daq.instrument.settings == {301: {'NPLC': 0.02}}
+
+def test_nplc_scales_reading_time():
+    instrument = SimulatedDAQ970A(reading_time=0.01)
+    instrument.write(':ROUT:SCAN (@301:302)')
+    instrument.write(':SENS:VOLT:DC:NPLC 0.02,(@301:302)')
+    start = time.perf_counter()
+    instrument.query('READ?')
+    assert time.perf_counter() - start < 0.01
+    instrument.write(':CONF:VOLT:DC (@301:302)')  # Back to NPLC 1
+    start = time.perf_counter()
+    instrument.query('READ?')
+    assert time.perf_counter() - start >= 0.02
+
+def test_channel_list_parsing():
+    assert SimulatedDAQ970A.parse_channels('ROUT:SCAN (@301:303,305)') == [301, 302, 303, 305]
+    assert SimulatedDAQ970A.parse_channels('*IDN?') == []
+
+def test_unknown_command_queues_error():
+    instrument = SimulatedDAQ970A()
+    instrument.write('FOO:BAR 1')
+    assert instrument.query('SYST:ERR?').startswith('-113')
+    assert instrument.query('SYST:ERR?').startswith('+0')
+
+def test_timer_triggered_stream():
+    daq = DAQInterface(backend='sim', simulator={'signals': {'301': {'offset': 5.0, 'amplitude': 0.0, 'noise': 0.0}}})
+    assert daq.start_stream(['302', '301'], interval=0.005)
+    assert daq.instrument.trigger_source == 'TIM'
+    time.sleep(0.06)
+    block = daq.read_stream()
+    n = len(block.timestamps_ns)
+    assert n >= 5
+    assert block.raw.shape == (2, n)
+    assert (block.raw[1] == 5.0).all()  # Rows follow the requested channel order
+    # Sweeps are spaced by the trigger timer, not by when they were read
+    assert (np.diff(block.timestamps_ns) == 5_000_000).all()
+    assert block.timestamps_ns[0] == daq.stream_start_ns
+
+    time.sleep(0.02)
+    later = daq.read_stream()
+    assert later.timestamps_ns[0] == block.timestamps_ns[-1] + 5_000_000
+    daq.stop_stream()
+    assert daq.instrument.trigger_source == 'IMM'
+    assert daq.read_sample(['302', '301']).values['301'] == 5.0
+
+def test_binary_block_replies():
+    instrument = SimulatedDAQ970A(signals={'default': {'offset': 1.5, 'amplitude': 0.0, 'noise': 0.0}})
+    instrument.write(':FORM:DATA REAL,32')
+    raw = instrument.query_binary_values('MEAS:VOLT:DC? (@301:303)', datatype='f', is_big_endian=True,
+                                         container=np.array)
+    np.testing.assert_array_equal(raw, [1.5, 1.5, 1.5])
+    instrument.write(':FORM:DATA REAL,64')
+    instrument.write('MEAS:VOLT:DC? (@301)')
+    assert instrument.read_raw() == b'#18' + np.array([1.5], dtype='>f8').tobytes() + b'\n'
+    instrument.write(':FORM:DATA ASC')
+    assert float(instrument.query('MEAS:VOLT:DC? (@301)')) == 1.5
+
+@pytest.mark.parametrize('data_format', ['real32', 'real64'])
+def test_binary_transfer(data_format):
+    signals = {'301': {'offset': 5.0, 'amplitude': 0.0, 'noise': 0.0}}
+    daq = DAQInterface(backend='sim', data_format=data_format, instrument_time='relative',
+                       simulator={'signals': signals})
+    daq.configure_scan(['302', '301'])
+    assert daq.instrument.data_type is not None
+    sample = daq.read_sample(['302', '301'])
+    assert sample.values['301'] == 5.0
+    assert sample.instrument_time == 0.0
+    assert daq.read_channels(['301', '305'])['301'] == 5.0  # MEAS? replies are binary too
+
+    assert daq.start_stream(['302', '301'], interval=0.005)
+    time.sleep(0.03)
+    block = daq.read_stream()
+    daq.stop_stream()
+    assert block.raw.dtype == np.float64 and block.raw.flags.c_contiguous
+    assert (block.raw[1] == 5.0).all()
+    np.testing.assert_allclose(np.diff(block.instrument_times), 0.005, atol=1e-6)
+
+@pytest.mark.parametrize('options', [{'data_format': 'real64'}, {'instrument_time': 'relative'}])
+def test_meas_reads_in_the_session_format(options):
+    """MEAS? reads right away, without a scan setup having set the reply format first."""
+    daq = DAQInterface(backend='sim', **options)
+    values = daq.read_channels(['301', '302'])
+    assert values is not None and list(values) == ['301', '302']
+    assert daq.connected
+    assert daq.read_channels(['302']) is not None
+    format_writes = [w for w in daq.instrument.writes if w.startswith(':FORM:DATA')]
+    assert len(format_writes) == 1  # Once per session
+
+def test_stream_relative_time_stamps():
+    daq = DAQInterface(backend='sim', instrument_time='relative')
+    daq.start_stream(['301'], interval=0.01)
+    time.sleep(0.035)
+    block = daq.read_stream(max_sweeps=3)
+    assert block.instrument_times == pytest.approx([0.0, 0.01, 0.02])
+    assert daq.instrument.query('SYST:ERR?').startswith('+0')
+
+def test_stream_count_and_memory_queries():
+    instrument = SimulatedDAQ970A()
+    for command in ('ROUT:SCAN (@301:302)', 'TRIG:SOUR TIM', 'TRIG:TIM 0.001', 'TRIG:COUN 3', 'INIT'):
+        instrument.write(command)
+    time.sleep(0.02)
+    assert instrument.query('DATA:POIN?') == '6'
+    block = instrument.query('R? 4')
+    assert block.startswith('#2') and len(block[4:].split(',')) == 4
+    assert int(block[2:4]) == len(block[4:])
+    assert len(instrument.query('DATA:REM? 2').split(',')) == 2
+    instrument.write('DATA:REM? 1')
+    assert instrument.query('SYST:ERR?').startswith('-222')
+
+def test_reconnects_after_cable_bump():
+    daq = DAQInterface(backend='sim', reconnect_delay=0.01)
+    daq.configure_scan(['301', '302'])
+    assert daq.read_sample(['301', '302']) is not None
+
+    daq.rm.unplug()
+    assert daq.read_sample(['301', '302']) is None
+    start = time.perf_counter()
+    for _ in range(10):
+        assert daq.read_sample(['301', '302']) is None
+    assert time.perf_counter() - start < 0.1  # Reads never wait for the reconnect
+
+    daq.rm.plug()
+    assert wait_for_connection(daq)
+    assert daq.instrument.scan == [301, 302]  # The scan list was set up again
+    assert daq.read_sample(['301', '302']) is not None
+    assert daq.reconnects >= 1
+
+def wait_for_connection(daq, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        daq.read_sample(['301', '302'])  # Kicks the next reconnect attempt once the backoff allows
+        if daq.wait_connected(timeout=0.05):
+            return True
+        time.sleep(0.01)
+    return False
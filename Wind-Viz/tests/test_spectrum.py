@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from src.spectrum import WelchPSD
+
+FS = 1000.0
+
+def signal(n, start=0, noise=0.0, seed=0):
+    t = (start + np.arange(n)) / FS
+    rng = np.random.default_rng(seed)
+    values = np.vstack([2.0 * np.sin(2 * np.pi * 125.0 * t), rng.normal(0.0, 1.0, n) * noise])
+    return t, values
+
+def test_sine_peak_and_power():
+    welch = WelchPSD(2, segment=256, overlap=0.5, averages=8)
+    welch.extend(*signal(4096, noise=1.0))
+    assert welch.update() == 8  # Only the newest `averages` segments are transformed
+    freqs, psd = welch.psd()
+    assert welch.fs == pytest.approx(FS)
+    assert freqs[np.argmax(psd[0])] == pytest.approx(125.0)
+    df = freqs[1] - freqs[0]
+    assert psd[0].sum() * df == pytest.approx(2.0, rel=0.02)  # Sine power A**2 / 2
+    # White noise of unit variance: flat at 2 sigma**2 / fs, one-sided
+    assert np.median(psd[1][1:-1]) == pytest.approx(2.0 / FS, rel=0.25)
+
+def test_incremental_updates_match_one_batch():
+    once = WelchPSD(2, segment=128, overlap=0.5, averages=4)
+    once.extend(*signal(640, noise=1.0))
+    once.update()
+
+    incremental = WelchPSD(2, segment=128, overlap=0.5, averages=4)
+    t, values = signal(640, noise=1.0)
+    transformed = 0
+    for chunk in np.array_split(np.arange(640), 23):
+        incremental.extend(t[chunk], values[:, chunk])
+        transformed += incremental.update()
+    assert transformed == 9  # Each segment transformed once: (640 - 128) / 64 + 1
+    np.testing.assert_allclose(incremental.psd()[1], once.psd()[1])
+
+def test_no_spectrum_before_a_full_segment():
+    welch = WelchPSD(1, segment=64)
+    welch.extend(np.arange(63) / FS, np.ones((1, 63)))
+    assert welch.update() == 0
+    assert welch.psd() == (None, None)
+
+def test_sample_rate_change_restarts_average():
+    welch = WelchPSD(1, segment=64, overlap=0.0, averages=4)
+    welch.extend(np.arange(256) / FS, np.ones((1, 256)))
+    welch.update()
+    assert welch.filled == 4
+    welch.extend(256 / FS + np.arange(64) / 500.0, np.ones((1, 64)))
+    assert welch.update() == 1
+    assert welch.filled == 1
+    assert welch.fs == pytest.approx(500.0)
+
+@pytest.mark.parametrize('kwargs', [{'segment': 2}, {'overlap': 1.0}, {'averages': 0}])
+def test_invalid_parameters(kwargs):
+    with pytest.raises(ValueError):
+        WelchPSD(1, **kwargs)
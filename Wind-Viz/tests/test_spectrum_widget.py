@@ -0,0 +1,20 @@
+import numpy as np
+from types import SimpleNamespace
+from src.spectrum_widget import SpectrumWidget
+
+def test_refresh_draws_psd_after_a_segment(qtbot):
+    widget = SpectrumWidget("PSD", {'305': {'name': 'Sting_1', 'unit': 'V'}}, segment=64, averages=2)
+    qtbot.addWidget(widget)
+    t = np.arange(200) / 100.0
+    block = SimpleNamespace(channel_ids=['301', '305'], times=t,
+                            values=np.vstack([np.zeros(200), np.sin(2 * np.pi * 25.0 * t)]))
+    widget.add_block(SimpleNamespace(channel_ids=block.channel_ids, times=t[:32], values=block.values[:, :32]))
+    widget.refresh()
+    assert widget.curves['305'].getData()[0] is None  # Nothing until a full segment
+
+    widget.add_block(SimpleNamespace(channel_ids=block.channel_ids, times=t[32:], values=block.values[:, 32:]))
+    widget.refresh()
+    freqs, psd = widget.curves['305'].getData()
+    assert freqs[0] > 0  # DC bin left out
+    assert freqs[np.argmax(psd)] == 25.0
+    assert widget.plot_widget.getAxis('left').labelText.startswith('PSD (V')
@@ -0,0 +1,49 @@
+import numpy as np
+from src.data_logger import DataLogger
+from src.pipeline import SamplePipeline
+from src.viewer import LogViewer
+
+CHANNELS = {
+    '301': {'name': 'Pressure_1', 'coefficient': '1', 'offset': '0'},
+    '302': {'name': 'Temp_1', 'coefficient': '1', 'offset': '0'},
+    '303': {'name': 'Velocity_1', 'coefficient': '1', 'offset': '0'},
+}
+
+def write_log(tmp_path, rows=50000):
+    logger = DataLogger(log_dir=tmp_path, log_format='binary')
+    logger.start_logging(CHANNELS.keys(), channels=CHANNELS)
+    pipeline = SamplePipeline(CHANNELS)
+    pipeline.subscribe(logger.log_block)
+    stamps = np.arange(rows, dtype=np.int64) * 1_000_000
+    pipeline.publish_block(stamps, np.vstack([np.arange(rows, dtype=float)] * 3), 0)
+    logger.stop_logging()
+    return logger.filename
+
+def test_graphs_follow_config_and_share_x(qtbot, tmp_path):
+    path = write_log(tmp_path)
+    graphs = {'Pressure': ['301'], 'Temperature': ['302', '399'], 'STING': ['399']}
+    viewer = LogViewer(path, graphs=graphs, channels={'301': {'name': 'P1'}})
+    qtbot.addWidget(viewer)
+    assert list(viewer.plot_widgets) == ['Pressure', 'Temperature']  # Absent channels left out
+    pressure = viewer.plot_widgets['Pressure']
+    assert pressure.channels['301']['name'] == 'P1'
+
+    viewer.renderer.render_frame()
+    xs, ys = pressure.curves['301'].getData()
+    assert len(xs) <= 2 * max(pressure.plot_widget.width(), 100)
+    assert ys.max() == 49999
+
+    # Zooming one graph redraws both from the index
+    start = viewer.index.start + 10.0
+    pressure.plot_widget.setXRange(start, start + 0.05, padding=0)
+    assert viewer.plot_widgets['Temperature'] in viewer.renderer.dirty
+    viewer.renderer.render_frame()
+    xs, ys = viewer.plot_widgets['Temperature'].curves['302'].getData()
+    assert 50 <= len(xs) <= 52
+    assert ys[0] >= 9990
+
+def test_all_channels_without_graphs(qtbot, tmp_path):
+    viewer = LogViewer(write_log(tmp_path, rows=100))
+    qtbot.addWidget(viewer)
+    assert list(viewer.plot_widgets['Log'].channels) == ['301', '302', '303']
+    assert viewer.plot_widgets['Log'].channels['302']['name'] == 'Temp_1'